@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["torch", "paddle", "paddleocr", "cv2", "moviepy", "openai"]
+
+# 子命令对应导入的模块、导入时间预算（秒）以及允许加载的重量级框架
+COMMANDS = {
+    "cli": ("main", 0.3, []),
+    "run": ("modules.pipeline", 0.5, []),
+    "ocr": ("modules.ocr", 0.5, []),
+    "erase": ("modules.erase", 5.0, ["torch", "cv2"]),
+    "translate": ("modules.translate", 0.5, []),
+    "embed": ("modules.embed", 3.0, ["moviepy"]),
+    "serve": ("modules.service", 0.5, []),
+}
+
+
+def measure(module: str) -> dict:
+    """
+    在新的解释器中导入模块，统计导入耗时和已加载的重量级框架。
+
+    参数:
+    - module: 模块名。
+
+    返回:
+    - dict: 包含 seconds（-X importtime 统计的顶层模块累计耗时）和 heavy（已加载的重量级框架）。
+    """
+    code = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        return {"error": process.stderr.strip().splitlines()[-1]}
+
+    total_us = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not name.startswith("  ") and cumulative.strip().isdigit():
+            total_us += int(cumulative)
+    return {
+        "seconds": round(total_us / 1e6, 3),
+        "heavy": json.loads(process.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure import time of each subcommand against a budget."
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="Multiply every budget by this factor, e.g. on slow machines.",
+    )
+    parser.add_argument("--output", default=None, help="Save results as JSON.")
+    args = parser.parse_args()
+
+    results = {}
+    failed = False
+    for command, (module, budget, allowed) in COMMANDS.items():
+        result = measure(module)
+        result["module"] = module
+        result["budget"] = budget * args.scale
+        if "error" in result:
+            result["ok"] = False
+        else:
+            unexpected = [m for m in result["heavy"] if m not in allowed]
+            result["unexpected"] = unexpected
+            result["ok"] = result["seconds"] <= result["budget"] and not unexpected
+        failed = failed or not result["ok"]
+        results[command] = result
+        print(f"{command:10s} {module:20s} {json.dumps(result, ensure_ascii=False)}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import argparse
+import datetime
+import difflib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pysrt
+
+from benchmarks.synthetic import generate_video
+from modules.config import load_config
+from utils.logging_utils import update_status
+from utils.metrics_utils import collect_metrics, track_stage
+from utils.video_utils import (
+    create_video,
+    detect_fps,
+    extract_frames,
+    get_temp_directory_path,
+    get_temp_frame_paths,
+)
+
+
+def temporal_iou(a: tuple, b: tuple) -> float:
+    """
+    计算两个时间区间的交并比。
+    """
+    inter = max(0.0, min(a[1], b[1]) - max(a[0], b[0]))
+    union = max(a[1], b[1]) - min(a[0], b[0])
+    return inter / union if union > 0 else 0.0
+
+
+def evaluate_subtitles(srt_path: str, cues: list, compare_text: bool = True) -> dict:
+    """
+    将识别生成的字幕与真值对比。
+
+    每条真值字幕与时间交并比最大的识别字幕配对，交并比不低于 0.5 视为命中。
+
+    参数:
+    - srt_path: 识别生成的 SRT 文件路径。
+    - cues: 字幕真值列表。
+    - compare_text: 是否比较文本，使用 OCR 替身时为 False。
+
+    返回:
+    - dict: 召回率、精确率、平均边界误差（毫秒）和平均文本相似度。
+    """
+    predictions = [
+        (sub.start.ordinal / 1000, sub.end.ordinal / 1000, sub.text)
+        for sub in pysrt.open(srt_path)
+    ]
+    matched = set()
+    boundary_errors = []
+    similarities = []
+    for cue in cues:
+        truth = (cue["start"], cue["end"])
+        scored = [(temporal_iou(truth, p[:2]), i) for i, p in enumerate(predictions)]
+        if not scored:
+            continue
+        iou, index = max(scored)
+        if iou < 0.5:
+            continue
+        matched.add(index)
+        start, end, text = predictions[index]
+        boundary_errors.append((abs(start - cue["start"]) + abs(end - cue["end"])) / 2)
+        if compare_text:
+            similarities.append(
+                difflib.SequenceMatcher(None, text.lower(), cue["text"].lower()).ratio()
+            )
+
+    return {
+        "truth_cues": len(cues),
+        "predicted_cues": len(predictions),
+        "recall": round(len(boundary_errors) / len(cues), 4) if cues else None,
+        "precision": round(len(matched) / len(predictions), 4) if predictions else None,
+        "mean_boundary_error_ms": (
+            round(sum(boundary_errors) / len(boundary_errors) * 1000, 1)
+            if boundary_errors
+            else None
+        ),
+        "mean_text_similarity": (
+            round(sum(similarities) / len(similarities), 4) if similarities else None
+        ),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return (
+            subprocess.check_output(["git", "rev-parse", "--short", "HEAD"])
+            .decode()
+            .strip()
+        )
+    except Exception:
+        return "unknown"
+
+
+def run_benchmark(args, config: dict) -> dict:
+    """
+    生成合成视频并依次运行各阶段，记录每个阶段的指标和识别准确率。
+
+    返回:
+    - dict: 基准测试结果。
+    """
+    name = (
+        f"synthetic_{args.width}x{args.height}_{args.duration:g}s_{args.fps}fps"
+        f"_{args.cue_density:g}cpm_{args.motion}_{args.seed}"
+    )
+    video_path = os.path.join(args.data_dir, f"{name}.mp4")
+    update_status(f"Benchmark: generating {video_path}...")
+    cues = generate_video(
+        video_path,
+        args.width,
+        args.height,
+        args.duration,
+        args.fps,
+        args.cue_density,
+        args.cue_duration,
+        args.motion,
+        args.seed,
+    )
+    file_name, ext = os.path.splitext(video_path)
+    shutil.rmtree(file_name, ignore_errors=True)
+    fps = detect_fps(video_path)
+
+    if args.stub:
+        from benchmarks.stubs import StubInpaintGenerator, StubOCR
+        from modules.erase import get_device
+
+        ocr = StubOCR()
+        model = StubInpaintGenerator().to(get_device()).eval()
+    else:
+        from modules.ocr import build_ocr_model
+
+        ocr = build_ocr_model(config)
+        model = None
+
+    from modules.embed import embed_subtitles
+    from modules.erase import remove_subtitles
+    from modules.ocr import extract_subtitles
+    from modules.subtitle import get_subtitles
+
+    collect_metrics(file_name)
+    update_status("Benchmark: extract_frames")
+    with track_stage("extract_frames", config, file_name):
+        extract_frames(video_path, fps)
+        frame_paths = get_temp_frame_paths(get_temp_directory_path(video_path))
+
+    update_status("Benchmark: extract_subtitles")
+    with track_stage("extract_subtitles", config, file_name):
+        timeline, y_center = extract_subtitles(frame_paths, config, fps, ocr)
+
+    update_status("Benchmark: get_subtitles")
+    with track_stage("get_subtitles", config, file_name):
+        srt_path = get_subtitles(timeline, config, fps, file_name)
+
+    update_status("Benchmark: remove_subtitles")
+    with track_stage("remove_subtitles", config, file_name):
+        remove_subtitles(timeline, frame_paths, fps, config, model)
+    output_path = f"{file_name}_output{ext}"
+    with track_stage("create_video", config, file_name):
+        create_video(video_path, output_path, fps)
+
+    update_status("Benchmark: embed_subtitles")
+    with track_stage("embed_subtitles", config, file_name):
+        embed_subtitles(
+            output_path, srt_path, y_center, f"{file_name}_embed{ext}", config
+        )
+
+    with open(f"{file_name}.json") as f:
+        truth = json.load(f)
+    accuracy = evaluate_subtitles(srt_path, cues, compare_text=not args.stub)
+    accuracy["y_center"] = float(y_center)
+    accuracy["y_center_error"] = round(abs(float(y_center) - truth["y_center"]), 1)
+
+    if not args.keep:
+        shutil.rmtree(file_name, ignore_errors=True)
+
+    return {
+        "commit": git_revision(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "stub": args.stub,
+        "video": {
+            "name": name,
+            "width": args.width,
+            "height": args.height,
+            "duration": args.duration,
+            "fps": args.fps,
+            "cue_density": args.cue_density,
+            "cue_duration": args.cue_duration,
+            "motion": args.motion,
+            "seed": args.seed,
+        },
+        "stages": collect_metrics(file_name),
+        "accuracy": accuracy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark each stage on synthetic hard-subtitled videos."
+    )
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=360)
+    parser.add_argument("--duration", type=float, default=20, help="Seconds.")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--cue-density", type=float, default=12, help="Cues per minute.")
+    parser.add_argument("--cue-duration", type=float, default=2.5, help="Seconds.")
+    parser.add_argument(
+        "--motion", choices=["static", "pattern", "noise"], default="static"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--stub",
+        action="store_true",
+        help="Use model-free OCR and a tiny random STTN so the suite runs without weights.",
+    )
+    parser.add_argument("--config", default=None, help="Config file, defaults to config.yaml.")
+    parser.add_argument("--data-dir", default="./benchmarks/data")
+    parser.add_argument("--output-dir", default="./benchmarks/results")
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the extracted frame directory."
+    )
+    args = parser.parse_args()
+
+    config_file = args.config
+    if config_file is None:
+        config_file = "config.yaml" if os.path.exists("config.yaml") else "config-template.yaml"
+    config = load_config(config_file)
+    config["ocr"]["min_height_ratio"] = 0.7
+    config["ocr"]["max_height_ratio"] = 1.0
+
+    result = run_benchmark(args, config)
+    os.makedirs(args.output_dir, exist_ok=True)
+    result_path = os.path.join(
+        args.output_dir, f"{result['commit']}_{result['video']['name']}.json"
+    )
+    with open(result_path, "w") as f:
+        json.dump(result, f, ensure_ascii=False, indent=4)
+    update_status(f"Benchmark: results saved to {result_path}")
+    print(json.dumps(result["accuracy"], indent=4))
+
+
+if __name__ == "__main__":
+    main()
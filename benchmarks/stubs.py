@@ -0,0 +1,61 @@
+import numpy as np
+import torch
+from torch import nn
+
+
+class StubOCR:
+    """
+    不依赖模型的 OCR 替身，接口与 PaddleOCR.ocr 一致，用于离线测量流水线本身的开销。
+
+    检测：把接近白色的像素视为字幕笔画，取其外接矩形作为文本框；
+    识别：不做真正的识别，用文本框宽度生成一个占位文本，使同一条字幕在相邻帧中保持一致、
+    不同字幕通常不同。因此使用替身时只能评估字幕的时间边界，不能评估文本准确率。
+    """
+
+    def __init__(self, threshold: int = 220, min_pixels: int = 20):
+        self.threshold = threshold
+        self.min_pixels = min_pixels
+
+    def detect(self, img: np.ndarray):
+        bright = img.min(axis=2) >= self.threshold
+        if bright.sum() < self.min_pixels:
+            return []
+        ys, xs = np.nonzero(bright)
+        x1, x2, y1, y2 = int(xs.min()), int(xs.max()), int(ys.min()), int(ys.max())
+        return [[[x1, y1], [x2, y1], [x2, y2], [x1, y2]]]
+
+    def recognize(self, img: np.ndarray):
+        boxes = self.detect(img)
+        if not boxes:
+            return ("", 0.0)
+        width = boxes[0][1][0] - boxes[0][0][0]
+        return (f"#{width // 8}", 1.0)
+
+    def ocr(self, img, cls=False, det=True, rec=True):
+        if not det:
+            images = img if isinstance(img, list) else [img]
+            return [[self.recognize(image) for image in images]]
+        boxes = self.detect(img)
+        if not boxes:
+            return [None]
+        if not rec:
+            return [boxes]
+        return [[[box, self.recognize(img)] for box in boxes]]
+
+
+class StubInpaintGenerator(nn.Module):
+    """
+    与 STTN InpaintGenerator 接口一致（encoder、infer、decoder）的极小随机网络，
+    用于在没有 STTN 权重的环境中测量擦除阶段除模型推理以外的开销。
+    """
+
+    def __init__(self, channels: int = 8):
+        super().__init__()
+        self.encoder = nn.Conv2d(3, channels, 3, stride=4, padding=1)
+        self.decoder = nn.Sequential(
+            nn.Upsample(scale_factor=4, mode="nearest"),
+            nn.Conv2d(channels, 3, 3, padding=1),
+        )
+
+    def infer(self, feat: torch.Tensor, masks: torch.Tensor) -> torch.Tensor:
+        return feat
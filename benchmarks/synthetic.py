@@ -0,0 +1,145 @@
+import json
+import os
+import random
+from typing import List
+
+from utils.video_utils import run_ffmpeg
+
+FONT_PATH = "./fonts/arialbd.ttf"
+WORDS = (
+    "hello world river mountain coffee window yellow garden silver planet travel "
+    "morning music friend summer winter ocean forest letter future simple orange"
+).split()
+BACKGROUNDS = {
+    "static": "color=c=0x336699:s={width}x{height}:r={fps}:d={duration}",
+    "pattern": "testsrc2=s={width}x{height}:r={fps}:d={duration}",
+    "noise": "color=c=0x556677:s={width}x{height}:r={fps}:d={duration},noise=alls=40:allf=t",
+}
+
+
+def make_cues(
+    duration: float, cue_density: float, cue_duration: float, seed: int = 0
+) -> List[dict]:
+    """
+    生成不重叠的字幕条目作为标注真值。
+
+    参数:
+    - duration: 视频时长，单位秒。
+    - cue_density: 每分钟的字幕条数。
+    - cue_duration: 每条字幕的持续时间，单位秒。
+    - seed: 随机种子。
+
+    返回:
+    - List[dict]: 包含 start、end（秒）和 text 的字幕列表。
+    """
+    rng = random.Random(seed)
+    count = max(1, int(duration / 60 * cue_density))
+    slot = duration / count
+    cue_duration = min(cue_duration, slot * 0.8)
+    cues = []
+    for i in range(count):
+        start = i * slot + rng.uniform(0, slot - cue_duration)
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        cues.append(
+            {"start": round(start, 3), "end": round(start + cue_duration, 3), "text": text}
+        )
+    return cues
+
+
+def generate_video(
+    output_path: str,
+    width: int = 640,
+    height: int = 360,
+    duration: float = 20,
+    fps: int = 25,
+    cue_density: float = 12,
+    cue_duration: float = 2.5,
+    motion: str = "static",
+    seed: int = 0,
+) -> List[dict]:
+    """
+    使用 ffmpeg drawtext 和仓库自带的字体生成带硬字幕的合成视频，并保存字幕真值。
+
+    真值保存在与视频同名的 .json 文件中，已存在时直接复用。
+
+    参数:
+    - output_path: 输出视频路径。
+    - width: 视频宽度。
+    - height: 视频高度。
+    - duration: 视频时长，单位秒。
+    - fps: 视频帧率。
+    - cue_density: 每分钟的字幕条数。
+    - cue_duration: 每条字幕的持续时间，单位秒。
+    - motion: 背景类型，static、pattern 或 noise。
+    - seed: 随机种子。
+
+    返回:
+    - List[dict]: 字幕真值列表。
+    """
+    truth_path = f"{os.path.splitext(output_path)[0]}.json"
+    if os.path.exists(output_path) and os.path.exists(truth_path):
+        with open(truth_path) as f:
+            return json.load(f)["cues"]
+
+    cues = make_cues(duration, cue_density, cue_duration, seed)
+    font_size = max(12, height // 18)
+    filters = []
+    for cue in cues:
+        filters.append(
+            f"drawtext=fontfile={FONT_PATH}:text='{cue['text']}':fontsize={font_size}"
+            f":fontcolor=white:borderw=2:bordercolor=black"
+            f":x=(w-text_w)/2:y=h*0.85-text_h/2"
+            f":enable='between(t,{cue['start']},{cue['end']})'"
+        )
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    script_path = f"{os.path.splitext(output_path)[0]}_filter.txt"
+    with open(script_path, "w") as f:
+        f.write(",\n".join(filters) if filters else "null")
+
+    background = BACKGROUNDS[motion].format(
+        width=width, height=height, fps=fps, duration=duration
+    )
+    commands = [
+        "-f",
+        "lavfi",
+        "-i",
+        background,
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:duration={duration}",
+        "-filter_script:v",
+        script_path,
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-pix_fmt",
+        "yuv420p",
+        "-c:a",
+        "aac",
+        "-shortest",
+        "-y",
+        output_path,
+    ]
+    success = run_ffmpeg(commands)
+    os.remove(script_path)
+    if not success:
+        raise RuntimeError(f"Failed to generate synthetic video {output_path}")
+
+    with open(truth_path, "w") as f:
+        json.dump(
+            {
+                "width": width,
+                "height": height,
+                "duration": duration,
+                "fps": fps,
+                "motion": motion,
+                "y_center": height * 0.85,
+                "cues": cues,
+            },
+            f,
+            ensure_ascii=False,
+            indent=4,
+        )
+    return cues
@@ -1,79 +1,270 @@
 import argparse
 import os
-import shutil
+import sys
 
 from modules.config import load_config
-from modules.embed import embed_subtitles
-from modules.erase import remove_subtitles
-from modules.ocr import extract_subtitles
-from modules.subtitle import get_subtitles
-from modules.translate import translate_subtitles
-from utils.logging_utils import update_status
-from utils.video_utils import (
-    create_video,
-    detect_fps,
-    extract_frames,
-    get_temp_directory_path,
-    get_temp_frame_paths,
-)
-
-
-def main():
-    # 解析命令行参数
-    parser = argparse.ArgumentParser(
-        description="SubErase-Translate-Embed: A tool for erasing, translating, and embedding subtitles."
-    )
+
+COMMANDS = ["run", "ocr", "erase", "autotune", "translate", "embed", "serve"]
+
+
+def add_run_arguments(parser: argparse.ArgumentParser):
     parser.add_argument("--video", required=True, help="Path to the input video file.")
     parser.add_argument(
-        "--language", required=True, help="Target language code for translation."
+        "--language",
+        required=True,
+        help="Target language for translation, comma-separated for several languages.",
     )
     parser.add_argument(
         "--delete",
         action="store_true",
         help="Whether to delete the temporary directory after processing.",
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Run compute stages in threads of the main process instead of worker processes.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="Split the video into this many time shards processed in parallel.",
+    )
+    parser.add_argument(
+        "--preview",
+        action="store_true",
+        help="Quickly render a low-resolution preview with the subtitle band blurred instead of erased.",
+    )
+    parser.add_argument(
+        "--profile-stage",
+        default=None,
+        help="Profile one stage (extract, ocr, subtitle, erase, encode, translate, embed).",
+    )
+    parser.add_argument(
+        "--profiler",
+        choices=["cprofile", "torch"],
+        default=None,
+        help="Profiler used for --profile-stage.",
+    )
 
-    # 开始处理
-    update_status(f"Start! {args.video}")
+
+def run_command(args):
+    from modules.pipeline import run_pipeline
+
+    # 开始处理：翻译与擦除并发执行，两者完成后再嵌入字幕
+    config = load_config()
+    if args.profile_stage:
+        config["metrics"]["profile_stage"] = args.profile_stage
+    if args.profiler:
+        config["metrics"]["profiler"] = args.profiler
+    languages = [language.strip() for language in args.language.split(",")]
+    if args.preview:
+        from modules.preview import run_preview
+
+        artifacts = run_preview(args.video, languages, config)
+        print(f"preview: {artifacts['preview']}")
+        print(f"srt: {artifacts['subtitle']}")
+        print(f"y_center: {artifacts['y_center']}")
+        return
+    shard_count = args.shards
+    if shard_count is None:
+        shard_count = config["shard"]["count"]
+    run_pipeline(
+        args.video,
+        languages,
+        config,
+        delete=args.delete,
+        use_processes=not args.in_process,
+        shard_count=shard_count,
+    )
+
+
+def ocr_command(args):
+    from modules.pipeline import extract_stage, ocr_stage, subtitle_stage
+    from utils.video_utils import detect_fps
+    from utils.workspace_utils import get_job_prefix
+
+    # 提取视频帧并识别字幕，生成 SRT 和 _ocr_check.json 供 erase 子命令使用
+    config = load_config()
+    file_name = get_job_prefix(args.video, config)
+    fps = detect_fps(args.video)
+    frame_paths = extract_stage(args.video, fps, config)
+    if args.stream:
+        from modules.ocr import stream_subtitles
+        from utils.subtitle_utils import format_time
+
+        # 每确定一条字幕就输出，SRT 文件同步增量写入
+        for cue in stream_subtitles(frame_paths, config, fps, file_name):
+            start, end = format_time(cue["start"] / fps), format_time(cue["end"] / fps)
+            print(f"{start} --> {end} {cue['text']}", flush=True)
+        print(f"srt: {file_name}_zh_ocr.srt")
+        return
+    ocr_output = ocr_stage(frame_paths, config, fps, file_name)
+    srt_path = subtitle_stage(ocr_output, config, fps, file_name)
+    print(f"srt: {srt_path}")
+    print(f"y_center: {ocr_output[1]}")
+
+
+def erase_command(args):
+    from modules.pipeline import erase_stage
+    from utils.timeline_utils import Timeline
+    from utils.video_utils import detect_fps, get_temp_frame_paths
+    from utils.workspace_utils import get_job_prefix
+
+    # 基于 ocr 子命令保留的帧和识别结果擦除字幕
     config = load_config()
     file_name, ext = os.path.splitext(args.video)
     fps = detect_fps(args.video)
+    temp_directory_path = get_job_prefix(args.video, config)
+    frame_paths = get_temp_frame_paths(temp_directory_path)
+    timeline = Timeline.load(f"{temp_directory_path}_ocr_check.json")
+    output_path = args.output or f"{file_name}_output{ext}"
+    erase_stage(frame_paths, (timeline, None), args.video, output_path, fps, config)
+    print(f"output: {output_path}")
+
+
+def autotune_command(args):
+    from modules.autotune import autotune
+    from utils.timeline_utils import Timeline
+    from utils.video_utils import detect_fps, get_temp_frame_paths
+    from utils.workspace_utils import get_job_prefix
 
-    # 提取视频帧
-    update_status(f"Source: extracting frames with {fps} FPS...")
-    extract_frames(args.video, fps)
-    temp_directory_path = get_temp_directory_path(args.video)
+    # 基于 ocr 子命令保留的帧和识别结果调优擦除参数，写入 erase.profile
+    config = load_config()
+    fps = detect_fps(args.video)
+    temp_directory_path = get_job_prefix(args.video, config)
     frame_paths = get_temp_frame_paths(temp_directory_path)
+    timeline = Timeline.load(f"{temp_directory_path}_ocr_check.json")
+    min_fps = config["autotune"]["min_fps"] if args.min_fps is None else args.min_fps
+    max_memory_mb = args.max_memory_mb
+    if max_memory_mb is None:
+        max_memory_mb = config["autotune"]["max_memory_mb"]
+    entry = autotune(timeline, frame_paths, fps, config, min_fps, max_memory_mb)
+    print(f"settings: {entry}")
+    print(f"profile: {config['erase']['profile']}")
+
+
+def translate_command(args):
+    from modules.pipeline import translate_stage
+
+    config = load_config()
+    file_name = os.path.splitext(args.srt)[0]
+    for language in args.language.split(","):
+        print(translate_stage(args.srt, language.strip(), config, file_name))
+
+
+def embed_command(args):
+    from modules.pipeline import embed_stage
+
+    config = load_config()
+    file_name, ext = os.path.splitext(args.video)
+    output_file = args.output or f"{file_name}_embed{ext}"
+    embed_stage(args.video, args.srt, args.y_center, output_file, config, file_name)
+    print(f"output: {output_file}")
+
+
+def serve_command(args):
+    from modules.service import serve
+
+    config = load_config()
+    host = args.host or config["service"]["host"]
+    port = args.port if args.port is not None else config["service"]["port"]
+    serve(config, host, port, warm_up=not args.no_warm_up)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="SubErase-Translate-Embed: A tool for erasing, translating, and embedding subtitles."
+    )
+    subparsers = parser.add_subparsers(dest="command")
 
-    # 使用 OCR 提取字幕
-    update_status("OCR: extracting subtitles...")
-    ocr_result, y_center = extract_subtitles(frame_paths, config, fps)
+    run_parser = subparsers.add_parser("run", help="Run the whole pipeline (default).")
+    add_run_arguments(run_parser)
+    run_parser.set_defaults(func=run_command)
 
-    # 生成字幕
-    srt_path = get_subtitles(ocr_result, config, fps, file_name)
+    ocr_parser = subparsers.add_parser(
+        "ocr", help="Extract frames and OCR subtitles into an SRT file."
+    )
+    ocr_parser.add_argument("--video", required=True, help="Path to the input video file.")
+    ocr_parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print and write each subtitle as soon as it is complete (no _ocr_check.json).",
+    )
+    ocr_parser.set_defaults(func=ocr_command)
 
-    # 擦除原有字幕
-    update_status("Erase: removing subtitles...")
-    remove_subtitles(ocr_result, fps, len(frame_paths), config)
-    output_path = f"{file_name}_output{ext}"
-    create_video(args.video, output_path, fps)
+    erase_parser = subparsers.add_parser(
+        "erase", help="Erase subtitles using the frames and OCR result kept by `ocr`."
+    )
+    erase_parser.add_argument("--video", required=True, help="Path to the input video file.")
+    erase_parser.add_argument("--output", default=None, help="Path to the erased video.")
+    erase_parser.set_defaults(func=erase_command)
 
-    # 翻译字幕
-    update_status("Translate: translating subtitles...")
-    srt_lang_path = translate_subtitles(srt_path, args.language)
+    autotune_parser = subparsers.add_parser(
+        "autotune",
+        help="Tune erase settings on the frames kept by `ocr` and write the machine profile.",
+    )
+    autotune_parser.add_argument("--video", required=True, help="Path to the input video file.")
+    autotune_parser.add_argument(
+        "--min-fps",
+        type=float,
+        default=None,
+        help="Time budget: slowest acceptable inpainting speed in frames per second.",
+    )
+    autotune_parser.add_argument(
+        "--max-memory-mb",
+        type=float,
+        default=None,
+        help="Memory budget: highest acceptable peak (GPU) memory in MB.",
+    )
+    autotune_parser.set_defaults(func=autotune_command)
+
+    translate_parser = subparsers.add_parser("translate", help="Translate an SRT file.")
+    translate_parser.add_argument("--srt", required=True, help="Path to the source SRT file.")
+    translate_parser.add_argument(
+        "--language",
+        required=True,
+        help="Target language for translation, comma-separated for several languages.",
+    )
+    translate_parser.set_defaults(func=translate_command)
+
+    embed_parser = subparsers.add_parser("embed", help="Burn an SRT file into a video.")
+    embed_parser.add_argument("--video", required=True, help="Path to the erased video file.")
+    embed_parser.add_argument("--srt", required=True, help="Path to the translated SRT file.")
+    embed_parser.add_argument(
+        "--y-center",
+        type=float,
+        required=True,
+        help="Vertical center of the subtitles in pixels, as printed by `ocr`.",
+    )
+    embed_parser.add_argument("--output", default=None, help="Path to the output video.")
+    embed_parser.set_defaults(func=embed_command)
 
-    # 将翻译后的字幕嵌入视频
-    update_status("Embed: embedding subtitles...")
-    output_file = f"{file_name}_{args.language}{ext}"
-    embed_subtitles(output_path, srt_lang_path, y_center, output_file, config)
+    serve_parser = subparsers.add_parser(
+        "serve", help="Run jobs through a local HTTP API with warm models."
+    )
+    serve_parser.add_argument("--host", default=None, help="Address to listen on.")
+    serve_parser.add_argument("--port", type=int, default=None, help="Port to listen on.")
+    serve_parser.add_argument(
+        "--no-warm-up",
+        action="store_true",
+        help="Load models on the first job instead of at startup.",
+    )
+    serve_parser.set_defaults(func=serve_command)
+    return parser
 
-    if args.delete:
-        if os.path.exists(file_name):
-            shutil.rmtree(file_name)
-            update_status("Temporary request directory {} deleted".format(file_name))
 
-    update_status(f"Done! {args.video}")
+def main(argv=None):
+    # 解析命令行参数，不带子命令时按 run 处理以兼容旧的调用方式
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv and argv[0] not in COMMANDS and argv[0] not in ("-h", "--help"):
+        argv = ["run"] + argv
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+    args.func(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,640 @@
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from modules.ocr import (
+    FrameWindow,
+    build_ocr_model,
+    check_frames,
+    concat_lines,
+    get_layout,
+    get_sample_step,
+    iter_ocr_frames,
+    sample_ocr,
+)
+from modules.subtitle import CueBuilder
+from utils.image_utils import load_img_to_array
+from utils.metrics_utils import incr
+from utils.subtitle_utils import create_srt_entry
+from utils.timeline_utils import Timeline
+from utils.video_utils import (
+    detect_fps,
+    detect_size,
+    get_temp_frame_paths,
+    read_frames,
+    write_video,
+)
+
+
+@dataclass
+class Cue:
+    """
+    一条字幕，start 和 end 为帧号（从 1 开始）。
+    """
+
+    start: int
+    end: int
+    text: str
+
+
+def save_cues(cues: List[Cue], srt_path: str, fps: float) -> str:
+    """
+    将字幕列表保存为 SRT 文件，格式与 get_subtitles 生成的文件一致。
+
+    参数:
+    - cues: 字幕列表。
+    - srt_path: SRT 文件路径。
+    - fps: 视频的帧率。
+
+    返回:
+    - SRT 文件路径。
+    """
+    with open(srt_path, "w") as f:
+        f.write(
+            "\n".join(
+                create_srt_entry(asdict(cue), i, fps) for i, cue in enumerate(cues, 1)
+            )
+        )
+    return srt_path
+
+
+class VideoFrames:
+    """
+    按帧号从视频中解码帧，内存中只保留最近读取的 cache_size 帧。
+
+    读取当前解码位置之后的帧时沿用同一个解码管道；读取更早且不在缓存中的帧时从头重新解码。
+    各阶段基本按帧号顺序读取，向前回退的范围（稀疏采样的二分查找、补齐帧）在缓存之内。
+    """
+
+    def __init__(
+        self, video_path: str, fps: float, size: Tuple[int, int], cache_size: int
+    ):
+        """
+        参数:
+        - video_path: 视频文件的路径。
+        - fps: 解码帧率。
+        - size: 帧尺寸 (宽, 高)。
+        - cache_size: 缓存的帧数。
+        """
+        self.video_path = video_path
+        self.fps = fps
+        self.size = size
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._reader = None
+        self._next = 1
+
+    def _open(self):
+        if self._reader is not None:
+            self._reader.close()
+        width, height = self.size
+        self._reader = read_frames(self.video_path, self.fps, width, height)
+        self._next = 1
+        incr("decode_passes")
+
+    def count(self) -> int:
+        """
+        解码一遍视频得到帧数，解码过程中只缓存最后的 cache_size 帧。
+        """
+        self._open()
+        for frame in self._reader:
+            self._put(self._next, frame)
+            self._next += 1
+        self._reader = None
+        return self._next - 1
+
+    def _put(self, frame_number: int, frame: np.ndarray):
+        self._cache[frame_number] = frame
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def __call__(self, frame_number: int) -> np.ndarray:
+        frame = self._cache.get(frame_number)
+        if frame is not None:
+            self._cache.move_to_end(frame_number)
+            return frame
+        if self._reader is None or frame_number < self._next:
+            self._open()
+        while self._next <= frame_number:
+            frame = next(self._reader, None)
+            if frame is None:
+                raise IndexError(f"frame {frame_number} out of range")
+            self._put(self._next, frame)
+            self._next += 1
+        return self._cache[frame_number]
+
+
+class FrameSource:
+    """
+    按帧号（从 1 开始）读取视频帧的帧源，帧为 RGB 图像数组。
+
+    帧可以从视频按需解码（from_video），也可以从帧目录按需读取（from_directory），
+    或使用内存中的帧（from_arrays），各阶段只通过帧号访问帧，不再依赖帧文件路径。
+    """
+
+    def __init__(
+        self,
+        numbers: List[int],
+        load: Callable[[int], np.ndarray],
+        fps: float,
+        size: Tuple[int, int],
+    ):
+        """
+        参数:
+        - numbers: 按顺序排列的帧号列表。
+        - load: 根据帧号返回图像数组的函数。
+        - fps: 视频的帧率。
+        - size: 帧尺寸 (宽, 高)。
+        """
+        self.numbers = numbers
+        self.fps = fps
+        self.size = size
+        self._load = load
+
+    @classmethod
+    def from_video(
+        cls, video_path: str, fps: float = None, cache_size: int = 120
+    ) -> "FrameSource":
+        """
+        通过管道按需解码视频，不写入帧文件，内存中最多保留 cache_size 帧，见 VideoFrames。
+
+        创建时先解码一遍视频统计帧数，之后各阶段每次顺序读取都会重新解码。Pipeline.run 共解码
+        4 遍：统计帧数、ocr、erase、encode 各一遍，erase.scene_threshold 大于 0 时 erase 多解码一遍
+        检测镜头切换。
+
+        参数:
+        - video_path: 视频文件的路径。
+        - fps: 解码帧率，为 None 时使用视频本身的帧率。
+        - cache_size: 缓存的帧数。
+
+        返回:
+        - FrameSource 实例。
+        """
+        if fps is None:
+            fps = detect_fps(video_path)
+        size = detect_size(video_path)
+        frames = VideoFrames(video_path, fps, size, cache_size)
+        return cls(list(range(1, frames.count() + 1)), frames, fps, size)
+
+    @classmethod
+    def from_arrays(cls, frames: Dict[int, np.ndarray], fps: float) -> "FrameSource":
+        """
+        使用内存中的帧创建帧源。
+
+        参数:
+        - frames: 帧号到图像数组的字典，按帧号排序。
+        - fps: 视频的帧率。
+
+        返回:
+        - FrameSource 实例。
+        """
+        first = next(iter(frames.values()))
+        return cls(
+            list(frames), frames.__getitem__, fps, (first.shape[1], first.shape[0])
+        )
+
+    @classmethod
+    def from_directory(cls, directory_path: str, fps: float) -> "FrameSource":
+        """
+        使用 extract_frames 生成的帧目录创建帧源，帧在读取时才加载。
+
+        参数:
+        - directory_path: 帧目录。
+        - fps: 视频的帧率。
+
+        返回:
+        - FrameSource 实例。
+        """
+        paths = {
+            int(os.path.splitext(os.path.basename(path))[0]): path
+            for path in get_temp_frame_paths(directory_path)
+        }
+        first = load_img_to_array(next(iter(paths.values())))
+        return cls(
+            list(paths),
+            lambda frame_number: load_img_to_array(paths[frame_number]),
+            fps,
+            (first.shape[1], first.shape[0]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        for frame_number in self.numbers:
+            yield frame_number, self._load(frame_number)
+
+    def read(self, frame_number: int) -> np.ndarray:
+        """
+        读取一帧的图像数组。
+        """
+        return self._load(frame_number)
+
+    def image(self, frame_number: int) -> Image.Image:
+        """
+        读取一帧的 PIL 图像。
+        """
+        return Image.fromarray(self._load(frame_number))
+
+
+@dataclass
+class OcrTable:
+    """
+    校验后的OCR结果：timeline 为字幕区间表，center 为字幕的垂直中心。
+    """
+
+    timeline: Timeline
+    center: float
+
+    def save(self, path: str):
+        """
+        保存为 JSON 文件。
+        """
+        with open(path, "w") as f:
+            json.dump(
+                {"center": self.center, "intervals": self.timeline.to_list()},
+                f,
+                ensure_ascii=False,
+                indent=4,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "OcrTable":
+        """
+        从 save 保存的 JSON 文件读取。
+        """
+        with open(path, "r") as f:
+            data = json.load(f)
+        return cls(Timeline.from_list(data["intervals"]), data["center"])
+
+
+class FrameSink:
+    """
+    擦除结果：只保存被修复的帧，其余帧直接从原帧源读取。
+
+    内存中最多保留 max_frames 个修复后的帧，超出时较早写入的帧以 .npy 文件移到临时目录，
+    读取时再加载，长视频的擦除结果不会占满内存。临时目录在 close 或对象回收时删除。
+    """
+
+    def __init__(self, source: FrameSource, max_frames: int = 240):
+        """
+        参数:
+        - source: 原帧源。
+        - max_frames: 内存中保留的修复后帧数。
+        """
+        self.source = source
+        self.max_frames = max_frames
+        self._frames: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._spilled: Dict[int, str] = {}
+        self._spill_directory = None
+
+    def put(self, frame_number: int, frame: np.ndarray):
+        """
+        写入修复后的一帧。
+        """
+        self._spilled.pop(frame_number, None)
+        self._frames[frame_number] = frame
+        self._frames.move_to_end(frame_number)
+        while len(self._frames) > self.max_frames:
+            number, spilled = self._frames.popitem(last=False)
+            if self._spill_directory is None:
+                self._spill_directory = tempfile.TemporaryDirectory(prefix="sink_")
+            path = os.path.join(self._spill_directory.name, "%04d.npy" % number)
+            np.save(path, spilled)
+            self._spilled[number] = path
+            incr("spilled_frames")
+
+    @property
+    def changed(self) -> List[int]:
+        """
+        被修复的帧号列表。
+        """
+        return sorted(set(self._frames) | set(self._spilled))
+
+    def read(self, frame_number: int) -> np.ndarray:
+        """
+        读取一帧，被修复的帧返回修复结果。
+        """
+        frame = self._frames.get(frame_number)
+        if frame is not None:
+            return frame
+        if frame_number in self._spilled:
+            return np.load(self._spilled[frame_number])
+        return self.source.read(frame_number)
+
+    def close(self):
+        """
+        删除存放溢出帧的临时目录。
+        """
+        if self._spill_directory is not None:
+            self._spill_directory.cleanup()
+            self._spill_directory = None
+        self._spilled.clear()
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        for frame_number in self.source.numbers:
+            yield frame_number, self.read(frame_number)
+
+    def save_directory(self, directory_path: str):
+        """
+        将所有帧保存为与 extract_frames 相同命名的图像文件，可用于 create_video。
+        """
+        os.makedirs(directory_path, exist_ok=True)
+        for frame_number, frame in self:
+            Image.fromarray(np.uint8(frame)).save(
+                os.path.join(directory_path, "%04d.png" % frame_number)
+            )
+
+    def write_video(
+        self, output_path: str, audio_path: str = None, output_video_quality: int = 35
+    ) -> bool:
+        """
+        通过管道编码为视频，不写入帧文件。
+
+        参数:
+        - output_path: 输出视频文件的路径。
+        - audio_path: 提供音轨的文件路径，通常为原视频。
+        - output_video_quality: 输出视频的质量。
+
+        返回:
+        - bool: 编码是否成功。
+        """
+        width, height = self.source.size
+        frames = (frame for _, frame in self)
+        return write_video(
+            frames,
+            output_path,
+            self.source.fps,
+            width,
+            height,
+            audio_path,
+            output_video_quality,
+        )
+
+
+class Pipeline:
+    """
+    以内存对象在阶段之间传递数据的处理流程：
+    FrameSource -> ocr -> OcrTable -> cues -> List[Cue] -> translate，
+    FrameSource + OcrTable -> erase -> FrameSink -> encode。
+
+    设置 save_prefix 时，同时按命令行流程的命名写出 {save_prefix}_ocr_check.json 和 SRT 字幕，
+    否则不写入任何中间文件。
+
+    示例:
+        pipeline = Pipeline(load_config())
+        source = FrameSource.from_video("video.mp4")
+        table = pipeline.ocr(source)
+        cues = pipeline.translate(pipeline.cues(table, source.fps), "English")
+        pipeline.encode(pipeline.erase(source, table), "output.mp4", "video.mp4")
+    """
+
+    def __init__(self, config: dict, ocr=None, model=None, save_prefix: str = None):
+        """
+        参数:
+        - config: 配置字典。
+        - ocr: 已加载的 PaddleOCR 实例，为 None 时在首次使用时加载。
+        - model: 已加载的 STTN 模型，为 None 时在首次使用时加载。
+        - save_prefix: 中间文件路径前缀，为 None 时不写中间文件。
+        """
+        self.config = config
+        self.save_prefix = save_prefix
+        self._ocr = ocr
+        self._model = model
+
+    def ocr(self, source: FrameSource) -> OcrTable:
+        """
+        逐帧识别字幕，并按字幕位置校验、合并和补齐。
+
+        参数:
+        - source: 帧源。
+
+        返回:
+        - OcrTable: 校验后的OCR结果。
+        """
+        if self._ocr is None:
+            self._ocr = build_ocr_model(self.config)
+        if self.config["ocr"]["sample_fps"]:
+            # 顺序读取帧并只保留一个采样间隔，二分查找回看的帧不会让帧源重新解码
+            window = FrameWindow(
+                (frame for _, frame in source),
+                get_sample_step(self.config, source.fps) + 1,
+            )
+            lines_list = sample_ocr(
+                self._ocr, window, lambda: window.count, self.config, source.fps
+            )
+            frame_lines = dict(zip(source.numbers, lines_list))
+        else:
+            frame_lines = dict(
+                iter_ocr_frames(self._ocr, iter(source), self.config, len(source))
+            )
+        width, height = source.size
+        layout = get_layout(
+            [line for lines in frame_lines.values() for line in lines],
+            self.config,
+            (height, width),
+        )
+        merged = {}
+        for frame_number, lines in frame_lines.items():
+            value = concat_lines(lines, layout)
+            if value is not None:
+                merged[frame_number] = value
+        table = OcrTable(
+            check_frames(merged, layout, self.config, source.fps), layout["center"]
+        )
+        if self.save_prefix:
+            table.timeline.save(f"{self.save_prefix}_ocr_check.json")
+        return table
+
+    def cues(self, table: OcrTable, fps: float) -> List[Cue]:
+        """
+        根据OCR结果生成字幕列表。
+
+        参数:
+        - table: ocr 的返回值。
+        - fps: 视频的帧率。
+
+        返回:
+        - List[Cue]: 字幕列表。
+        """
+        srt_path = f"{self.save_prefix}_zh_ocr.srt" if self.save_prefix else None
+        builder = CueBuilder(fps, self.config["video"]["min_duration"], srt_path)
+        for interval in table.timeline:
+            builder.add_interval(interval.start, interval.end, interval.text)
+        builder.close()
+        return [Cue(**cue) for cue in builder.cues]
+
+    def erase(self, source: FrameSource, table: OcrTable) -> FrameSink:
+        """
+        擦除字幕，只修复带字幕的帧及其前后补齐的帧。
+
+        参数:
+        - source: 帧源。
+        - table: ocr 的返回值。
+
+        返回:
+        - FrameSink: 擦除结果。
+        """
+        from modules.erase import (
+            get_device,
+            get_erase_settings,
+            get_scene_cuts,
+            group_masks,
+            inpaint_video,
+            load_sttn_model,
+            split_groups,
+        )
+
+        sink = FrameSink(source)
+        if not table.timeline:
+            return sink
+
+        def load_model():
+            # 第一组使用 STTN 修复时才加载模型
+            if self._model is None:
+                self._model = load_sttn_model(self.config, get_device())
+            return self._model
+
+        settings = get_erase_settings(self.config, source.size)
+        cuts = get_scene_cuts(
+            table.timeline,
+            source.fps,
+            len(source),
+            settings["min_frame_length"],
+            source.image,
+            self.config,
+        )
+        groups = split_groups(
+            table.timeline,
+            source.fps,
+            len(source),
+            settings["max_frame_length"],
+            settings["min_frame_length"],
+            cuts,
+        )
+        numbers_list, masks_list = group_masks(
+            groups, source.size, self.config["erase"]["mask_expand"]
+        )
+        incr("frames", sum(len(numbers) for numbers in numbers_list))
+        # 逐组读取帧并修复，内存中只保留当前一组的帧
+        for numbers, masks in zip(numbers_list, masks_list):
+            results = inpaint_video(
+                [numbers],
+                [[source.image(n) for n in numbers]],
+                [masks],
+                settings["neighbor_stride"],
+                self.config["erase"]["ckpt_p"],
+                self._model,
+                self.config,
+                load_model,
+            )
+            for frame_number, frame in results:
+                sink.put(frame_number, np.uint8(frame))
+        return sink
+
+    def translate(self, cues: List[Cue], language: str) -> List[Cue]:
+        """
+        翻译字幕文本，时间轴保持不变。
+
+        参数:
+        - cues: 字幕列表。
+        - language: 目标语言。
+
+        返回:
+        - List[Cue]: 翻译后的字幕列表。
+        """
+        from modules.translate import translate_texts
+
+        texts = translate_texts([cue.text for cue in cues], language)
+        return [Cue(cue.start, cue.end, text) for cue, text in zip(cues, texts)]
+
+    def encode(
+        self, sink: FrameSink, output_path: str, audio_path: Optional[str] = None
+    ) -> bool:
+        """
+        将擦除结果编码为视频。
+
+        参数:
+        - sink: erase 的返回值。
+        - output_path: 输出视频文件的路径。
+        - audio_path: 提供音轨的文件路径，通常为原视频。
+
+        返回:
+        - bool: 编码是否成功。
+        """
+        return sink.write_video(output_path, audio_path)
+
+    def embed(
+        self,
+        video_path: str,
+        cues: List[Cue],
+        center: float,
+        fps: float,
+        output_path: str,
+    ) -> str:
+        """
+        将字幕嵌入视频，字幕通过临时 SRT 文件传给 embed_subtitles。
+
+        参数:
+        - video_path: 视频文件的路径。
+        - cues: 字幕列表。
+        - center: 字幕的垂直中心，即 OcrTable.center。
+        - fps: 字幕帧号对应的帧率。
+        - output_path: 输出视频文件的路径。
+
+        返回:
+        - 输出视频文件的路径。
+        """
+        from modules.embed import embed_subtitles
+
+        fd, srt_path = tempfile.mkstemp(suffix=".srt")
+        os.close(fd)
+        try:
+            save_cues(cues, srt_path, fps)
+            embed_subtitles(video_path, srt_path, center, output_path, self.config)
+        finally:
+            os.remove(srt_path)
+        return output_path
+
+    def run(self, video_path: str, output_path: str, language: str = None) -> List[Cue]:
+        """
+        完成识别、擦除，并在指定 language 时翻译并嵌入字幕。
+
+        参数:
+        - video_path: 输入视频路径。
+        - output_path: 输出视频路径。
+        - language: 目标语言，为 None 时只擦除字幕。
+
+        返回:
+        - List[Cue]: 输出视频中的字幕（未翻译时为识别出的原字幕）。
+        """
+        source = FrameSource.from_video(video_path)
+        table = self.ocr(source)
+        cues = self.cues(table, source.fps)
+        sink = self.erase(source, table)
+        if language is None:
+            try:
+                self.encode(sink, output_path, video_path)
+            finally:
+                sink.close()
+            return cues
+
+        cues = self.translate(cues, language)
+        fd, erased_path = tempfile.mkstemp(suffix=os.path.splitext(output_path)[-1])
+        os.close(fd)
+        try:
+            self.encode(sink, erased_path, video_path)
+            self.embed(erased_path, cues, table.center, source.fps, output_path)
+        finally:
+            sink.close()
+            os.remove(erased_path)
+        return cues
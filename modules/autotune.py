@@ -0,0 +1,367 @@
+import itertools
+import json
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from modules.erase import (
+    TUNED_KEYS,
+    get_device,
+    get_frame_path,
+    get_machine,
+    get_scene_cuts,
+    group_frames,
+    load_sttn_model,
+)
+from modules.sttn import inpaint_video_with_builded_sttn
+from utils.image_utils import load_img
+from utils.logging_utils import update_status
+from utils.metrics_utils import current_rss_mb, peak_rss_mb
+from utils.timeline_utils import Interval, Timeline
+
+# 与参考输出完全一致时记录的 PSNR
+MAX_PSNR = 100.0
+
+
+class PeakMemory:
+    """
+    记录一段代码执行期间的峰值内存（MB）。
+
+    CUDA 上为显存分配峰值；CPU 上由后台线程定时读取进程的常驻内存，
+    不支持 /proc 的平台上退化为整个进程的最大常驻内存。
+    """
+
+    def __init__(self, device: str, interval: float = 0.02):
+        self.device = device
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.device == "cuda":
+            torch.cuda.synchronize()
+            torch.cuda.reset_peak_memory_stats()
+        else:
+            self.peak = self._rss_mb()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.device == "cuda":
+            torch.cuda.synchronize()
+            self.peak = torch.cuda.max_memory_allocated() / 1024 / 1024
+        else:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, self._rss_mb())
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self._rss_mb())
+
+    @staticmethod
+    def _rss_mb() -> float:
+        rss = current_rss_mb()
+        return peak_rss_mb() if rss is None else rss
+
+
+def sample_windows(
+    timeline: Timeline, frame_len: int, count: int, length: int
+) -> List[Timeline]:
+    """
+    从字幕区间中均匀选取若干个区间，从其起点截取一段帧作为调优的样本。
+
+    参数:
+    - timeline: 字幕区间表。
+    - frame_len: 视频的总帧数。
+    - count: 样本片段数。
+    - length: 每个片段的帧数。
+
+    返回:
+    - List[Timeline]: 每个片段内截取后的字幕区间表。
+    """
+    intervals = timeline.intervals
+    count = min(count, len(intervals))
+    windows = []
+    for i in range(count):
+        start = intervals[i * len(intervals) // count].start
+        end = min(frame_len, start + length - 1)
+        windows.append(
+            Timeline(
+                [
+                    Interval(
+                        max(start, it.start), min(end, it.end), list(it.box), it.text
+                    )
+                    for it in timeline.overlapping(start, end)
+                ]
+            )
+        )
+    return windows
+
+
+def get_grid(config: dict) -> List[dict]:
+    """
+    按配置 autotune 中各参数的候选值生成参数组合，跳过最小长度大于最大长度的组合。
+    """
+    grid = []
+    for values in itertools.product(*(config["autotune"][key] for key in TUNED_KEYS)):
+        setting = dict(zip(TUNED_KEYS, values))
+        if setting["min_frame_length"] <= setting["max_frame_length"]:
+            grid.append(setting)
+    return grid
+
+
+def get_reference(grid: List[dict]) -> dict:
+    """
+    选出计算量最大的组合（窗口最长、步长最小）作为画质参考。
+    """
+    return max(
+        grid,
+        key=lambda s: (
+            s["max_frame_length"],
+            -s["neighbor_stride"],
+            s["min_frame_length"],
+        ),
+    )
+
+
+def run_setting(
+    model,
+    windows: List[Timeline],
+    load_frame: Callable[[int], Image.Image],
+    fps: float,
+    frame_len: int,
+    setting: dict,
+    mask_expand: int,
+    device: str,
+    cuts: Optional[List[int]] = None,
+) -> tuple:
+    """
+    用一组参数修复所有样本片段。
+
+    参数:
+    - model: STTN 模型。
+    - windows: sample_windows 生成的样本片段。
+    - load_frame: 根据帧号读取 PIL 图像的函数。
+    - fps: 视频的帧率。
+    - frame_len: 视频的总帧数。
+    - setting: 包含 TUNED_KEYS 的参数字典。
+    - mask_expand: 掩膜外扩的像素数。
+    - device: 推理设备。
+    - cuts: 镜头切换的帧号，为 None 时不考虑镜头切换。
+
+    返回:
+    - tuple: (修复耗时（秒）, 峰值内存（MB）, 帧号到掩膜内像素的映射)。读帧和生成掩膜不计入耗时。
+    """
+    seconds = 0.0
+    peak = 0.0
+    outputs = {}
+    for window in windows:
+        numbers_list, frames_list, masks_list = group_frames(
+            window,
+            fps,
+            frame_len,
+            setting["max_frame_length"],
+            setting["min_frame_length"],
+            load_frame,
+            mask_expand,
+            cuts,
+        )
+        for numbers, frames, masks in zip(numbers_list, frames_list, masks_list):
+            with PeakMemory(device) as memory:
+                start = time.perf_counter()
+                result = inpaint_video_with_builded_sttn(
+                    model, numbers, frames, masks, setting["neighbor_stride"], device
+                )
+                seconds += time.perf_counter() - start
+            peak = max(peak, memory.peak)
+            for (frame_number, comp_frame), mask in zip(result, masks):
+                region = np.array(mask) != 0
+                if region.any():
+                    outputs[frame_number] = comp_frame[region]
+    return seconds, peak, outputs
+
+
+def get_psnr(reference: Dict[int, np.ndarray], outputs: Dict[int, np.ndarray]) -> float:
+    """
+    计算掩膜内像素相对参考输出的 PSNR。掩膜外的像素直接取自原帧，各组合完全相同，不参与比较。
+    """
+    common = [
+        n for n in reference if n in outputs and len(outputs[n]) == len(reference[n])
+    ]
+    if not common:
+        return 0.0
+    a = np.concatenate([reference[n] for n in common]).astype(np.float64)
+    b = np.concatenate([outputs[n] for n in common]).astype(np.float64)
+    mse = np.mean((a - b) ** 2)
+    if mse == 0:
+        return MAX_PSNR
+    return min(MAX_PSNR, 10 * math.log10(255**2 / mse))
+
+
+def choose_setting(
+    results: List[dict], min_fps: float, max_memory_mb: float, min_psnr: float
+) -> dict:
+    """
+    在满足预算且相对参考组合的 PSNR 不低于 min_psnr 的组合中选择最快的一组，速度相同时取画质更好的一组。
+
+    参考组合与自身比较的 PSNR 总是最高，只按画质选择时总会选中最慢的参考组合，因此画质只作为下限。
+    满足预算的组合都达不到 min_psnr 时取其中画质最好的一组；没有组合满足预算时取最快的一组。
+
+    参数:
+    - results: 每组参数的测量结果，包含 fps、peak_memory_mb、psnr。
+    - min_fps: 最低处理速度（帧/秒），为 0 则不限制。
+    - max_memory_mb: 峰值内存上限（MB），为 0 则不限制。
+    - min_psnr: 相对参考组合的最低 PSNR（dB）。
+
+    返回:
+    - dict: 选中的测量结果。
+    """
+    fits = [
+        r
+        for r in results
+        if (not min_fps or r["fps"] >= min_fps)
+        and (not max_memory_mb or r["peak_memory_mb"] <= max_memory_mb)
+    ]
+    if not fits:
+        update_status("Autotune: no setting fits the budget, using the fastest one")
+        return max(results, key=lambda r: r["fps"])
+    good = [r for r in fits if r["psnr"] >= min_psnr]
+    if not good:
+        update_status(
+            f"Autotune: no setting reaches {min_psnr} dB, using the best quality one"
+        )
+        return max(fits, key=lambda r: (r["psnr"], r["fps"]))
+    return max(good, key=lambda r: (r["fps"], r["psnr"]))
+
+
+def save_profile(profile_path: str, machine: dict, size: tuple, entry: dict):
+    """
+    将调优结果按分辨率写入机器配置文件。已有文件属于同一机器时保留其他分辨率的结果。
+    """
+    profile = {"machine": machine, "resolutions": {}}
+    if os.path.exists(profile_path):
+        with open(profile_path, "r") as f:
+            existing = json.load(f)
+        if existing.get("machine") == machine:
+            profile = existing
+    profile["resolutions"]["%dx%d" % size] = entry
+    os.makedirs(os.path.dirname(profile_path) or ".", exist_ok=True)
+    with open(profile_path, "w") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=4)
+
+
+def autotune(
+    timeline: Timeline,
+    frame_paths: List[str],
+    fps: float,
+    config: dict,
+    min_fps: float = 0,
+    max_memory_mb: float = 0,
+    model=None,
+) -> dict:
+    """
+    在视频的样本片段上测量 autotune 中各参数组合的速度、峰值内存和画质，
+    将满足预算的最佳组合写入 erase.profile，remove_subtitles 之后会使用这组参数。
+
+    参数:
+    - timeline: 校验后的字幕区间表。
+    - frame_paths: 视频帧的文件路径列表。
+    - fps: 视频的帧率。
+    - config: 配置字典。
+    - min_fps: 最低处理速度（帧/秒），为 0 则不限制。
+    - max_memory_mb: 峰值内存上限（MB），为 0 则不限制。
+    - model: 已加载的 STTN 模型，为 None 时根据配置加载。
+
+    返回:
+    - dict: 选中的参数及其测量结果，没有字幕时返回空字典。
+    """
+    frame_len = len(frame_paths)
+    windows = sample_windows(
+        timeline,
+        frame_len,
+        config["autotune"]["segments"],
+        config["autotune"]["segment_frames"],
+    )
+    if not windows:
+        update_status("Autotune: no subtitles to sample")
+        return {}
+    device = get_device()
+    if model is None:
+        model = load_sttn_model(config, device)
+    directory_path = os.path.split(frame_paths[0])[0]
+
+    def load_frame(frame_number: int) -> Image.Image:
+        return load_img(get_frame_path(directory_path, frame_number))
+
+    mask_expand = config["erase"]["mask_expand"]
+    # 镜头切换只检测一次，按候选中最大的最小帧长度覆盖所有组合可能补齐的帧
+    min_length = max(config["autotune"]["min_frame_length"])
+    window_cuts = [
+        get_scene_cuts(window, fps, frame_len, min_length, load_frame, config)
+        for window in windows
+    ]
+    cuts = None if window_cuts[0] is None else sorted(set().union(*window_cuts))
+    frames = sum(window.frame_count for window in windows)
+    grid = get_grid(config)
+    reference = get_reference(grid)
+    # 先跑一次参考组合预热，避免首次推理的初始化开销计入结果
+    run_setting(
+        model,
+        windows[:1],
+        load_frame,
+        fps,
+        frame_len,
+        reference,
+        mask_expand,
+        device,
+        cuts,
+    )
+
+    results = []
+    reference_outputs = None
+    for setting in [reference] + [s for s in grid if s is not reference]:
+        seconds, peak, outputs = run_setting(
+            model,
+            windows,
+            load_frame,
+            fps,
+            frame_len,
+            setting,
+            mask_expand,
+            device,
+            cuts,
+        )
+        if reference_outputs is None:
+            reference_outputs = outputs
+        result = dict(
+            setting,
+            fps=round(frames / seconds, 2),
+            peak_memory_mb=round(peak, 1),
+            psnr=round(get_psnr(reference_outputs, outputs), 2),
+        )
+        update_status(f"Autotune: {result}")
+        results.append(result)
+
+    min_psnr = config["autotune"]["min_psnr"]
+    entry = choose_setting(results, min_fps, max_memory_mb, min_psnr)
+    entry = dict(
+        entry,
+        budget={
+            "min_fps": min_fps,
+            "max_memory_mb": max_memory_mb,
+            "min_psnr": min_psnr,
+        },
+    )
+    size = Image.open(frame_paths[0]).size
+    save_profile(config["erase"]["profile"], get_machine(config), size, entry)
+    return entry
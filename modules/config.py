@@ -1,10 +1,38 @@
+import os
+
 import yaml
 
+# 配置模板，提供配置文件中缺少的键的默认值
+TEMPLATE_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config-template.yaml"
+)
+
+
+def merge_defaults(config: dict, defaults: dict) -> dict:
+    """
+    将 defaults 中 config 缺少的键递归补入 config，已有的值保持不变。
+
+    参数:
+    config (dict): 用户配置。
+    defaults (dict): 默认配置。
+
+    返回:
+    dict: 补齐后的配置。
+    """
+    for key, value in defaults.items():
+        if key not in config:
+            config[key] = value
+        elif isinstance(value, dict) and isinstance(config[key], dict):
+            merge_defaults(config[key], value)
+    return config
+
 
 def load_config(config_file: str = "config.yaml"):
     """
     加载配置文件函数。
 
+    配置文件由旧版本的模板复制而来时可能缺少新增的配置项，缺少的项使用 config-template.yaml 中的默认值。
+
     参数:
     config_file (str): 配置文件的路径。默认值为'config.yaml'。
 
@@ -12,5 +40,8 @@ def load_config(config_file: str = "config.yaml"):
     dict: 从配置文件中加载的配置信息，以字典形式返回。
     """
     with open(config_file, "r") as f:
-        config = yaml.safe_load(f)
+        config = yaml.safe_load(f) or {}
+    if os.path.exists(TEMPLATE_FILE):
+        with open(TEMPLATE_FILE, "r") as f:
+            merge_defaults(config, yaml.safe_load(f))
     return config
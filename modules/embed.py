@@ -2,6 +2,8 @@ import pysrt
 from moviepy import CompositeVideoClip, TextClip, VideoFileClip
 from pysrt.srtfile import SubRipFile, SubRipItem
 
+from utils.metrics_utils import incr
+
 
 def create_subclip(
     sub: SubRipItem, fontsize: int, position: int, font: str, font_color: str
@@ -144,6 +146,7 @@ def embed_subtitles(
     """
     video_clip = VideoFileClip(video_path)
     video_width = video_clip.size[0]
+    incr("frames", round(video_clip.duration * video_clip.fps))
 
     font = config["subtitle"]["font"]
 
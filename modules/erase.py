@@ -1,6 +1,9 @@
+import bisect
 import concurrent.futures
+import json
+import multiprocessing
 import os
-from typing import List
+from typing import Callable, List, Optional
 
 import cv2
 import numpy as np
@@ -10,6 +13,300 @@ from tqdm import tqdm
 
 from modules.sttn import build_sttn_model, inpaint_video_with_builded_sttn
 from utils.image_utils import load_img
+from utils.metrics_utils import collect_metrics, incr, track_stage
+from utils.timeline_utils import Interval, Timeline
+
+# 自动调优的参数，调优结果保存在 erase.profile 指向的机器配置文件中
+TUNED_KEYS = ["max_frame_length", "min_frame_length", "neighbor_stride"]
+
+# 检测镜头切换时帧缩小到的尺寸
+SCENE_THUMB_SIZE = (64, 36)
+
+# 并行修复时工作进程中的 STTN 模型
+_worker_model = None
+
+
+def get_device() -> str:
+    """
+    获取 STTN 推理使用的设备。
+    """
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def get_machine(config: dict) -> dict:
+    """
+    描述当前机器上 STTN 推理的运行环境，用于判断调优结果是否适用于本机。
+    """
+    device = get_device()
+    return {
+        "device": device,
+        "gpu": torch.cuda.get_device_name(0) if device == "cuda" else "",
+        "cpu_count": os.cpu_count(),
+        "backend": config["erase"]["backend"],
+    }
+
+
+def get_erase_settings(config: dict, size: tuple) -> dict:
+    """
+    获取 STTN 的分组长度和邻居帧步长。
+
+    erase.profile 指向的机器配置文件存在且与本机一致时，使用其中分辨率最接近的调优结果，
+    否则使用配置中的固定值。
+
+    参数:
+    - config: 配置字典。
+    - size: 视频帧的 (宽, 高)。
+
+    返回:
+    - dict: 包含 max_frame_length、min_frame_length、neighbor_stride。
+    """
+    settings = {key: config["erase"][key] for key in TUNED_KEYS}
+    profile_path = config["erase"]["profile"]
+    if not profile_path or not os.path.exists(profile_path):
+        return settings
+    with open(profile_path, "r") as f:
+        profile = json.load(f)
+    if profile["machine"] != get_machine(config) or not profile["resolutions"]:
+        return settings
+
+    def distance(resolution: str) -> int:
+        width, height = map(int, resolution.split("x"))
+        return abs(width * height - size[0] * size[1])
+
+    entry = profile["resolutions"][min(profile["resolutions"], key=distance)]
+    settings.update({key: entry[key] for key in TUNED_KEYS})
+    return settings
+
+
+def load_sttn_model(config: dict, device: str):
+    """
+    根据配置 erase.backend 加载 STTN 模型：torch 为 PyTorch 即时执行，onnx 为 ONNX Runtime（CPU）。
+
+    参数:
+    - config: 配置字典。
+    - device: PyTorch 后端使用的设备。
+
+    返回:
+    - 提供 encoder、infer、decoder 的 STTN 模型。
+    """
+    if config["erase"]["backend"] == "onnx":
+        from modules.sttn_onnx import build_onnx_sttn_model
+
+        return build_onnx_sttn_model(config)
+    return build_sttn_model(config["erase"]["ckpt_p"], device)
+
+
+def get_union_mask(masks: List[Image.Image]) -> np.ndarray:
+    """
+    合并一组帧的掩膜。同一区间的帧共用同一个掩膜对象，每个对象只合并一次。
+    """
+    union = None
+    seen = set()
+    for mask in masks:
+        if id(mask) in seen:
+            continue
+        seen.add(id(mask))
+        array = np.array(mask) != 0
+        union = array if union is None else union | array
+    return union
+
+
+def get_ring(region: np.ndarray, width: int) -> np.ndarray:
+    """
+    获取掩膜区域外围宽度为 width 的一圈像素，即字幕周围未被遮挡的背景。
+    """
+    size = width * 2 + 1
+    kernel = np.ones((size, size), dtype="uint8")
+    ring = cv2.dilate(region.astype("uint8"), kernel) != 0
+    return ring & ~region
+
+
+def get_static_runs(
+    frames: List[Image.Image], masks: List[Image.Image], config: dict
+) -> List[List[int]]:
+    """
+    将一组帧划分为背景静止的连续片段。
+
+    同一片段内的帧共用同一个掩膜，且掩膜外围背景与片段首帧的平均灰度差低于
+    erase.reuse_tolerance；片段只需修复首帧（及其邻居帧），其余帧复用首帧掩膜内的修复结果。
+
+    参数:
+    - frames: 一组连续帧。
+    - masks: 对应的掩膜。
+    - config: 配置字典，使用 erase.reuse_tolerance 和 erase.mask_expand。
+
+    返回:
+    - List[List[int]]: 各片段中帧的下标，按顺序排列。
+    """
+    rings = {}
+
+    def get_band(frame: Image.Image, mask: Image.Image) -> Optional[np.ndarray]:
+        # 每个掩膜对象只计算一次外围像素，比较时只裁剪外围的外接矩形
+        if id(mask) not in rings:
+            region = np.array(mask) != 0
+            ring = (
+                get_ring(region, config["erase"]["mask_expand"])
+                if region.any()
+                else None
+            )
+            box = None
+            if ring is not None:
+                ys, xs = np.nonzero(ring)
+                box = (xs.min(), ys.min(), xs.max() + 1, ys.max() + 1)
+                ring = ring[box[1] : box[3], box[0] : box[2]]
+            rings[id(mask)] = (box, ring)
+        box, ring = rings[id(mask)]
+        if ring is None:
+            return None
+        return np.array(frame.crop(box).convert("L"), dtype=np.float32)[ring]
+
+    runs = []
+    reference = None
+    for i, (frame, mask) in enumerate(zip(frames, masks)):
+        band = get_band(frame, mask)
+        if (
+            runs
+            and band is not None
+            and reference is not None
+            and masks[runs[-1][0]] is mask
+            and float(np.abs(band - reference).mean())
+            < config["erase"]["reuse_tolerance"]
+        ):
+            runs[-1].append(i)
+            continue
+        runs.append([i])
+        reference = band
+    return runs
+
+
+def inpaint_reused(
+    model,
+    paths: List[str],
+    frames: List[Image.Image],
+    masks: List[Image.Image],
+    neighbor_stride: int,
+    device: str,
+    config: dict,
+) -> List[list]:
+    """
+    只用 STTN 修复每个静止片段的首帧及其前后 neighbor_stride 帧（STTN 需要时间上相邻的帧
+    填补掩膜区域），片段内其余帧的掩膜区域直接使用首帧的修复结果。
+
+    参数:
+    - model: STTN 模型。
+    - paths: 每帧的文件路径列表。
+    - frames: 视频帧的图像列表。
+    - masks: 视频帧的掩膜列表。
+    - neighbor_stride: 邻居帧步长。
+    - device: 推理设备。
+    - config: 配置字典。
+
+    返回:
+    - [帧路径, 修复后的帧数组] 列表，顺序与输入一致。
+    """
+    runs = get_static_runs(frames, masks, config)
+    selected = sorted(
+        {
+            i
+            for run in runs
+            for i in range(
+                max(0, run[0] - neighbor_stride),
+                min(len(frames), run[0] + neighbor_stride + 1),
+            )
+        }
+    )
+    inpainted = inpaint_video_with_builded_sttn(
+        model,
+        [paths[i] for i in selected],
+        [frames[i] for i in selected],
+        [masks[i] for i in selected],
+        neighbor_stride,
+        device,
+    )
+    patches = {i: patch for i, (_, patch) in zip(selected, inpainted)}
+    incr("reused_frames", len(frames) - len(selected))
+    for run in runs:
+        region = np.array(masks[run[0]]) != 0
+        for i in run[1:]:
+            if i in patches:
+                continue
+            comp_frame = np.array(frames[i])
+            comp_frame[region] = patches[run[0]][region]
+            patches[i] = comp_frame
+    return [[paths[i], patches[i]] for i in range(len(frames))]
+
+
+def get_tier(frames: List[Image.Image], masks: List[Image.Image], config: dict) -> str:
+    """
+    根据字幕带背景的复杂度为一组帧选择修复方法。
+
+    在掩膜外围一圈的背景像素上，计算采样帧的灰度标准差（纹理）和相邻采样帧的平均灰度差（运动），
+    两者都低于阈值时（黑边、纯色、模糊背景）使用 OpenCV 修复，否则使用 STTN。
+
+    参数:
+    - frames: 一组连续帧。
+    - masks: 对应的掩膜。
+    - config: 配置字典，使用 erase.tier_texture、erase.tier_motion 和 erase.mask_expand。
+
+    返回:
+    - str: "classical" 或 "sttn"。
+    """
+    union = get_union_mask(masks)
+    if not union.any():
+        return "classical"
+    ring = get_ring(union, config["erase"]["mask_expand"])
+
+    step = max(1, len(frames) // 8)
+    bands = [
+        np.array(frame.convert("L"), dtype=np.float32)[ring] for frame in frames[::step]
+    ]
+    texture = max(float(band.std()) for band in bands)
+    motion = max(
+        [float(np.abs(a - b).mean()) for a, b in zip(bands, bands[1:])], default=0.0
+    )
+    if (
+        texture < config["erase"]["tier_texture"]
+        and motion < config["erase"]["tier_motion"]
+    ):
+        return "classical"
+    return "sttn"
+
+
+def inpaint_classical(
+    paths: List[str],
+    frames: List[Image.Image],
+    masks: List[Image.Image],
+    method: str = "telea",
+    radius: int = 5,
+) -> List[list]:
+    """
+    使用 OpenCV 逐帧修复掩膜区域，只处理掩膜外接矩形附近的区域，返回格式与 STTN 修复一致。
+
+    参数:
+    - paths: 每帧的文件路径列表。
+    - frames: 视频帧的图像列表。
+    - masks: 视频帧的掩膜列表。
+    - method: telea 或 ns。
+    - radius: 修复时参考的邻域半径。
+
+    返回:
+    - [帧路径, 修复后的帧数组] 列表。
+    """
+    flags = cv2.INPAINT_NS if method == "ns" else cv2.INPAINT_TELEA
+    result = []
+    for path, frame, mask in zip(paths, frames, masks):
+        comp_frame = np.array(frame)
+        mask = np.array(mask)
+        ys, xs = np.nonzero(mask)
+        if len(ys):
+            height, width = mask.shape
+            y0, y1 = max(0, ys.min() - radius), min(height, ys.max() + radius + 1)
+            x0, x1 = max(0, xs.min() - radius), min(width, xs.max() + radius + 1)
+            comp_frame[y0:y1, x0:x1] = cv2.inpaint(
+                comp_frame[y0:y1, x0:x1], mask[y0:y1, x0:x1], radius, flags
+            )
+        result.append([path, comp_frame])
+    return result
 
 
 @torch.no_grad()
@@ -19,6 +316,9 @@ def inpaint_video(
     masks_list: List[Image.Image],
     neighbor_stride: int,
     ckpt_p="./sttn/checkpoints/sttn.pth",
+    model=None,
+    config: Optional[dict] = None,
+    load_model: Optional[Callable[[], object]] = None,
 ):
     """
     对视频帧进行修复。
@@ -31,13 +331,18 @@ def inpaint_video(
     - masks_list: 帧掩码图像列表。
     - neighbor_stride: 邻居帧之间的步长。
     - ckpt_p: STTN 模型检查点文件路径。
+    - model: 已加载的 STTN 模型，为 None 时在第一组使用 STTN 修复时通过 load_model 加载，
+      未提供 load_model 时从 ckpt_p 加载。
+    - config: 配置字典，提供且 erase.tiered 开启时，字幕带背景简单的组改用 OpenCV 修复，
+      各方法处理的组数和帧数记录在 tier_classical_* 和 tier_sttn_* 计数器中；
+      erase.reuse_tolerance 大于 0 时，背景静止的连续帧只修复首帧及其邻居帧，见 inpaint_reused。
+    - load_model: 返回 STTN 模型的函数，所有组都用 OpenCV 修复时不会调用。
 
     返回:
     - 修复后的视频帧图像路径列表。
     """
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    # build sttn model
-    model = build_sttn_model(ckpt_p, device)
+    device = get_device()
+    tiered = config is not None and config["erase"]["tiered"]
 
     results = []
 
@@ -46,10 +351,26 @@ def inpaint_video(
         desc="Inpaint job",
         total=len(paths_list),
     ):
+        tier = get_tier(frames, masks, config) if tiered else "sttn"
+        incr(f"tier_{tier}_groups")
+        incr(f"tier_{tier}_frames", len(frames))
+        if tier == "classical":
+            results.extend(
+                inpaint_classical(paths, frames, masks, config["erase"]["tier_method"])
+            )
+            continue
+        # build sttn model
+        if model is None:
+            model = load_model() if load_model else build_sttn_model(ckpt_p, device)
         # inference
-        result = inpaint_video_with_builded_sttn(
-            model, paths, frames, masks, neighbor_stride, device
-        )
+        if config is not None and config["erase"]["reuse_tolerance"] > 0:
+            result = inpaint_reused(
+                model, paths, frames, masks, neighbor_stride, device, config
+            )
+        else:
+            result = inpaint_video_with_builded_sttn(
+                model, paths, frames, masks, neighbor_stride, device
+            )
         results.extend(result)
 
     return results
@@ -93,121 +414,542 @@ def process_frame(value: tuple):
     Image.fromarray(np.uint8(comp_frame)).save(frame_path)
 
 
+def get_frame_path(directory_path: str, frame_number: int) -> str:
+    """
+    获取 extract_frames 生成的帧文件路径。
+    """
+    return os.path.join(directory_path, "%04d.png" % frame_number)
+
+
+def get_mask_box(box: List[int], width: int, mask_expand: int = 20) -> tuple:
+    """
+    计算字幕文本框对应的掩膜矩形：左右关于画面中心对称，四周外扩 mask_expand 像素。
+
+    参数:
+    - box: 文本框 [xmin, ymin, xmax, ymax]。
+    - width: 帧宽度。
+    - mask_expand: 掩膜外扩的像素数。
+
+    返回:
+    - tuple: 矩形的 (x0, y0, x1, y1)，包含两端。
+    """
+    xmin, ymin, xmax, ymax = box
+    xwidth = min(xmin, width - xmax)
+    return (
+        max(0, xwidth - mask_expand),
+        ymin - mask_expand,
+        min(width - xwidth + mask_expand, width - 1),
+        ymax + mask_expand,
+    )
+
+
 def extract_mask(
-    mask_result: dict,
+    timeline: Timeline,
+    directory_path: str,
     fps: int,
     frame_len: int,
     max_frame_length: int,
     min_frame_length: int,
     mask_expand: int = 20,
+    cuts: Optional[List[int]] = None,
 ):
     """
-    根据掩膜结果提取连续帧的路径、图像和掩膜信息。
+    根据字幕区间表提取连续帧的路径、图像和掩膜信息。
 
-    :param mask_result: 包含每帧文件路径和其对应掩膜信息的字典。
+    :param timeline: 字幕区间表。
+    :param directory_path: 帧文件所在的目录。
     :param fps: 视频的帧率。
     :param frame_len: 视频的帧长度。
     :param max_frame_length: 最大帧长度。
     :param min_frame_length: 最小帧长度。
     :param mask_expand: 掩膜外扩的像素数。
+    :param cuts: get_scene_cuts 检测到的镜头切换，提供时组不跨越镜头切换。
     :return: 一个包含三个列表的元组，分别包含每组连续帧的路径、图像和掩膜信息。
     """
 
-    def add_frames():
-        end = frame_number
-        if frame_number_pre == frame_number:
-            end += min_frame_length
-        for i in range(frame_number_pre + 1, end):
-            if i > frame_len or i > frame_number_pre + min_frame_length:
+    def get_path(frame_number: int) -> str:
+        return get_frame_path(directory_path, frame_number)
+
+    numbers_list, frames_list, masks_list = group_frames(
+        timeline,
+        fps,
+        frame_len,
+        max_frame_length,
+        min_frame_length,
+        lambda frame_number: load_img(get_path(frame_number)),
+        mask_expand,
+        cuts,
+    )
+    paths_list = [[get_path(n) for n in numbers] for numbers in numbers_list]
+    return paths_list, frames_list, masks_list
+
+
+def get_luma_histogram(image: Image.Image, bins: int = 32) -> np.ndarray:
+    """
+    计算缩小后帧的归一化亮度直方图，用于检测镜头切换。
+    """
+    thumb = image.resize(SCENE_THUMB_SIZE, Image.BILINEAR).convert("L")
+    hist = np.array(thumb.histogram(), dtype=np.float64).reshape(bins, -1).sum(axis=1)
+    return hist / hist.sum()
+
+
+def get_scene_frames(
+    timeline: Timeline, frame_len: int, min_frame_length: int
+) -> List[int]:
+    """
+    group_frames 可能读取的帧号：每个字幕区间及其后最多 min_frame_length 个补齐帧。
+    """
+    numbers = set()
+    for interval in timeline:
+        numbers.update(
+            range(interval.start, min(interval.end + min_frame_length, frame_len) + 1)
+        )
+    return sorted(numbers)
+
+
+def get_scene_cuts(
+    timeline: Timeline,
+    fps: int,
+    frame_len: int,
+    min_frame_length: int,
+    load_frame,
+    config: dict,
+    cache_path: Optional[str] = None,
+) -> Optional[List[int]]:
+    """
+    检测字幕区间附近的镜头切换。
+
+    在 group_frames 可能读取的帧中，比较前后两帧的亮度直方图，差异（0~1）超过
+    erase.scene_threshold 的帧视为新镜头的第一帧。这些帧在字幕区间之间有间隙：短于 fps * 2 帧的间隙
+    会被 split_groups 合并进同一组，比较间隙两侧的帧；更长的间隙本来就会断开分组，不做比较。
+    各帧的差异写入 cache_path，帧号和帧率相同时直接复用，调整阈值不需要重新计算。
+
+    参数:
+    - timeline: 字幕区间表。
+    - fps: 视频的帧率，与 split_groups 一致。
+    - frame_len: 视频的总帧数。
+    - min_frame_length: 最小帧长度，决定每个区间之后检测的补齐帧数。
+    - load_frame: 根据帧号读取 PIL 图像的函数。
+    - config: 配置字典。
+    - cache_path: 缓存文件路径，为 None 时不缓存。
+
+    返回:
+    - Optional[List[int]]: 新镜头的首帧帧号，erase.scene_threshold 为 0 时返回 None。
+    """
+    threshold = config["erase"]["scene_threshold"]
+    if not threshold:
+        return None
+    numbers = get_scene_frames(timeline, frame_len, min_frame_length)
+    scores = None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "r") as f:
+            cache = json.load(f)
+        if cache["frames"] == numbers and cache.get("fps") == fps:
+            scores = cache["scores"]
+            incr("scene_cache_hits")
+    if scores is None:
+        scores = []
+        previous = (None, None)
+        for frame_number in tqdm(numbers, desc="Find Scene Cut"):
+            hist = get_luma_histogram(load_frame(frame_number))
+            score = 0.0
+            if previous[0] is not None and frame_number - previous[0] < fps * 2:
+                score = float(np.abs(hist - previous[1]).sum() / 2)
+            scores.append(score)
+            previous = (frame_number, hist)
+        if cache_path:
+            with open(cache_path, "w") as f:
+                json.dump({"frames": numbers, "fps": fps, "scores": scores}, f)
+    cuts = [n for n, score in zip(numbers, scores) if score > threshold]
+    incr("scene_cuts", len(cuts))
+    return cuts
+
+
+def split_groups(
+    timeline: Timeline,
+    fps: int,
+    frame_len: int,
+    max_frame_length: int,
+    min_frame_length: int,
+    cuts: Optional[List[int]] = None,
+) -> List[List[tuple]]:
+    """
+    将带字幕的帧切分为若干组连续帧，每组之后补齐不含字幕的帧。
+
+    相邻字幕帧相隔 fps * 2 帧及以上或组长达到 max_frame_length 时开始新的一组，
+    每组之后补齐最多 min_frame_length 帧，最后一组短于 min_frame_length 时并入前一组。
+
+    提供 cuts 时组不跨越镜头切换：在切换处断开，补齐的帧不越过切换，最后一组也不跨切换合并；
+    断开后的每段按 max_frame_length 均分长度，不会留下很短的尾组。
+
+    参数:
+    - timeline: 字幕区间表。
+    - fps: 视频的帧率。
+    - frame_len: 视频的帧长度。
+    - max_frame_length: 最大帧长度。
+    - min_frame_length: 最小帧长度。
+    - cuts: 新镜头的首帧帧号，为 None 时不考虑镜头切换。
+
+    返回:
+    - List[List[tuple]]: 每组的 (帧号, 字幕区间) 列表，补齐帧的区间为 None。
+    """
+    cut_list = sorted(cuts or [])
+    cut_set = set(cut_list)
+
+    def pad(group: list, end: int):
+        # 补齐 group 最后一帧之后、end 之前的帧
+        last = group[-1][0]
+        for i in range(last + 1, end):
+            if i > frame_len or i > last + min_frame_length or i in cut_set:
                 break
-            frame_path_ = os.path.join(os.path.split(frame_path)[0], "%04d.png" % i)
-            image_ = load_img(frame_path_)
-            mask_ = Image.fromarray(np.zeros(image_.size[::-1], dtype="uint8"))
-            paths.append(frame_path_)
-            frames.append(image_)
-            masks.append(mask_)
-
-    paths_list = []
+            group.append((i, None))
+
+    def has_cut(start: int, end: int) -> bool:
+        # start 之后、end 及之前是否有镜头切换
+        i = bisect.bisect_right(cut_list, start)
+        return i < len(cut_list) and cut_list[i] <= end
+
+    if cuts is None:
+        groups = []
+        for frame_number, interval in timeline.frames():
+            if (
+                groups
+                and frame_number - groups[-1][-1][0] < fps * 2
+                and len(groups[-1]) < max_frame_length
+            ):
+                groups[-1].append((frame_number, interval))
+            else:
+                if groups:
+                    pad(groups[-1], frame_number)
+                groups.append([(frame_number, interval)])
+    else:
+        runs = []
+        for frame_number, interval in timeline.frames():
+            if (
+                runs
+                and frame_number - runs[-1][-1][0] < fps * 2
+                and not has_cut(runs[-1][-1][0], frame_number)
+            ):
+                runs[-1].append((frame_number, interval))
+            else:
+                runs.append([(frame_number, interval)])
+        groups = []
+        for run in runs:
+            if groups:
+                pad(groups[-1], run[0][0])
+            count = -(-len(run) // max_frame_length)
+            for i in range(count):
+                groups.append(run[i * len(run) // count : (i + 1) * len(run) // count])
+    if groups:
+        pad(groups[-1], groups[-1][-1][0] + min_frame_length)
+
+    if (
+        len(groups) > 1
+        and len(groups[-1]) < min_frame_length
+        and not has_cut(groups[-2][-1][0], groups[-1][0][0])
+    ):
+        groups[-2].extend(groups.pop())
+    return groups
+
+
+def group_frames(
+    timeline: Timeline,
+    fps: int,
+    frame_len: int,
+    max_frame_length: int,
+    min_frame_length: int,
+    load_frame,
+    mask_expand: int = 20,
+    cuts: Optional[List[int]] = None,
+):
+    """
+    根据字幕区间生成掩膜，并将帧切分为若干组连续帧，供 STTN 逐组修复。
+
+    每个区间只绘制一次掩膜，区间内的各帧共用同一个掩膜图像。
+
+    :param timeline: 字幕区间表。
+    :param fps: 视频的帧率。
+    :param frame_len: 视频的帧长度。
+    :param max_frame_length: 最大帧长度。
+    :param min_frame_length: 最小帧长度。
+    :param load_frame: 根据帧号读取 PIL 图像的函数。
+    :param mask_expand: 掩膜外扩的像素数。
+    :param cuts: get_scene_cuts 检测到的镜头切换，提供时组不跨越镜头切换。
+    :return: 一个包含三个列表的元组，分别包含每组连续帧的帧号、图像和掩膜。
+    """
+
+    groups = split_groups(
+        timeline, fps, frame_len, max_frame_length, min_frame_length, cuts
+    )
+    if not groups:
+        return [], [], []
+    size = load_frame(groups[0][0][0]).size
+    numbers_list, masks_list = group_masks(groups, size, mask_expand)
     frames_list = []
-    masks_list = []
-    paths = []
-    frames = []
-    masks = []
-    frame_number_pre = 0
-    for frame_path, value in tqdm(mask_result.items(), desc="Find Mask"):
-        frame_number = int(os.path.splitext(os.path.basename(frame_path))[0])
-        image = load_img(frame_path)
-        width_ = image.size[0]
-        mask = np.zeros(image.size[::-1], dtype="uint8")
-        xmin, ymin, xmax, ymax = value["box"]
-        xwidth = min(xmin, width_ - xmax)
-        cv2.rectangle(
-            mask,
-            (max(0, xwidth - mask_expand), ymin - mask_expand),
-            (min(width_ - xwidth + mask_expand, width_ - 1), ymax + mask_expand),
-            (255, 255, 255),
-            thickness=-1,
+    with tqdm(desc="Find Mask", total=sum(len(group) for group in groups)) as progress:
+        for numbers in numbers_list:
+            frames_list.append([load_frame(n) for n in numbers])
+            progress.update(len(numbers))
+    return numbers_list, frames_list, masks_list
+
+
+def group_masks(groups: List[List[tuple]], size: tuple, mask_expand: int = 20):
+    """
+    生成 split_groups 各组的帧号和掩膜，不读取帧。
+
+    每个区间只绘制一次掩膜，区间内的各帧共用同一个掩膜图像，补齐的帧共用一个空白掩膜。
+
+    参数:
+    - groups: split_groups 的返回值。
+    - size: 帧尺寸 (宽, 高)。
+    - mask_expand: 掩膜外扩的像素数。
+
+    返回:
+    - tuple: (每组的帧号列表, 每组的掩膜列表)。
+    """
+    blank = Image.fromarray(np.zeros(size[::-1], dtype="uint8"))
+    current = (None, None)
+
+    def get_mask(interval: Optional[Interval]) -> Image.Image:
+        nonlocal current
+        if interval is None:
+            return blank
+        if current[0] is not interval:
+            mask = np.zeros(size[::-1], dtype="uint8")
+            x0, y0, x1, y1 = get_mask_box(interval.box, size[0], mask_expand)
+            cv2.rectangle(mask, (x0, y0), (x1, y1), (255, 255, 255), thickness=-1)
+            current = (interval, Image.fromarray(mask))
+        return current[1]
+
+    numbers_list = [[n for n, _ in group] for group in groups]
+    masks_list = [[get_mask(interval) for _, interval in group] for group in groups]
+    return numbers_list, masks_list
+
+
+def init_inpaint_worker(model, config: dict, threads: int):
+    """
+    初始化并行修复的工作进程：限制算子内线程数，并准备 STTN 模型。
+
+    参数:
+    - model: 权重位于共享内存中的 PyTorch 模型，各进程直接映射同一份权重；
+      为 None 时（ONNX 后端）在工作进程中加载。
+    - config: 配置字典。
+    - threads: 每个工作进程的算子内线程数。
+    """
+    global _worker_model
+    torch.set_num_threads(threads)
+    if model is None:
+        config = dict(config, erase=dict(config["erase"], onnx_threads=threads))
+        model = load_sttn_model(config, "cpu")
+    _worker_model = model
+
+
+def inpaint_group(
+    paths: List[str], masks: List[Image.Image], neighbor_stride: int, config: dict
+) -> dict:
+    """
+    在工作进程中修复一组帧：从文件读取帧，修复后直接覆盖原文件。
+
+    参数:
+    - paths: 帧文件路径列表。
+    - masks: 对应的掩膜。
+    - neighbor_stride: 邻居帧步长。
+    - config: 配置字典。
+
+    返回:
+    - dict: 修复过程中累加的计数器，由主进程合并到当前阶段。
+    """
+    with track_stage("inpaint_group", prefix="inpaint_group") as record:
+        frames = [load_img(path) for path in paths]
+        results = inpaint_video(
+            [paths],
+            [frames],
+            [masks],
+            neighbor_stride,
+            config["erase"]["ckpt_p"],
+            _worker_model,
+            config,
         )
-        mask = Image.fromarray(mask)
+        for result in results:
+            process_frame(result)
+    collect_metrics("inpaint_group")
+    return record["counters"]
 
-        if frame_number - frame_number_pre < fps * 2 and len(paths) < max_frame_length:
-            paths.append(frame_path)
-            frames.append(image)
-            masks.append(mask)
-        else:
-            if paths:
-                add_frames()
-                paths_list.append(paths)
-                frames_list.append(frames)
-                masks_list.append(masks)
-            paths = [frame_path]
-            frames = [image]
-            masks = [mask]
-        frame_number_pre = frame_number
-
-    if paths:
-        add_frames()
-        paths_list.append(paths)
-        frames_list.append(frames)
-        masks_list.append(masks)
-
-    if len(paths_list[-1]) < min_frame_length:
-        paths = paths_list.pop()
-        paths_list[-1].extend(paths)
-        frames = frames_list.pop()
-        frames_list[-1].extend(frames)
-        masks = masks_list.pop()
-        masks_list[-1].extend(masks)
 
-    return paths_list, frames_list, masks_list
+def use_worker_pool(config: dict) -> bool:
+    """
+    是否使用进程池并行修复：在 CPU 上且 erase.workers 大于 1。
+    """
+    return config["erase"]["workers"] > 1 and get_device() == "cpu"
 
 
-def remove_subtitles(ocr_result: dict, fps: float, frame_len: int, config: dict):
+def inpaint_parallel(
+    paths_list: List[List[str]],
+    masks_list: List[List[Image.Image]],
+    neighbor_stride: int,
+    config: dict,
+    model=None,
+    on_done: Optional[Callable[[int], None]] = None,
+):
+    """
+    使用进程池并行修复各组帧，每个工作进程加载一次模型并使用较少的算子内线程。
+
+    PyTorch 模型的权重先移动到共享内存，再传给 spawn 启动的工作进程，各进程不复制权重。
+    结果按组的顺序收集，on_done 的调用顺序与串行修复一致。
+
+    参数:
+    - paths_list: 每组帧的文件路径列表。
+    - masks_list: 每组帧的掩膜。
+    - neighbor_stride: 邻居帧步长。
+    - config: 配置字典，使用 erase.workers 和 erase.worker_threads。
+    - model: 已加载的 PyTorch STTN 模型；为 None 或 ONNX 模型时由各工作进程自己加载，
+      调用方使用 ONNX 后端时不需要在主进程中加载。
+    - on_done: 每组修复并保存后调用，参数为组序号。
+    """
+    workers = config["erase"]["workers"]
+    threads = config["erase"]["worker_threads"] or max(
+        1, (os.cpu_count() or 1) // workers
+    )
+    if isinstance(model, torch.nn.Module):
+        model.share_memory()
+    else:
+        model = None
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_inpaint_worker,
+        initargs=(model, config, threads),
+    ) as executor:
+        futures = [
+            executor.submit(inpaint_group, paths, masks, neighbor_stride, config)
+            for paths, masks in zip(paths_list, masks_list)
+        ]
+        for i, future in enumerate(
+            tqdm(futures, desc="Inpaint job", total=len(futures))
+        ):
+            for key, value in future.result().items():
+                incr(key, value)
+            if on_done:
+                on_done(i)
+
+
+def remove_subtitles(
+    timeline: Timeline,
+    frame_paths: List[str],
+    fps: float,
+    config: dict,
+    model=None,
+    on_progress: Optional[Callable[[int], None]] = None,
+):
     """
     移除视频中的字幕。
 
     参数:
-    - ocr_result: dict, OCR 识别的结果，包含需要移除的字幕信息。
+    - timeline: Timeline, 校验后的字幕区间表，包含需要移除的字幕信息。
+    - frame_paths: List[str], 视频帧的文件路径列表，修复后的帧直接覆盖原文件。
     - fps: float, 视频的帧率，用于计算视频处理的速度。
-    - frame_len: int, 帧的长度，用于调整视频处理的精度。
-    - config: dict, 配置文件，包含视频处理的参数。
+    - config: dict, 配置文件，包含视频处理的参数。存在与本机一致的 erase.profile 时，
+      分组长度和邻居帧步长使用其中的调优结果。
+    - model: 已加载的 STTN 模型，为 None 时在第一组使用 STTN 修复时根据配置加载。
+    - on_progress: 进度回调，提供时逐组修复并保存，每组完成后以已确定的最大帧序号调用，
+      该帧及之前的帧不会再被修改。
+
+    在 CPU 上且 erase.workers 大于 1 时，各组由进程池并行修复。
+    erase.scene_threshold 大于 0 时分组不跨越镜头切换，检测结果缓存在帧目录旁的 _scene_cuts.json。
 
     返回值:
     无。
     """
-    paths_list, frames_list, masks_list = extract_mask(
-        ocr_result,
+    frame_len = len(frame_paths)
+    if not timeline:
+        if on_progress:
+            on_progress(frame_len)
+        return
+    models = [model]
+
+    def load_model():
+        # 第一组使用 STTN 修复时才加载模型，分层修复时所有组都用 OpenCV 修复则不加载
+        if models[0] is None:
+            models[0] = load_sttn_model(config, get_device())
+        return models[0]
+
+    directory_path = os.path.split(frame_paths[0])[0]
+    size = Image.open(frame_paths[0]).size
+    settings = get_erase_settings(config, size)
+
+    def load_frame(frame_number: int) -> Image.Image:
+        return load_img(get_frame_path(directory_path, frame_number))
+
+    cuts = get_scene_cuts(
+        timeline,
         fps,
         frame_len,
-        config["erase"]["max_frame_length"],
-        config["erase"]["min_frame_length"],
-        config["erase"]["mask_expand"],
+        settings["min_frame_length"],
+        load_frame,
+        config,
+        f"{directory_path}_scene_cuts.json",
     )
-    results = inpaint_video(
-        paths_list,
-        frames_list,
-        masks_list,
-        config["erase"]["neighbor_stride"],
-        config["erase"]["ckpt_p"],
+    # 只生成帧号和掩膜，帧在修复时才读取：并行修复由工作进程自己读帧
+    groups = split_groups(
+        timeline,
+        fps,
+        frame_len,
+        settings["max_frame_length"],
+        settings["min_frame_length"],
+        cuts,
     )
-    inpaint_imag(results)
+    numbers_list, masks_list = group_masks(groups, size, config["erase"]["mask_expand"])
+    paths_list = [
+        [get_frame_path(directory_path, n) for n in numbers] for numbers in numbers_list
+    ]
+    incr("frames", sum(len(paths) for paths in paths_list))
+
+    def done_frame(i: int) -> int:
+        # 下一组之前的帧都已确定，最后一组之后的帧不含字幕
+        return min(numbers_list[i + 1]) - 1 if i + 1 < len(numbers_list) else frame_len
+
+    def on_done(i: int):
+        if on_progress:
+            on_progress(done_frame(i))
+
+    if use_worker_pool(config):
+        # PyTorch 模型在主进程加载一次，权重通过共享内存传给工作进程；
+        # ONNX 会话无法共享，由各工作进程自己加载，主进程不加载
+        if config["erase"]["backend"] != "onnx":
+            model = load_model()
+        inpaint_parallel(
+            paths_list,
+            masks_list,
+            settings["neighbor_stride"],
+            config,
+            model,
+            on_done,
+        )
+        return
+    if on_progress is None:
+        results = inpaint_video(
+            paths_list,
+            [[load_img(path) for path in paths] for paths in paths_list],
+            masks_list,
+            settings["neighbor_stride"],
+            config["erase"]["ckpt_p"],
+            model,
+            config,
+            load_model,
+        )
+        inpaint_imag(results)
+        return
+
+    for i, (paths, masks) in enumerate(zip(paths_list, masks_list)):
+        results = inpaint_video(
+            [paths],
+            [[load_img(path) for path in paths]],
+            [masks],
+            settings["neighbor_stride"],
+            config["erase"]["ckpt_p"],
+            model,
+            config,
+            load_model,
+        )
+        inpaint_imag(results)
+        on_done(i)
@@ -0,0 +1,191 @@
+import os
+from typing import List, Optional, Tuple
+
+import pysrt
+
+from utils.video_utils import detect_size, run_ffmpeg
+
+# 语言名称对应的 ISO 639-2 代码，写入字幕流的 language 元数据
+LANGUAGE_CODES = {
+    "Chinese": "chi",
+    "English": "eng",
+    "Japanese": "jpn",
+    "Korean": "kor",
+    "French": "fre",
+    "German": "ger",
+    "Spanish": "spa",
+    "Portuguese": "por",
+    "Russian": "rus",
+    "Italian": "ita",
+    "Arabic": "ara",
+    "Vietnamese": "vie",
+    "Thai": "tha",
+    "Indonesian": "ind",
+}
+
+
+def get_subtitle_codec(output_path: str) -> str:
+    """
+    根据输出容器选择字幕流编码：MP4/MOV 使用 mov_text，MKV 使用 ASS，WebM 使用 WebVTT。
+    """
+    ext = os.path.splitext(output_path)[-1].lower()
+    if ext == ".mkv":
+        return "ass"
+    if ext == ".webm":
+        return "webvtt"
+    return "mov_text"
+
+
+def color_to_ass(color: str) -> str:
+    """
+    将 #RRGGBB 颜色转换为 ASS 的 &H00BBGGRR 格式。
+    """
+    color = color.lstrip("#")
+    return f"&H00{color[4:6]}{color[2:4]}{color[0:2]}".upper()
+
+
+def format_ass_time(ordinal: int) -> str:
+    """
+    将毫秒数格式化为 ASS 的 H:MM:SS.cc 时间格式。
+    """
+    cs = ordinal // 10
+    sec, cs = divmod(cs, 100)
+    min, sec = divmod(sec, 60)
+    hr, min = divmod(min, 60)
+    return f"{hr}:{min:02}:{sec:02}.{cs:02}"
+
+
+def get_font_name(font: str) -> Tuple[str, bool]:
+    """
+    读取字体文件的字体族名称和是否为粗体，读取失败时使用文件名。
+    """
+    try:
+        from PIL import ImageFont
+
+        family, style = ImageFont.truetype(font).getname()
+        return family, "Bold" in style
+    except Exception:
+        return os.path.splitext(os.path.basename(font))[0], False
+
+
+def srt_to_ass(
+    srt_path: str,
+    ass_path: str,
+    width: int,
+    height: int,
+    y_center: float,
+    config: dict,
+) -> str:
+    """
+    将 SRT 字幕转换为 ASS 字幕，字体、字号、颜色和位置与硬字幕模式的配置一致。
+
+    参数:
+    - srt_path: SRT 文件路径。
+    - ass_path: ASS 文件路径。
+    - width: 视频宽度。
+    - height: 视频高度。
+    - y_center: 原字幕的垂直中心，subtitle.position 为 0 时使用。
+    - config: 配置字典。
+
+    返回:
+    - ASS 文件路径。
+    """
+    fontsize = config["subtitle"]["font_size"]
+    if fontsize == 0:
+        fontsize = int(width * config["subtitle"]["width_ratio"] / 15)
+    position = config["subtitle"]["position"] or y_center
+    if 0 < position < 1:
+        position *= height
+    margin_v = max(0, int(height - position - fontsize / 2))
+    margin_h = int(width * (1 - config["subtitle"]["width_ratio"]) / 2)
+    font_name, bold = get_font_name(config["subtitle"]["font"])
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        f"PlayResX: {width}",
+        f"PlayResY: {height}",
+        "WrapStyle: 0",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Default,{font_name},{fontsize},"
+        f"{color_to_ass(config['subtitle']['font_color'])},&H000000FF,&H00000000,"
+        f"&H80000000,{-1 if bold else 0},0,0,0,100,100,0,0,1,2,0,2,"
+        f"{margin_h},{margin_h},{margin_v},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+    for sub in pysrt.open(srt_path):
+        text = sub.text.strip().replace("\n", "\\N")
+        lines.append(
+            f"Dialogue: 0,{format_ass_time(sub.start.ordinal)},"
+            f"{format_ass_time(sub.end.ordinal)},Default,,0,0,0,,{text}"
+        )
+    with open(ass_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return ass_path
+
+
+def mux_subtitles(
+    video_path: str,
+    tracks: List[Tuple[Optional[str], str]],
+    y_center: float,
+    output_path: str,
+    config: dict,
+) -> bool:
+    """
+    将字幕作为字幕流封装进视频，视频和音频流直接复制，不重新编码。
+
+    MKV 输出时先把 SRT 转换为带样式的 ASS，并附加字幕字体；MP4 输出使用 mov_text，
+    样式由播放器决定。
+
+    参数:
+    - video_path: 擦除字幕后的视频路径。
+    - tracks: (语言, SRT 文件路径) 列表，每项生成一条字幕流，第一条为默认字幕。
+    - y_center: 原字幕的垂直中心。
+    - output_path: 输出视频路径。
+    - config: 配置字典。
+
+    返回:
+    - bool: 表示FFmpeg命令执行是否成功的布尔值。
+    """
+    codec = get_subtitle_codec(output_path)
+    subtitle_paths = [srt_path for _, srt_path in tracks]
+    if codec == "ass":
+        width, height = detect_size(video_path)
+        subtitle_paths = [
+            srt_to_ass(
+                srt_path,
+                os.path.splitext(srt_path)[0] + ".ass",
+                width,
+                height,
+                y_center,
+                config,
+            )
+            for srt_path in subtitle_paths
+        ]
+
+    commands = ["-i", video_path]
+    for subtitle_path in subtitle_paths:
+        commands.extend(["-i", subtitle_path])
+    commands.extend(["-map", "0:v", "-map", "0:a?"])
+    for i in range(len(subtitle_paths)):
+        commands.extend(["-map", f"{i + 1}:0"])
+    commands.extend(["-c:v", "copy", "-c:a", "copy", "-c:s", codec])
+    for i, (language, _) in enumerate(tracks):
+        if language:
+            code = LANGUAGE_CODES.get(language, "und")
+            commands.extend([f"-metadata:s:s:{i}", f"language={code}"])
+            commands.extend([f"-metadata:s:s:{i}", f"title={language}"])
+    commands.extend(["-disposition:s:0", "default"])
+    font = config["subtitle"]["font"]
+    if codec == "ass" and os.path.exists(font):
+        commands.extend(
+            ["-attach", font, "-metadata:s:t:0", "mimetype=application/x-truetype-font"]
+        )
+    commands.extend(["-y", output_path])
+    return run_ffmpeg(commands)
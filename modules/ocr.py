@@ -1,19 +1,28 @@
 import json
 import logging
+import math
 import os
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterator, List
 
 import numpy as np
-from paddleocr import PaddleOCR
+from PIL import Image
 from tqdm import tqdm
 
 from utils.image_utils import load_img_to_array
+from utils.metrics_utils import incr
+from utils.timeline_utils import Timeline
+from utils.video_utils import TEMP_FRAME_FORMAT, detect_size, read_band_frames
+
+if TYPE_CHECKING:
+    from paddleocr import PaddleOCR
 
 logging.disable(logging.DEBUG)
 logging.disable(logging.WARNING)
 
 
-def extract_subtitles(frame_paths: List[str], config: dict, fps: float):
+def extract_subtitles(
+    frame_paths: List[str], config: dict, fps: float, ocr: "PaddleOCR" = None
+):
     """
     从视频帧中提取字幕。
 
@@ -23,25 +32,102 @@ def extract_subtitles(frame_paths: List[str], config: dict, fps: float):
     - frame_paths: 视频帧的文件路径列表。
     - config: 配置字典，包含OCR和字幕提取的配置信息。
     - fps: 视频的帧率，用于时间计算。
+    - ocr: 已加载的 PaddleOCR 实例，为 None 时根据配置新建。
 
     返回:
-    - subtitles: 字幕文本。
+    - timeline: 字幕区间表。
     - center: 字幕文本的中心位置。
     """
     file_name = os.path.split(frame_paths[0])[0]
-    ocr = PaddleOCR(
+    if ocr is None:
+        ocr = build_ocr_model(config)
+    ocr_result = get_ocr_result(ocr, frame_paths, config, fps)
+    save_ocr_result(ocr_result, f"{file_name}_ocr.json")
+
+    timeline, center = check_ocr_result(ocr_result, config, fps, frame_paths[0])
+    timeline.save(f"{file_name}_ocr_check.json")
+
+    return timeline, center
+
+
+def extract_band_subtitles(
+    video_path: str,
+    prefix: str,
+    config: dict,
+    fps: float,
+    ocr: "PaddleOCR" = None,
+):
+    """
+    直接从视频解码字幕区域并提取字幕，不读取完整的帧文件。
+
+    ffmpeg 只输出 ocr.min_height_ratio 到 ocr.max_height_ratio 之间的横条，可按 ocr.band_scale 缩小、
+    按 ocr.band_gray 以灰度输出；识别结果换算回整帧坐标，与 extract_subtitles 的结果格式一致。
+    配置了 ocr.sample_fps 时使用稀疏采样识别，解码的字幕区域只在内存中保留一个采样间隔。
+
+    参数:
+    - video_path: 视频文件的路径。
+    - prefix: 中间产物路径前缀，结果中的帧路径与 extract_frames 生成的帧文件一致。
+    - config: 配置字典。
+    - fps: 视频的帧率。
+    - ocr: 已加载的 PaddleOCR 实例，为 None 时根据配置新建。
+
+    返回:
+    - timeline: 字幕区间表。
+    - center: 字幕文本的中心位置。
+    """
+    if ocr is None:
+        ocr = build_ocr_model(config)
+    width, height = detect_size(video_path)
+    top, bottom = get_band_rows(height, config)
+    scale = config["ocr"]["band_scale"]
+    frames = read_band_frames(
+        video_path, fps, width, top, bottom, scale, config["ocr"]["band_gray"]
+    )
+    if config["ocr"]["sample_fps"]:
+        window = FrameWindow(frames, get_sample_step(config, fps) + 1)
+        frame_lines = enumerate(
+            sample_ocr(
+                ocr, window, lambda: window.count, config, fps, band=(top, scale)
+            ),
+            1,
+        )
+    else:
+        frame_lines = iter_ocr_frames(
+            ocr, enumerate(frames, 1), config, band=(top, scale)
+        )
+    ocr_result = {}
+    for frame_number, lines in frame_lines:
+        frame_path = os.path.join(prefix, "%04d.%s" % (frame_number, TEMP_FRAME_FORMAT))
+        for idx, line in enumerate(lines):
+            ocr_result[frame_path + f",{idx}"] = line
+    save_ocr_result(ocr_result, f"{prefix}_ocr.json")
+
+    timeline, center = check_ocr_result(
+        ocr_result, config, fps, None, (height, width, 3)
+    )
+    timeline.save(f"{prefix}_ocr_check.json")
+
+    return timeline, center
+
+
+def build_ocr_model(config: dict) -> "PaddleOCR":
+    """
+    根据配置构建 PaddleOCR 模型，paddleocr 在首次使用时才导入。
+
+    参数:
+    - config: 配置字典，包含OCR的语言和模型路径。
+
+    返回:
+    - PaddleOCR 实例。
+    """
+    from paddleocr import PaddleOCR
+
+    return PaddleOCR(
         use_angle_cls=False,
         lang=config["ocr"]["lang"],
         det_model_dir=config["ocr"]["det_model_dir"],
         rec_model_dir=config["ocr"]["rec_model_dir"],
     )
-    ocr_result = get_ocr_result(ocr, frame_paths, config)
-    save_ocr_result(ocr_result, f"{file_name}_ocr.json")
-
-    ocr_result, center = check_ocr_result(ocr_result, config, fps, frame_paths[0])
-    save_ocr_result(ocr_result, f"{file_name}_ocr_check.json")
-
-    return ocr_result, center
 
 
 def save_ocr_result(ocr_result: dict, ocr_path: str):
@@ -59,6 +145,20 @@ def save_ocr_result(ocr_result: dict, ocr_path: str):
         json.dump(ocr_result, f, ensure_ascii=False, indent=4)
 
 
+def load_ocr_result(ocr_path: str) -> dict:
+    """
+    从JSON文件中读取保存的OCR识别结果。
+
+    参数:
+    - ocr_path: OCR结果文件路径
+
+    返回:
+    - OCR识别的结果字典
+    """
+    with open(ocr_path, "r") as f:
+        return json.load(f)
+
+
 def sort_ocr_result(ocr_result: List[List]):
     """
     对OCR识别结果进行排序，以确定文本的垂直位置。
@@ -101,7 +201,160 @@ def sort_ocr_result(ocr_result: List[List]):
     return sorted_ocr_result
 
 
-def get_ocr_result(ocr: PaddleOCR, frame_paths: List[str], config: dict):
+def crop_box(img_array: np.ndarray, box: List[List[float]], pad: int = 0):
+    """
+    按文本框的外接矩形从图像中裁剪出识别输入。
+
+    参数:
+    img_array: 图像数组。
+    box: 文本框的四个顶点坐标。
+    pad: 向外扩展的像素数。
+
+    返回:
+    裁剪后的图像数组。
+    """
+    xs = [point[0] for point in box]
+    ys = [point[1] for point in box]
+    height, width = img_array.shape[:2]
+    x1 = max(0, int(min(xs)) - pad)
+    x2 = min(width, int(math.ceil(max(xs))) + pad)
+    y1 = max(0, int(min(ys)) - pad)
+    y2 = min(height, int(math.ceil(max(ys))) + pad)
+    return img_array[y1:y2, x1:x2]
+
+
+def recognize_boxes(
+    ocr: "PaddleOCR", img_array: np.ndarray, boxes: List, drop_score: float = 0.5
+):
+    """
+    只运行文本识别（det=False），识别图像中已知文本框内的文字。
+
+    参数:
+    ocr: PaddleOCR对象。
+    img_array: 文本框坐标所在的图像数组，可以是单通道的灰度图。
+    boxes: 文本框列表，每个文本框为四个顶点坐标。
+    drop_score: 识别置信度阈值，低于阈值的结果被丢弃，与 PaddleOCR 默认值一致。
+
+    返回:
+    与 ocr.ocr(det=True, rec=True) 格式一致的 [box, (text, score)] 列表。
+    """
+    crops = [crop_box(img_array, box) for box in boxes]
+    if img_array.ndim == 2:
+        # 识别模型只接受三通道输入，灰度图只复制裁剪出的文本框
+        crops = [np.repeat(crop[:, :, None], 3, axis=2) for crop in crops]
+    keep = [i for i, crop in enumerate(crops) if crop.size > 0]
+    if not keep:
+        return []
+    results = ocr.ocr([crops[i] for i in keep], cls=False, det=False, rec=True)
+    incr("ocr_rec_calls")
+    return [
+        [boxes[i], tuple(rec)]
+        for i, rec in zip(keep, results[0])
+        if rec[0] and rec[1] >= drop_score
+    ]
+
+
+def run_ocr(ocr: "PaddleOCR", img_array: np.ndarray, config: dict):
+    """
+    对字幕区域执行一次OCR。
+
+    配置 ocr.det_target_side 大于 0 且图像长边超过该值时，先将图像缩小到该长边长度做文本检测，
+    再把检测框映射回原始坐标，从全分辨率图像中裁剪文本框做识别；
+    检测耗时随尺寸平方增长，而字幕字形较大，缩小后检测仍然可靠，识别精度不受影响。
+
+    参数:
+    ocr: PaddleOCR对象。
+    img_array: 字幕区域的图像数组，可以是单通道的灰度图，PaddleOCR 检测前自行转换为三通道。
+    config: 配置字典。
+
+    返回:
+    与 ocr.ocr(...)[0] 格式一致的 [box, (text, score)] 列表，未识别到文字时返回 None 或空列表。
+    """
+    incr("ocr_calls")
+    det_target_side = config["ocr"]["det_target_side"]
+    long_side = max(img_array.shape[:2])
+    if not det_target_side or long_side <= det_target_side:
+        return ocr.ocr(img_array, cls=False, det=True, rec=True)[0]
+
+    scale = det_target_side / long_side
+    height, width = img_array.shape[:2]
+    small = Image.fromarray(img_array).resize(
+        (max(1, round(width * scale)), max(1, round(height * scale))), Image.BILINEAR
+    )
+    boxes = ocr.ocr(np.array(small), cls=False, det=True, rec=False)[0]
+    incr("ocr_det_calls")
+    if not boxes:
+        return None
+    boxes = [[[x / scale, y / scale] for x, y in box] for box in boxes]
+    return recognize_boxes(ocr, img_array, boxes)
+
+
+def box_energy(img_array: np.ndarray, boxes: List):
+    """
+    计算文本框内部和周围一圈区域的平均边缘能量，用于低成本判断字幕是否变化。
+
+    参数:
+    img_array: 图像数组，可以是单通道的灰度图。
+    boxes: 文本框列表，每个文本框为四个顶点坐标。
+
+    返回:
+    (inner, ring): 文本框外接矩形内的平均梯度幅值，以及向外扩展半个框高的环形区域内的平均梯度幅值。
+    """
+    gray = img_array.astype(np.float32)
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+    edges = np.zeros_like(gray)
+    edges[:, 1:] += np.abs(np.diff(gray, axis=1))
+    edges[1:, :] += np.abs(np.diff(gray, axis=0))
+
+    height, width = gray.shape
+    inner_sum = inner_area = outer_sum = outer_area = 0.0
+    for box in boxes:
+        xs = [point[0] for point in box]
+        ys = [point[1] for point in box]
+        x1, x2 = max(0, int(min(xs))), min(width, int(math.ceil(max(xs))))
+        y1, y2 = max(0, int(min(ys))), min(height, int(math.ceil(max(ys))))
+        margin = max(1, (y2 - y1) // 2)
+        ox1, ox2 = max(0, x1 - margin), min(width, x2 + margin)
+        oy1, oy2 = max(0, y1 - margin), min(height, y2 + margin)
+        inner_sum += edges[y1:y2, x1:x2].sum()
+        inner_area += max(0, (y2 - y1) * (x2 - x1))
+        outer_sum += edges[oy1:oy2, ox1:ox2].sum()
+        outer_area += max(0, (oy2 - oy1) * (ox2 - ox1))
+
+    inner = inner_sum / inner_area if inner_area else 0.0
+    ring_area = outer_area - inner_area
+    ring = (outer_sum - inner_sum) / ring_area if ring_area > 0 else 0.0
+    return inner, ring
+
+
+def boxes_unchanged(reference: tuple, current: tuple, tolerance: float) -> bool:
+    """
+    比较文本框内外的边缘能量，判断缓存的文本框是否仍然有效。
+
+    字幕消失时框内能量下降，出现更长或位置不同的字幕时框外能量上升，两者任一超出容忍度即视为失效。
+
+    参数:
+    reference: 检测时记录的 (inner, ring)。
+    current: 当前帧的 (inner, ring)。
+    tolerance: 相对检测时框内能量的允许变化比例。
+
+    返回:
+    缓存的文本框是否仍可直接用于识别。
+    """
+    inner_ref, ring_ref = reference
+    inner, ring = current
+    if inner_ref <= 0:
+        return False
+    return (
+        abs(inner - inner_ref) <= tolerance * inner_ref
+        and abs(ring - ring_ref) <= tolerance * inner_ref
+    )
+
+
+def get_ocr_result(
+    ocr: "PaddleOCR", frame_paths: List[str], config: dict, fps: float = None
+):
     """
     对一系列图像帧进行OCR识别，提取并整理文本信息及其在图像中的位置。
 
@@ -109,64 +362,391 @@ def get_ocr_result(ocr: PaddleOCR, frame_paths: List[str], config: dict):
     ocr: PaddleOCR对象，用于执行OCR识别。
     frame_paths: 图像帧的文件路径列表。
     config: 配置字典，包含OCR和字幕提取的配置信息。
+    fps: 视频的帧率，提供且配置了 ocr.sample_fps 时使用稀疏采样识别，见 sample_ocr_frames。
 
     返回:
     包含每帧中识别到的文本及其位置信息的字典。
     """
-    img_array = load_img_to_array(frame_paths[0])
-    min_height = int(img_array.shape[0] * config["ocr"]["min_height_ratio"])
-    max_height = int(img_array.shape[0] * config["ocr"]["max_height_ratio"])
-
     ocr_result = {}
-    for frame_path in tqdm(frame_paths, desc="OCR"):
-        img_array = load_img_to_array(frame_path)
-        results = ocr.ocr(img_array[min_height:max_height, :, :], cls=False, det=True, rec=True)
-        result = results[0]
-        if result is None:
-            continue
-        result = sort_ocr_result(result)
-        for idx, line in enumerate(result):
-            coords, texts = line
-            x1, y1 = coords[0]
-            x2, y2 = coords[1]
-            x3, y3 = coords[2]
-            x4, y4 = coords[3]
-
-            xmin = int(max(x1, x4))
-            xmax = int(min(x2, x3))
-            ymin = int(max(y1, y2)) + min_height
-            ymax = int(min(y3, y4)) + min_height
-
-            text = texts[0]
-            ocr_result[frame_path + f",{idx}"] = {
-                "box": [xmin, ymin, xmax, ymax],
-                "text": text,
-            }
+    if fps and config["ocr"]["sample_fps"]:
+        frame_lines = sample_ocr_frames(
+            ocr,
+            list(range(len(frame_paths))),
+            lambda i: load_img_to_array(frame_paths[i]),
+            config,
+            fps,
+        )
+        for i, lines in frame_lines.items():
+            for idx, line in enumerate(lines):
+                ocr_result[frame_paths[i] + f",{idx}"] = line
+        return ocr_result
+    for _, frame_result in iter_ocr_result(ocr, frame_paths, config):
+        ocr_result.update(frame_result)
     return ocr_result
 
 
-def check_ocr_result(ocr_result: dict, config: dict, fps: float, frame_path: str):
+def iter_ocr_result(ocr: "PaddleOCR", frame_paths: List[str], config: dict):
     """
-    根据配置参数和视频帧率，校验并整合OCR识别结果。
+    逐帧进行OCR识别，每识别完一帧即返回该帧的结果。
 
     参数:
-    ocr_result: dict - OCR识别结果，键为帧路径，值为包含文字信息和 bounding box 的字典。
+    ocr: PaddleOCR对象，用于执行OCR识别。
+    frame_paths: 图像帧的文件路径列表。
+    config: 配置字典，包含OCR和字幕提取的配置信息。
+
+    返回:
+    生成器，依次产出 (frame_path, frame_result)，frame_result 的格式与 get_ocr_result 的返回值一致，
+    未识别到文字的帧为空字典。
+    """
+    frames = ((frame_path, load_img_to_array(frame_path)) for frame_path in frame_paths)
+    for frame_path, lines in iter_ocr_frames(ocr, frames, config, len(frame_paths)):
+        yield frame_path, {
+            frame_path + f",{idx}": line for idx, line in enumerate(lines)
+        }
+
+
+def get_band_rows(height: int, config: dict) -> tuple:
+    """
+    根据 ocr.min_height_ratio 和 ocr.max_height_ratio 计算字幕区域的起止行。
+    """
+    return (
+        int(height * config["ocr"]["min_height_ratio"]),
+        int(height * config["ocr"]["max_height_ratio"]),
+    )
+
+
+def iter_ocr_frames(
+    ocr: "PaddleOCR", frames, config: dict, total: int = None, band: tuple = None
+):
+    """
+    逐帧识别内存中的图像，每识别完一帧即返回该帧的文本行。
+
+    配置 ocr.track 为 true 时，检测到文本框后的后续帧只在缓存的文本框上做识别，
+    并用文本框内外的边缘能量校验文本框是否仍然有效；校验失败、识别为空或距上次检测超过
+    ocr.track_max_interval 帧时重新检测。
+
+    参数:
+    ocr: PaddleOCR对象，用于执行OCR识别。
+    frames: 可迭代对象，依次产出 (key, img_array)，key 为帧路径或帧号。
+    config: 配置字典，包含OCR和字幕提取的配置信息。
+    total: 帧数，用于显示进度。
+    band: 为 None 时 frames 为整帧；为 (起始行, 缩放比例) 时 frames 为已裁剪（和缩放）的字幕区域，
+      文本框坐标据此换算回整帧坐标。
+
+    返回:
+    生成器，依次产出 (key, lines)，lines 为按位置排序的 {"box": [xmin, ymin, xmax, ymax], "text": text} 列表。
+    """
+    track = config["ocr"]["track"]
+    max_interval = config["ocr"]["track_max_interval"]
+    tolerance = config["ocr"]["track_tolerance"]
+
+    min_height = max_height = None
+    scale = 1.0
+    if band is not None:
+        min_height, scale = band
+    boxes, reference, since_detect = [], None, 0
+    for key, img_array in tqdm(frames, desc="OCR", total=total):
+        if band is not None:
+            band_array = img_array
+        else:
+            if min_height is None:
+                min_height, max_height = get_band_rows(img_array.shape[0], config)
+            band_array = img_array[min_height:max_height]
+        incr("frames")
+
+        result = None
+        if track and boxes and since_detect < max_interval:
+            if boxes_unchanged(reference, box_energy(band_array, boxes), tolerance):
+                result = recognize_boxes(ocr, band_array, boxes)
+            if result:
+                since_detect += 1
+                incr("ocr_tracked")
+        if not result:
+            result = run_ocr(ocr, band_array, config)
+            boxes = [line[0] for line in result] if result else []
+            if track and boxes:
+                reference = box_energy(band_array, boxes)
+            since_detect = 0
+        yield key, to_lines(result, min_height, scale)
+
+
+def to_lines(result: List, min_height: int, scale: float = 1.0) -> List[dict]:
+    """
+    将字幕区域的OCR结果排序并转换为整帧坐标下的文本行。
+
+    参数:
+    result: run_ocr 的返回值。
+    min_height: 字幕区域在整帧中的起始行。
+    scale: 字幕区域相对整帧的缩放比例。
+
+    返回:
+    按位置排序的 {"box": [xmin, ymin, xmax, ymax], "text": text} 列表。
+    """
+    lines = []
+    if not result:
+        return lines
+    for line in sort_ocr_result(result):
+        coords, texts = line
+        x1, y1 = coords[0]
+        x2, y2 = coords[1]
+        x3, y3 = coords[2]
+        x4, y4 = coords[3]
+
+        xmin = int(max(x1, x4) / scale)
+        xmax = int(min(x2, x3) / scale)
+        ymin = int(max(y1, y2) / scale) + min_height
+        ymax = int(min(y3, y4) / scale) + min_height
+
+        text = texts[0]
+        lines.append({"box": [xmin, ymin, xmax, ymax], "text": text})
+    return lines
+
+
+def ocr_frame(ocr: "PaddleOCR", img_array: np.ndarray, config: dict) -> List[dict]:
+    """
+    对一帧的字幕区域执行OCR，返回整帧坐标下的文本行。
+    """
+    min_height, max_height = get_band_rows(img_array.shape[0], config)
+    result = run_ocr(ocr, img_array[min_height:max_height], config)
+    return to_lines(result, min_height)
+
+
+def region_distance(a: np.ndarray, b: np.ndarray, lines: List[dict]) -> float:
+    """
+    计算两帧在文本行外接矩形内的平均像素差（0~1），用于低成本判断字幕是否相同。
+    """
+    height, width = a.shape[:2]
+    xmin = max(0, min(line["box"][0] for line in lines))
+    ymin = max(0, min(line["box"][1] for line in lines))
+    xmax = min(width, max(line["box"][2] for line in lines))
+    ymax = min(height, max(line["box"][3] for line in lines))
+    if xmax <= xmin or ymax <= ymin:
+        return 1.0
+    diff = np.abs(
+        a[ymin:ymax, xmin:xmax].astype(np.int16)
+        - b[ymin:ymax, xmin:xmax].astype(np.int16)
+    )
+    return float(diff.mean()) / 255
+
+
+class FrameWindow:
+    """
+    按序号（从 0 开始）读取顺序产出的帧，内存中只保留最近读取的 size 帧。
+
+    读取超出末尾或已移出窗口的帧时抛出 IndexError；帧全部读完后 count 为总帧数，此前为 None。
+    """
+
+    def __init__(self, frames: Iterator[np.ndarray], size: int):
+        """
+        参数:
+        - frames: 依次产出图像数组的迭代器。
+        - size: 保留的帧数。
+        """
+        self.size = size
+        self.count = None
+        self._frames = iter(frames)
+        self._buffer: Dict[int, np.ndarray] = {}
+        self._next = 0
+
+    def __call__(self, i: int) -> np.ndarray:
+        while self.count is None and self._next <= i:
+            frame = next(self._frames, None)
+            if frame is None:
+                self.count = self._next
+                break
+            self._buffer[self._next] = frame
+            self._buffer.pop(self._next - self.size, None)
+            self._next += 1
+        if i not in self._buffer:
+            raise IndexError(f"frame {i} is not in the window")
+        return self._buffer[i]
+
+
+def get_sample_step(config: dict, fps: float) -> int:
+    """
+    稀疏采样识别的采样间隔（帧数）。
+    """
+    return max(1, int(fps / config["ocr"]["sample_fps"]))
+
+
+def sample_ocr_frames(
+    ocr: "PaddleOCR", numbers: List[int], load_frame, config: dict, fps: float
+) -> Dict[int, List[dict]]:
+    """
+    稀疏采样识别：按 ocr.sample_fps 间隔采样做OCR，相邻采样帧文本相同时中间帧直接沿用，
+    文本不同时二分查找变化的帧，得到逐帧精确的字幕起止位置。
+
+    二分时先比较中间帧与两端帧在文本区域内的像素差，与某一端的差不超过 ocr.sample_tolerance
+    且更接近该端时直接沿用该端的结果，否则才对中间帧做OCR。
+
+    两端文本相同时，中间可能有短于采样间隔的字幕：中间帧与两端在文本区域（两端都没有文本时为
+    整个字幕区域）内的像素差都不超过 ocr.sample_tolerance 时直接沿用，否则对中间帧做OCR 并继续二分。
+    间隔短于 video.min_duration 时不再检查，其中的字幕本来也不会输出。
+
+    参数:
+    ocr: PaddleOCR对象。
+    numbers: 按顺序排列的帧号列表。
+    load_frame: 根据帧号读取图像数组的函数。
+    config: 配置字典。
+    fps: 视频的帧率。
+
+    返回:
+    Dict[int, List[dict]]: 每一帧的文本行，格式与 iter_ocr_frames 产出的 lines 一致。
+    """
+    lines_list = sample_ocr(
+        ocr, lambda i: load_frame(numbers[i]), lambda: len(numbers), config, fps
+    )
+    return dict(zip(numbers, lines_list))
+
+
+def sample_ocr(
+    ocr: "PaddleOCR",
+    load,
+    get_count,
+    config: dict,
+    fps: float,
+    band: tuple = None,
+) -> List[List[dict]]:
+    """
+    sample_ocr_frames 的实现，按序号（从 0 开始）读取帧，依次向后采样，向前最多回看一个采样间隔，
+    可以直接读取顺序解码的帧（见 FrameWindow）。
+
+    参数:
+    ocr: PaddleOCR对象。
+    load: 根据序号读取图像数组的函数，序号超出末尾时抛出 IndexError。
+    get_count: 返回总帧数的函数，在 load 抛出 IndexError 之后调用。
+    config: 配置字典。
+    fps: 视频的帧率。
+    band: 为 None 时帧为整帧；为 (起始行, 缩放比例) 时帧为已裁剪（和缩放）的字幕区域，见 iter_ocr_frames。
+
+    返回:
+    List[List[dict]]: 每一帧的整帧坐标下的文本行。
+    """
+    step = get_sample_step(config, fps)
+    min_gap = fps * config["video"]["min_duration"]
+    tolerance = config["ocr"]["sample_tolerance"]
+    results = {}
+
+    def recognize(img_array: np.ndarray) -> List[dict]:
+        if band is None:
+            return ocr_frame(ocr, img_array, config)
+        return to_lines(run_ocr(ocr, img_array, config), *band)
+
+    def read(i: int) -> np.ndarray:
+        img_array = load(i)
+        incr("frames")
+        return img_array
+
+    def detect(i: int) -> np.ndarray:
+        img_array = read(i)
+        results[i] = recognize(img_array)
+        return img_array
+
+    def copy(lines: List[dict]) -> List[dict]:
+        # 下游合并文本行时会修改行字典，每帧使用独立的副本
+        return [dict(line) for line in lines]
+
+    def get_region(img_array: np.ndarray, lines: List[dict]) -> List[dict]:
+        # 文本行换算到帧内坐标，没有文本行时比较整个字幕区域
+        height, width = img_array.shape[:2]
+        if band is None:
+            if lines:
+                return lines
+            min_height, max_height = get_band_rows(height, config)
+            return [{"box": [0, min_height, width, max_height]}]
+        if not lines:
+            return [{"box": [0, 0, width, height]}]
+        top, scale = band
+        return [
+            {
+                "box": [
+                    int(xmin * scale),
+                    int((ymin - top) * scale),
+                    int(math.ceil(xmax * scale)),
+                    int(math.ceil((ymax - top) * scale)),
+                ]
+            }
+            for xmin, ymin, xmax, ymax in (line["box"] for line in lines)
+        ]
+
+    def refine(a: int, img_a: np.ndarray, b: int, img_b: np.ndarray):
+        if b - a <= 1:
+            return
+        lines_a, lines_b = results[a], results[b]
+        if [line["text"] for line in lines_a] == [line["text"] for line in lines_b]:
+            m = (a + b) // 2
+            if b - a - 1 >= min_gap:
+                img_m = read(m)
+                region = get_region(img_m, lines_a)
+                if (
+                    region_distance(img_m, img_a, region) > tolerance
+                    or region_distance(img_m, img_b, region) > tolerance
+                ):
+                    # 中间帧画面有变化，可能有短于采样间隔的字幕
+                    results[m] = recognize(img_m)
+                    refine(a, img_a, m, img_m)
+                    refine(m, img_m, b, img_b)
+                    return
+            for i in range(a + 1, b):
+                results[i] = copy(lines_a)
+            incr("ocr_sample_filled", b - a - 1)
+            return
+        m = (a + b) // 2
+        img_m = read(m)
+        region = get_region(img_m, lines_a + lines_b)
+        distance_a = region_distance(img_m, img_a, region)
+        distance_b = region_distance(img_m, img_b, region)
+        if distance_a <= tolerance and distance_a < distance_b:
+            results[m] = copy(lines_a)
+            incr("ocr_sample_filled")
+        elif distance_b <= tolerance and distance_b < distance_a:
+            results[m] = copy(lines_b)
+            incr("ocr_sample_filled")
+        else:
+            results[m] = recognize(img_m)
+        refine(a, img_a, m, img_m)
+        refine(m, img_m, b, img_b)
+
+    try:
+        pre, img_pre = 0, detect(0)
+    except IndexError:
+        return []
+    with tqdm(desc="OCR sample") as progress:
+        while True:
+            i = pre + step
+            try:
+                img_array = detect(i)
+            except IndexError:
+                # 最后一个采样间隔不足 step 帧，以最后一帧结束
+                i = get_count() - 1
+                if i <= pre:
+                    break
+                img_array = detect(i)
+            refine(pre, img_pre, i, img_array)
+            progress.update(i - pre)
+            pre, img_pre = i, img_array
+    return [results[i] for i in range(pre + 1)]
+
+
+def get_layout(values, config: dict, frame_shape: tuple) -> dict:
+    """
+    根据OCR结果估计字幕的垂直中心和字高，并计算校验所需的容差。
+
+    参数:
+    values: 可迭代对象，所有帧中识别到的 {"box", "text"} 文本行。
     config: dict - 配置参数，用于设定宽度、高度的偏差及分组容忍度。
-    fps: float - 视频的帧率，用于计算最小持续时间的帧数。
-    frame_path: str - 图像帧的路径，用于读取图像数组。
+    frame_shape: tuple - 视频帧的尺寸 (高, 宽, ...)。
 
     返回:
-    new_ocr_result: dict - 校验和整合后的OCR结果。
-    center: float - 识别到的字幕文本的中心位置。
+    dict - 包含 center、word_height、x_center_frame、x_delta、y_delta 和 tolerance。
     """
-    img_array = load_img_to_array(frame_path)
-    x_center_frame = img_array.shape[1] / 2
-    x_delta = img_array.shape[1] * config["video"]["width_delta"]
-    y_delta = img_array.shape[0] * config["video"]["height_delta"]
+    x_center_frame = frame_shape[1] / 2
+    x_delta = frame_shape[1] * config["video"]["width_delta"]
+    y_delta = frame_shape[0] * config["video"]["height_delta"]
 
     center_list = []
     word_height_list = []
-    for key, value in tqdm(ocr_result.items(), desc="Word info"):
+    for value in tqdm(values, desc="Word info"):
         xmin, ymin, xmax, ymax = value["box"]
         x_center = (xmin + xmax) / 2
         if x_center - x_delta < x_center_frame < x_center + x_delta:
@@ -174,11 +754,36 @@ def check_ocr_result(ocr_result: dict, config: dict, fps: float, frame_path: str
             center_list.append(y_center)
             word_height_list.append(ymax - ymin)
     tolerance = config["video"]["groups_tolerance"]
-    center = get_groups_mean(center_list, tolerance)
-    word_height = get_groups_mean(word_height_list, tolerance)
+    return {
+        "center": get_groups_mean(center_list, tolerance),
+        "word_height": get_groups_mean(word_height_list, tolerance),
+        "x_center_frame": x_center_frame,
+        "x_delta": x_delta,
+        "y_delta": y_delta,
+        "tolerance": tolerance,
+    }
 
-    new_ocr_result = {}
-    for key, value in tqdm(ocr_result.items(), desc="Word concat"):
+
+def concat_lines(lines: List[dict], layout: dict):
+    """
+    保留一帧中与字幕中心和字高一致的文本行，并将相邻的文本行合并为一条字幕。
+
+    参数:
+    lines: List[dict] - 一帧中按位置排序的 {"box", "text"} 文本行。
+    layout: dict - get_layout 的返回值。
+
+    返回:
+    dict - 合并后的文本和文本框，没有符合条件的文本行时返回 None。
+    """
+    center = layout["center"]
+    word_height = layout["word_height"]
+    x_center_frame = layout["x_center_frame"]
+    x_delta = layout["x_delta"]
+    y_delta = layout["y_delta"]
+    tolerance = layout["tolerance"]
+
+    merged = None
+    for value in lines:
         xmin, ymin, xmax, ymax = value["box"]
         y_center = (ymin + ymax) / 2
         x_center = (xmin + xmax) / 2
@@ -186,50 +791,204 @@ def check_ocr_result(ocr_result: dict, config: dict, fps: float, frame_path: str
             center - y_delta < y_center < center + y_delta
             and word_height - tolerance <= ymax - ymin <= word_height + tolerance
         ):
-            frame_path = key.split(",")[0]
-            if frame_path not in new_ocr_result:
-                new_ocr_result[frame_path] = value
+            if merged is None:
+                merged = value
             else:
-                xmin_, ymin_, xmax_, ymax_ = new_ocr_result[frame_path]["box"]
+                xmin_, ymin_, xmax_, ymax_ = merged["box"]
                 if (
                     (xmin - xmax_ <= x_delta / 2 or xmin_ - xmax <= x_delta / 2)
                     and -tolerance / 2 <= ymin_ - ymin <= tolerance / 2
                     and -tolerance / 2 <= ymax_ - ymax <= tolerance / 2
                 ) or (x_center_frame - x_delta <= x_center <= x_center_frame + x_delta):
-                    new_ocr_result[frame_path]["box"] = [
+                    merged["box"] = [
                         min(xmin, xmin_),
                         min(ymin, ymin_),
                         max(xmax, xmax_),
                         max(ymax, ymax_),
                     ]
-                    new_ocr_result[frame_path]["text"] += value["text"]
+                    merged["text"] += value["text"]
+    return merged
+
+
+def concat_words(ocr_result: dict, layout: dict) -> dict:
+    """
+    对每一帧调用 concat_lines，将同一帧中相邻的文本框合并为一条字幕。
+
+    参数:
+    ocr_result: dict - OCR识别结果，键为帧路径加序号。
+    layout: dict - get_layout 的返回值。
+
+    返回:
+    dict - 键为帧路径，值为合并后的文本和文本框。
+    """
+    frame_lines = {}
+    for key, value in ocr_result.items():
+        frame_lines.setdefault(key.split(",")[0], []).append(value)
 
-    ocr_result = new_ocr_result.copy()
     new_ocr_result = {}
+    for frame_path, lines in tqdm(frame_lines.items(), desc="Word concat"):
+        merged = concat_lines(lines, layout)
+        if merged is not None:
+            new_ocr_result[frame_path] = merged
+    return new_ocr_result
+
+
+def in_layout(value: dict, layout: dict) -> bool:
+    """
+    判断合并后的字幕是否位于字幕中心附近且水平居中。
+    """
+    xmin, ymin, xmax, ymax = value["box"]
+    y_center = (ymin + ymax) / 2
+    x_center = (xmin + xmax) / 2
+    return (
+        layout["center"] - layout["y_delta"]
+        < y_center
+        < layout["center"] + layout["y_delta"]
+        and layout["x_center_frame"] - layout["x_delta"]
+        <= x_center
+        <= layout["x_center_frame"] + layout["x_delta"]
+    )
+
+
+def check_frames(
+    frames: Dict[int, dict], layout: dict, config: dict, fps: float
+) -> Timeline:
+    """
+    过滤不在字幕位置的结果，并将同一条字幕在相邻识别帧之间的空缺合并为一个区间。
+
+    参数:
+    frames: Dict[int, dict] - 按帧号排序的每帧合并后的字幕。
+    layout: dict - get_layout 的返回值。
+    config: dict - 配置参数。
+    fps: float - 视频的帧率，用于计算最小持续时间的帧数。
+
+    返回:
+    Timeline - 字幕区间表，区间的文本框为区间内各帧文本框的外接矩形。
+    """
+    timeline = Timeline()
     frame_number_pre = 0
     text_pre = ""
-    frames = fps * config["video"]["min_duration"]
-    for frame_path, value in tqdm(ocr_result.items(), desc="OCR check"):
-        xmin, ymin, xmax, ymax = value["box"]
-        y_center = (ymin + ymax) / 2
-        x_center = (xmin + xmax) / 2
-        if (
-            center - y_delta < y_center < center + y_delta
-            and x_center_frame - x_delta <= x_center <= x_center_frame + x_delta
-        ):
-            frame_number = int(os.path.splitext(os.path.basename(frame_path))[0])
+    gap = fps * config["video"]["min_duration"]
+    for frame_number, value in tqdm(frames.items(), desc="OCR check"):
+        if in_layout(value, layout):
             text = value["text"]
-            if text == text_pre and frame_number - frame_number_pre <= frames:
-                for i in range(frame_number_pre + 1, frame_number):
-                    frame_path_ = os.path.join(
-                        os.path.split(frame_path)[0],
-                        f"{i:04d}{os.path.splitext(frame_path)[-1]}",
-                    )
-                    new_ocr_result[frame_path_] = value
-            new_ocr_result[frame_path] = value
+            if text == text_pre and frame_number - frame_number_pre <= gap:
+                timeline.extend(frame_number, value)
+            else:
+                timeline.add(frame_number, value)
             frame_number_pre = frame_number
             text_pre = text
-    return new_ocr_result, center
+    return timeline
+
+
+def check_ocr_result(
+    ocr_result: dict,
+    config: dict,
+    fps: float,
+    frame_path: str,
+    frame_shape: tuple = None,
+):
+    """
+    根据配置参数和视频帧率，校验并整合OCR识别结果。
+
+    参数:
+    ocr_result: dict - OCR识别结果，键为帧路径，值为包含文字信息和 bounding box 的字典。
+    config: dict - 配置参数，用于设定宽度、高度的偏差及分组容忍度。
+    fps: float - 视频的帧率，用于计算最小持续时间的帧数。
+    frame_path: str - 图像帧的路径，用于读取图像数组。
+    frame_shape: tuple - 帧的尺寸 (高, 宽, 通道数)，提供时不再读取 frame_path。
+
+    返回:
+    timeline: Timeline - 校验和整合后的字幕区间表。
+    center: float - 识别到的字幕文本的中心位置。
+    """
+    if frame_shape is None:
+        frame_shape = load_img_to_array(frame_path).shape
+    layout = get_layout(ocr_result.values(), config, frame_shape)
+    ocr_result = concat_words(ocr_result, layout)
+    timeline = check_frames(
+        {
+            int(os.path.splitext(os.path.basename(path))[0]): value
+            for path, value in ocr_result.items()
+        },
+        layout,
+        config,
+        fps,
+    )
+    return timeline, layout["center"]
+
+
+def stream_subtitles(
+    frame_paths: List[str],
+    config: dict,
+    fps: float,
+    file_name: str,
+    ocr: "PaddleOCR" = None,
+):
+    """
+    边识别边生成字幕：逐帧OCR，每确定一条字幕结束就写入 SRT 文件并产出该字幕。
+
+    字幕中心和字高需要统计多帧结果才能估计，因此先缓存识别到文字的前 video.stream_warmup 帧，
+    据此估计后再回放缓存并继续逐帧处理；估计只基于开头的帧，结果可能与整段视频识别后再校验略有差异。
+
+    参数:
+    - frame_paths: 视频帧的文件路径列表。
+    - config: 配置字典。
+    - fps: 视频的帧率。
+    - file_name: 文件名，字幕写入 {file_name}_zh_ocr.srt。
+    - ocr: 已加载的 PaddleOCR 实例，为 None 时根据配置新建。
+
+    返回:
+    - 生成器，依次产出包含 start、end（帧号）和 text 的字幕字典。
+    """
+    from modules.subtitle import CueBuilder
+
+    if ocr is None:
+        ocr = build_ocr_model(config)
+    builder = CueBuilder(
+        fps, config["video"]["min_duration"], f"{file_name}_zh_ocr.srt"
+    )
+    warmup = config["video"]["stream_warmup"]
+    frame_shape = load_img_to_array(frame_paths[0]).shape
+    frames = (
+        (
+            int(os.path.splitext(os.path.basename(frame_path))[0]),
+            load_img_to_array(frame_path),
+        )
+        for frame_path in frame_paths
+    )
+    buffered = []
+    detected = 0
+    layout = {}
+
+    def feed(frame_number: int, lines: List[dict]):
+        value = concat_lines(lines, layout)
+        if value is None or not in_layout(value, layout):
+            return []
+        return builder.add(frame_number, value["text"])
+
+    def replay():
+        # 根据缓存的帧估计字幕位置，再依次处理缓存的帧
+        layout.update(
+            get_layout(
+                [line for _, lines in buffered for line in lines], config, frame_shape
+            )
+        )
+        for item in buffered:
+            yield from feed(*item)
+        buffered.clear()
+
+    for frame_number, lines in iter_ocr_frames(ocr, frames, config, len(frame_paths)):
+        if layout:
+            yield from feed(frame_number, lines)
+            continue
+        buffered.append((frame_number, lines))
+        detected += bool(lines)
+        if detected >= warmup:
+            yield from replay()
+    if buffered:
+        yield from replay()
+    yield from builder.close()
 
 
 def get_groups_mean(arr: list, tolerance=20):
@@ -0,0 +1,517 @@
+import datetime
+import os
+import shutil
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.dag_utils import Task, run_dag
+from utils.hls_utils import HlsWriter
+from utils.logging_utils import update_status
+from utils.metrics_utils import collect_metrics, save_metrics, track_stage
+from utils.video_utils import (
+    create_video,
+    detect_fps,
+    extract_frames,
+    get_temp_frame_paths,
+    smart_create_video,
+)
+from utils.workspace_utils import get_artifact_sizes, get_job_prefix, use_workspace
+
+
+def extract_stage(video_path: str, fps: float, config: dict):
+    """
+    提取视频帧。
+
+    参数:
+    - video_path: 输入视频路径。
+    - fps: 视频帧率。
+    - config: 配置字典。
+
+    返回:
+    - 帧文件路径列表。
+    """
+    update_status(f"Source: extracting frames with {fps} FPS...")
+    temp_directory_path = get_job_prefix(video_path, config)
+    with track_stage("extract", config, temp_directory_path):
+        extract_frames(video_path, fps, temp_directory_path=temp_directory_path)
+        frame_paths = get_temp_frame_paths(temp_directory_path)
+    return frame_paths
+
+
+def ocr_stage(frame_paths: list, config: dict, fps: float, file_name: str, pool=None):
+    """
+    使用 OCR 提取字幕。
+
+    参数:
+    - pool: 模型池，提供时从池中借用已加载的 OCR 模型。
+
+    返回:
+    - (timeline, y_center) 元组。
+    """
+    from modules.ocr import extract_subtitles
+    from modules.preview import load_preview_ocr
+
+    if config["preview"]["reuse_ocr"]:
+        # 选择复用时，--preview 稀疏采样的 OCR 结果在帧率一致时直接作为最终结果
+        preview_path = f"{os.path.split(frame_paths[0])[0]}_ocr_preview.json"
+        ocr_output = load_preview_ocr(preview_path, fps)
+        if ocr_output is not None:
+            update_status(f"OCR: reusing {preview_path}")
+            return ocr_output
+
+    update_status("OCR: extracting subtitles...")
+    with track_stage("ocr", config, file_name):
+        if pool is None:
+            return extract_subtitles(frame_paths, config, fps)
+        with pool.acquire("ocr") as ocr:
+            return extract_subtitles(frame_paths, config, fps, ocr)
+
+
+def band_ocr_stage(
+    video_path: str, config: dict, fps: float, file_name: str, pool=None
+):
+    """
+    直接从视频解码字幕区域做 OCR，不依赖提取的帧文件，可以与提取帧并行执行。
+
+    参数:
+    - pool: 模型池，提供时从池中借用已加载的 OCR 模型。
+
+    返回:
+    - (timeline, y_center) 元组。
+    """
+    from modules.ocr import extract_band_subtitles
+    from modules.preview import load_preview_ocr
+
+    prefix = get_job_prefix(video_path, config)
+    if config["preview"]["reuse_ocr"]:
+        preview_path = f"{prefix}_ocr_preview.json"
+        ocr_output = load_preview_ocr(preview_path, fps)
+        if ocr_output is not None:
+            update_status(f"OCR: reusing {preview_path}")
+            return ocr_output
+
+    update_status("OCR: extracting subtitles from the subtitle band...")
+    with track_stage("ocr", config, file_name) as record:
+        record["source"] = "band"
+        if pool is None:
+            return extract_band_subtitles(video_path, prefix, config, fps)
+        with pool.acquire("ocr") as ocr:
+            return extract_band_subtitles(video_path, prefix, config, fps, ocr)
+
+
+def subtitle_stage(ocr_output: tuple, config: dict, fps: float, file_name: str):
+    """
+    根据 OCR 结果生成 SRT 字幕文件。
+
+    返回:
+    - SRT 文件路径。
+    """
+    from modules.subtitle import get_subtitles
+
+    timeline, _ = ocr_output
+    with track_stage("subtitle", config, file_name):
+        return get_subtitles(timeline, config, fps, file_name)
+
+
+def select_output(result: tuple, index: int):
+    """
+    取出上游任务返回元组中的一项，用于在任务图中拆分多返回值的任务。
+    """
+    return result[index]
+
+
+def shard_stage(
+    video_path: str,
+    output_path: str,
+    file_name: str,
+    fps: float,
+    shard_count: int,
+    config: dict,
+    delete: bool,
+):
+    """
+    分片并行完成提取帧、OCR、生成字幕和擦除字幕。
+
+    返回:
+    - (srt_path, output_path, y_center) 元组。
+    """
+    from modules.shard import run_shards
+
+    srt_path = f"{file_name}_zh_ocr.srt"
+    return run_shards(
+        video_path, output_path, srt_path, fps, shard_count, config, delete
+    )
+
+
+def erase_stage(
+    frame_paths: list,
+    ocr_output: tuple,
+    video_path: str,
+    output_path: str,
+    fps: float,
+    config: dict,
+    pool=None,
+    started: Optional[float] = None,
+):
+    """
+    擦除原有字幕并重新合成视频。
+
+    配置 output.segment_duration 大于 0 时，擦除过程中每确定一段帧就编码为 HLS 分段，
+    写入 {中间产物前缀}_hls/index.m3u8，最后将分段直接拼接为完整视频。
+
+    参数:
+    - pool: 模型池，提供时从池中借用已加载的 STTN 模型。
+    - started: 任务开始时间（time.time()），用于记录首个分段的耗时。
+
+    返回:
+    - 擦除字幕后的视频路径。
+    """
+    from modules.erase import remove_subtitles, use_worker_pool
+
+    timeline, _ = ocr_output
+    temp_directory_path = file_name = get_job_prefix(video_path, config)
+    update_status("Erase: removing subtitles...")
+    writer = on_progress = None
+    if config["output"]["segment_duration"] > 0:
+        writer = HlsWriter(
+            video_path,
+            temp_directory_path,
+            f"{temp_directory_path}_hls",
+            fps,
+            len(frame_paths),
+            config["output"]["segment_duration"],
+            started,
+        )
+        on_progress = writer.advance
+        update_status(f"Erase: writing segments to {writer.playlist_path}")
+    with track_stage("erase", config, file_name):
+        # ONNX 会话由并行修复的各工作进程自己加载，不从模型池借用
+        if pool is None or (
+            use_worker_pool(config) and config["erase"]["backend"] == "onnx"
+        ):
+            remove_subtitles(timeline, frame_paths, fps, config, None, on_progress)
+        else:
+            with pool.acquire("sttn") as model:
+                remove_subtitles(
+                    timeline, frame_paths, fps, config, model, on_progress
+                )
+    with track_stage("encode", config, file_name):
+        if writer is not None:
+            writer.finish(output_path)
+        elif config["output"]["smart_encode"]:
+            smart_create_video(
+                video_path,
+                output_path,
+                fps,
+                timeline.frame_numbers(),
+                temp_directory_path=temp_directory_path,
+            )
+        else:
+            create_video(
+                video_path, output_path, fps, temp_directory_path=temp_directory_path
+            )
+    update_status("Erase: done")
+    return output_path
+
+
+def translate_stage(srt_path: str, language: str, config: dict, file_name: str):
+    """
+    翻译字幕。
+
+    返回:
+    - 翻译后的 SRT 文件路径。
+    """
+    from modules.translate import translate_subtitles
+
+    update_status(f"Translate: translating subtitles to {language}...")
+    with track_stage("translate", config, file_name) as record:
+        record["language"] = language
+        srt_lang_path = translate_subtitles(
+            srt_path, language, mode=config["translation"]["mode"]
+        )
+    update_status(f"Translate: {language} done")
+    return srt_lang_path
+
+
+def embed_stage(
+    video_path: str,
+    srt_lang_path: str,
+    y_center: float,
+    output_file: str,
+    config: dict,
+    file_name: str,
+    language: Optional[str] = None,
+):
+    """
+    将翻译后的字幕嵌入视频。
+
+    配置 output.subtitle_mode 为 soft 时，字幕作为字幕流封装进视频，不重新编码。
+
+    参数:
+    - language: 字幕语言，软字幕模式下写入字幕流的元数据。
+
+    返回:
+    - 最终输出的视频路径。
+    """
+    if config["output"]["subtitle_mode"] == "soft":
+        return embed_tracks_stage(
+            video_path,
+            y_center,
+            srt_lang_path,
+            languages=[language],
+            output_file=output_file,
+            config=config,
+            file_name=file_name,
+        )
+
+    from modules.embed import embed_subtitles
+
+    update_status("Embed: embedding subtitles...")
+    with track_stage("embed", config, file_name):
+        embed_subtitles(video_path, srt_lang_path, y_center, output_file, config)
+    return output_file
+
+
+def embed_tracks_stage(
+    video_path: str,
+    y_center: float,
+    *srt_lang_paths: str,
+    languages: List[Optional[str]],
+    output_file: str,
+    config: dict,
+    file_name: str,
+):
+    """
+    将一种或多种语言的字幕作为字幕流封装进视频，视频和音频流直接复制。
+
+    参数:
+    - srt_lang_paths: 各语言的 SRT 文件路径，与 languages 一一对应。
+    - languages: 语言列表。
+
+    返回:
+    - 输出的视频路径。
+    """
+    from modules.mux import mux_subtitles
+
+    update_status("Embed: muxing subtitle tracks...")
+    with track_stage("embed", config, file_name) as record:
+        record["mode"] = "soft"
+        mux_subtitles(
+            video_path,
+            list(zip(languages, srt_lang_paths)),
+            y_center,
+            output_file,
+            config,
+        )
+    return output_file
+
+
+def build_tasks(
+    video_path: str,
+    languages: List[str],
+    config: dict,
+    fps: float,
+    shard_count: int = 1,
+    delete: bool = False,
+    pool=None,
+    started: Optional[float] = None,
+):
+    """
+    构建字幕处理流水线的任务图。
+
+    字幕文件生成后，翻译（网络密集）与擦除、合成（计算密集）互不依赖，可以并发执行；
+    每种语言的嵌入任务在擦除后的视频和该语言的字幕都就绪后才开始。
+    分片数大于 1 时，提取帧、OCR、生成字幕和擦除字幕由分片任务并行完成。
+
+    参数:
+    - video_path: 输入视频路径。
+    - languages: 目标语言列表。
+    - config: 配置字典。
+    - fps: 视频帧率。
+    - shard_count: 分片数量。
+    - delete: 分片模式下处理完成后是否删除分片临时目录。
+    - pool: 模型池，提供时 OCR 和擦除阶段复用池中已加载的模型。
+    - started: 任务开始时间，用于记录首个 HLS 分段的耗时。
+
+    返回:
+    - 任务列表。
+    """
+    ext = os.path.splitext(video_path)[1]
+    file_name = get_job_prefix(video_path, config)
+    output_path = f"{file_name}_output{ext}"
+    if shard_count > 1:
+        tasks = [
+            Task(
+                "shard",
+                shard_stage,
+                args=(video_path, output_path, file_name, fps, shard_count, config, delete),
+            ),
+            Task("subtitle", select_output, deps=("shard",), args=(0,)),
+            Task("erase", select_output, deps=("shard",), args=(1,)),
+            Task("center", select_output, deps=("shard",), args=(2,)),
+        ]
+    else:
+        if config["ocr"]["band_source"]:
+            # OCR 只解码字幕区域，与提取完整帧（供擦除使用）并行执行
+            ocr_task = Task(
+                "ocr",
+                band_ocr_stage,
+                executor="process",
+                args=(video_path, config, fps, file_name, pool),
+            )
+        else:
+            ocr_task = Task(
+                "ocr",
+                ocr_stage,
+                deps=("extract",),
+                executor="process",
+                args=(config, fps, file_name, pool),
+            )
+        tasks = [
+            Task("extract", extract_stage, args=(video_path, fps, config)),
+            ocr_task,
+            Task("subtitle", subtitle_stage, deps=("ocr",), args=(config, fps, file_name)),
+            Task("center", select_output, deps=("ocr",), args=(1,)),
+            Task(
+                "erase",
+                erase_stage,
+                deps=("extract", "ocr"),
+                executor="process",
+                args=(video_path, output_path, fps, config, pool, started),
+            ),
+        ]
+    merge_tracks = (
+        config["output"]["subtitle_mode"] == "soft"
+        and config["output"]["merge_tracks"]
+        and languages
+    )
+    for language in languages:
+        tasks.append(
+            Task(
+                f"translate_{language}",
+                translate_stage,
+                deps=("subtitle",),
+                args=(language, config, file_name),
+            )
+        )
+        if merge_tracks:
+            continue
+        output_file = f"{file_name}_{language}{ext}"
+        tasks.append(
+            Task(
+                f"embed_{language}",
+                embed_stage,
+                deps=("erase", f"translate_{language}", "center"),
+                executor="process",
+                args=(output_file, config, file_name, language),
+            )
+        )
+    if merge_tracks:
+        # 所有语言的字幕封装为同一个文件中的多条字幕流
+        tasks.append(
+            Task(
+                "embed",
+                embed_tracks_stage,
+                deps=("erase", "center")
+                + tuple(f"translate_{language}" for language in languages),
+                kwargs={
+                    "languages": list(languages),
+                    "output_file": f"{file_name}_subtitled{ext}",
+                    "config": config,
+                    "file_name": file_name,
+                },
+            )
+        )
+    return tasks
+
+
+def run_pipeline(
+    video_path: str,
+    languages: List[str],
+    config: dict,
+    delete: bool = False,
+    use_processes: bool = True,
+    shard_count: int = 1,
+    pool=None,
+    on_event: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, str]:
+    """
+    运行完整的字幕擦除、翻译和嵌入流程。
+
+    参数:
+    - video_path: 输入视频路径。
+    - languages: 目标语言列表。
+    - config: 配置字典。
+    - delete: 处理完成后是否删除临时帧目录。
+    - use_processes: 是否将计算密集型阶段放到子进程中执行，使用模型池时总是在当前进程中执行。
+    - shard_count: 分片数量，大于 1 时按时间分片并行处理。
+    - pool: 模型池，提供时 OCR 和擦除阶段复用池中已加载的模型。
+    - on_event: 阶段状态回调，参数为阶段名称和状态。
+
+    返回:
+    - Dict[str, str]: 产物名称到文件路径的映射，包括 subtitle、erase、每种语言的
+      translate_<language> 和 embed_<language>，以及开启指标记录时的 metrics。
+    """
+    update_status(f"Start! {video_path}")
+    if pool is not None:
+        use_processes = False
+    file_name = get_job_prefix(video_path, config)
+    collect_metrics(file_name)
+    started = time.time()
+    fps = detect_fps(video_path)
+    with use_workspace(video_path, config) as temp_directory_path:
+        tasks = build_tasks(
+            video_path, languages, config, fps, shard_count, delete, pool, started
+        )
+        results = run_dag(
+            tasks,
+            max_threads=max(4, len(languages) + 2),
+            use_processes=use_processes,
+            on_event=on_event,
+        )
+
+        if delete:
+            if os.path.exists(temp_directory_path):
+                shutil.rmtree(temp_directory_path)
+                update_status(
+                    "Temporary request directory {} deleted".format(temp_directory_path)
+                )
+
+        artifacts = {"subtitle": results["subtitle"], "erase": results["erase"]}
+        if config["output"]["segment_duration"] > 0 and shard_count <= 1:
+            artifacts["hls"] = f"{temp_directory_path}_hls"
+        for language in languages:
+            artifacts[f"translate_{language}"] = results[f"translate_{language}"]
+            artifacts[f"embed_{language}"] = results.get(
+                f"embed_{language}", results.get("embed")
+            )
+        artifact_sizes = get_artifact_sizes(
+            dict(artifacts, frames=temp_directory_path)
+        )
+    update_status(f"Artifacts: {artifact_sizes}")
+
+    records = collect_metrics(file_name)
+    if config["metrics"]["enable"]:
+        artifacts["metrics"] = f"{file_name}_metrics.json"
+        extra = {}
+        for record in records:
+            if "time_to_first_segment_s" in record["counters"]:
+                extra["time_to_first_segment_s"] = record["counters"][
+                    "time_to_first_segment_s"
+                ]
+        save_metrics(
+            artifacts["metrics"],
+            records,
+            video=video_path,
+            languages=languages,
+            fps=fps,
+            shards=shard_count,
+            started=datetime.datetime.fromtimestamp(started).isoformat(),
+            wall_s=round(time.time() - started, 3),
+            artifact_bytes=artifact_sizes,
+            **extra,
+        )
+        update_status(f"Metrics: saved to {artifacts['metrics']}")
+
+    update_status(f"Done! {video_path}")
+    return artifacts
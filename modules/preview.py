@@ -0,0 +1,222 @@
+import concurrent.futures
+import copy
+import json
+import os
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from modules.erase import get_mask_box
+from modules.pipeline import band_ocr_stage, translate_stage
+from modules.subtitle import get_subtitles
+from utils.logging_utils import update_status
+from utils.metrics_utils import collect_metrics, incr, save_metrics, track_stage
+from utils.timeline_utils import Timeline
+from utils.video_utils import detect_fps, detect_size, read_frames, write_video
+from utils.workspace_utils import get_job_prefix, use_workspace
+
+
+def preview_config(config: dict) -> dict:
+    """
+    生成预览使用的配置：OCR 直接解码字幕区域并稀疏采样（采样间隙内二分查找字幕边界），
+    翻译一次发送完整的 SRT。
+    """
+    config = copy.deepcopy(config)
+    config["ocr"]["band_source"] = True
+    if config["preview"]["sample_fps"]:
+        config["ocr"]["sample_fps"] = config["preview"]["sample_fps"]
+    config["translation"]["mode"] = "srt"
+    return config
+
+
+def save_preview_ocr(path: str, ocr_output: tuple, fps: float):
+    """
+    保存预览的 OCR 结果，完整处理同一视频时由 ocr_stage 直接复用。
+
+    参数:
+    - path: JSON 文件路径。
+    - ocr_output: (timeline, y_center) 元组。
+    - fps: 视频的帧率。
+    """
+    timeline, center = ocr_output
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "fps": fps,
+                "center": center,
+                "intervals": timeline.to_list(),
+            },
+            f,
+            ensure_ascii=False,
+            indent=4,
+        )
+
+
+def load_preview_ocr(path: str, fps: float) -> Optional[tuple]:
+    """
+    读取 save_preview_ocr 保存的结果，帧率不一致时返回 None。
+
+    返回:
+    - (timeline, y_center) 元组或 None。
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        data = json.load(f)
+    if data["fps"] != fps:
+        return None
+    return Timeline.from_list(data["intervals"]), data["center"]
+
+
+def blur_band(frame: np.ndarray, box: tuple) -> np.ndarray:
+    """
+    对字幕所在的矩形区域做强烈的高斯模糊，代替擦除。
+
+    参数:
+    - frame: RGB 图像数组。
+    - box: 矩形的 (x0, y0, x1, y1)，包含两端。
+
+    返回:
+    - 模糊后的图像数组。
+    """
+    x0, y0, x1, y1 = box
+    y0, y1 = max(0, y0), min(frame.shape[0] - 1, y1)
+    if x1 <= x0 or y1 <= y0:
+        return frame
+    frame = frame.copy()
+    band = frame[y0 : y1 + 1, x0 : x1 + 1]
+    frame[y0 : y1 + 1, x0 : x1 + 1] = cv2.GaussianBlur(band, (0, 0), (y1 - y0) / 2)
+    return frame
+
+
+def get_preview_size(width: int, height: int, config: dict) -> tuple:
+    """
+    按 preview.height 等比缩小的预览尺寸，宽高均为偶数，不会放大原视频。
+    """
+    factor = min(height, config["preview"]["height"]) / height
+    return round(width * factor / 2) * 2, round(height * factor / 2) * 2
+
+
+def render_preview(
+    video_path: str,
+    timeline: Timeline,
+    fps: float,
+    output_path: str,
+    config: dict,
+) -> bool:
+    """
+    以较低分辨率解码视频，模糊检测到的字幕带，并用快速预设编码为预览视频。
+
+    参数:
+    - video_path: 输入视频路径。
+    - timeline: 字幕区间表，坐标为原视频分辨率。
+    - fps: 视频的帧率。
+    - output_path: 预览视频路径。
+    - config: 配置字典。
+
+    返回:
+    - bool: 编码是否成功。
+    """
+    width, height = detect_size(video_path)
+    preview_width, preview_height = get_preview_size(width, height, config)
+    factor = preview_height / height
+
+    def frames():
+        for frame_number, frame in enumerate(
+            read_frames(video_path, fps, preview_width, preview_height, scale=True), 1
+        ):
+            interval = timeline.at(frame_number)
+            if interval is not None:
+                box = get_mask_box(interval.box, width, config["erase"]["mask_expand"])
+                frame = blur_band(frame, tuple(round(v * factor) for v in box))
+                incr("blurred_frames")
+            incr("frames")
+            yield frame
+
+    return write_video(
+        frames(),
+        output_path,
+        fps,
+        preview_width,
+        preview_height,
+        video_path,
+        config["preview"]["quality"],
+        "libx264",
+        config["preview"]["preset"],
+    )
+
+
+def run_preview(video_path: str, languages: List[str], config: dict) -> Dict[str, str]:
+    """
+    快速生成预览，供审阅字幕识别和翻译结果。
+
+    OCR 直接从视频解码字幕区域并稀疏采样，不提取完整的帧；翻译一次发送完整的 SRT，
+    字幕带只做模糊而不修复，视频以较低分辨率和快速预设编码，翻译后的字幕作为字幕流封装进预览视频。
+    preview.reuse_ocr 为 true 时 OCR 结果、SRT 和翻译结果保存在完整处理使用的位置，之后完整处理同一视频时
+    直接复用；否则 SRT 和翻译另存为 {中间产物前缀}_preview_*.srt，完整处理时重新识别和翻译。
+
+    参数:
+    - video_path: 输入视频路径。
+    - languages: 目标语言列表。
+    - config: 配置字典。
+
+    返回:
+    - Dict[str, str]: 产物名称到路径的映射，包括 preview、subtitle、每种语言的
+      translate_<language>，以及 y_center（按原视频分辨率）。
+    """
+    from modules.mux import mux_subtitles
+
+    update_status(f"Preview! {video_path}")
+    config = preview_config(config)
+    ext = os.path.splitext(video_path)[1]
+    file_name = get_job_prefix(video_path, config)
+    collect_metrics(file_name)
+    fps = detect_fps(video_path)
+    with use_workspace(video_path, config) as temp_directory_path:
+        timeline, y_center = band_ocr_stage(video_path, config, fps, file_name)
+        save_preview_ocr(
+            f"{temp_directory_path}_ocr_preview.json", (timeline, y_center), fps
+        )
+        # 不复用时预览的 SRT 和翻译另外命名，避免被完整处理的翻译缓存当作结果
+        srt_name = (
+            file_name if config["preview"]["reuse_ocr"] else f"{file_name}_preview"
+        )
+        with track_stage("subtitle", config, file_name):
+            srt_path = get_subtitles(timeline, config, fps, srt_name)
+
+        # 翻译（网络密集）与预览视频编码（计算密集）并发执行
+        video_only_path = f"{temp_directory_path}_preview{ext}"
+        with concurrent.futures.ThreadPoolExecutor() as executor:
+            futures = [
+                executor.submit(translate_stage, srt_path, language, config, file_name)
+                for language in languages
+            ]
+            update_status("Preview: rendering...")
+            with track_stage("preview", config, file_name):
+                render_preview(video_path, timeline, fps, video_only_path, config)
+            srt_lang_paths = [future.result() for future in futures]
+
+        output_path = f"{file_name}_preview{ext}"
+        width, height = detect_size(video_path)
+        factor = get_preview_size(width, height, config)[1] / height
+        with track_stage("embed", config, file_name) as record:
+            record["mode"] = "soft"
+            mux_subtitles(
+                video_only_path,
+                list(zip(languages, srt_lang_paths)),
+                y_center * factor,
+                output_path,
+                config,
+            )
+
+    artifacts = {"preview": output_path, "subtitle": srt_path, "y_center": y_center}
+    for language, srt_lang_path in zip(languages, srt_lang_paths):
+        artifacts[f"translate_{language}"] = srt_lang_path
+    records = collect_metrics(file_name)
+    if config["metrics"]["enable"]:
+        save_metrics(
+            f"{file_name}_preview_metrics.json", records, video=video_path, fps=fps
+        )
+    update_status(f"Preview done! {output_path}")
+    return artifacts
@@ -0,0 +1,319 @@
+import contextlib
+import datetime
+import http.server
+import json
+import os
+import queue
+import shutil
+import threading
+import traceback
+import uuid
+from typing import List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from modules.pipeline import run_pipeline
+from utils.logging_utils import update_status
+
+JOB_OPTIONS = {"shards": int, "delete": bool}
+
+
+class ModelPool:
+    """
+    常驻内存的模型池，按需创建 PaddleOCR 和 STTN 实例并在任务之间复用。
+
+    每种模型最多创建 size 个实例，借用时若没有空闲实例且已达到上限则等待归还。
+    """
+
+    def __init__(self, config: dict, size: int = 1):
+        self.config = config
+        self.size = size
+        self._queues = {"ocr": queue.Queue(), "sttn": queue.Queue()}
+        self._created = {"ocr": 0, "sttn": 0}
+        self._lock = threading.Lock()
+
+    def _build(self, kind: str):
+        if kind == "ocr":
+            from modules.ocr import build_ocr_model
+
+            return build_ocr_model(self.config)
+        from modules.erase import get_device, load_sttn_model
+
+        return load_sttn_model(self.config, get_device())
+
+    def warm_up(self):
+        """
+        预先加载每种模型的一个实例，使第一个任务也无需等待模型加载。
+        """
+        for kind in self._queues:
+            with self.acquire(kind):
+                pass
+
+    @contextlib.contextmanager
+    def acquire(self, kind: str):
+        """
+        借用一个模型实例，退出上下文时归还。
+
+        参数:
+        - kind: 模型类型，"ocr" 或 "sttn"。
+        """
+        instances = self._queues[kind]
+        try:
+            instance = instances.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created[kind] < self.size
+                if create:
+                    self._created[kind] += 1
+            if create:
+                update_status(f"Service: loading {kind} model...")
+                try:
+                    instance = self._build(kind)
+                except BaseException:
+                    with self._lock:
+                        self._created[kind] -= 1
+                    raise
+            else:
+                instance = instances.get()
+        try:
+            yield instance
+        finally:
+            instances.put(instance)
+
+
+class JobManager:
+    """
+    任务管理器：维护任务状态，并由固定数量的工作线程从有界队列中取出任务执行。
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.upload_dir = config["service"]["upload_dir"]
+        self.pool = ModelPool(config, config["service"]["workers"])
+        self.jobs = {}
+        self.lock = threading.RLock()
+        self.queue = queue.Queue(maxsize=config["service"]["queue_size"])
+        for _ in range(config["service"]["workers"]):
+            threading.Thread(target=self._worker, daemon=True).start()
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex[:12]
+
+    def submit(
+        self,
+        video_path: str,
+        languages: List[str],
+        options: dict,
+        job_id: Optional[str] = None,
+    ) -> dict:
+        """
+        提交一个任务。
+
+        参数:
+        - video_path: 输入视频路径。
+        - languages: 目标语言列表。
+        - options: 任务选项，支持 JOB_OPTIONS 中的键。
+        - job_id: 任务 ID，默认自动生成。
+
+        返回:
+        - dict: 任务状态。队列已满时抛出 queue.Full。
+        """
+        job = {
+            "id": job_id or self.new_job_id(),
+            "video": video_path,
+            "languages": languages,
+            "options": options,
+            "status": "queued",
+            "stages": {},
+            "artifacts": {},
+            "error": None,
+            "created": now(),
+            "started": None,
+            "finished": None,
+        }
+        with self.lock:
+            self.queue.put_nowait(job["id"])
+            self.jobs[job["id"]] = job
+        return self.get(job["id"])
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def list(self) -> List[dict]:
+        with self.lock:
+            return [self.get(job_id) for job_id in list(self.jobs)]
+
+    def _update(self, job_id: str, **values):
+        with self.lock:
+            self.jobs[job_id].update(values)
+
+    def _on_event(self, job_id: str, name: str, state: str):
+        with self.lock:
+            self.jobs[job_id]["stages"][name] = {"state": state, "time": now()}
+
+    def _worker(self):
+        while True:
+            job_id = self.queue.get()
+            job = self.get(job_id)
+            self._update(job_id, status="running", started=now())
+            # 中间产物前缀带上任务 ID，同一视频的并发任务互不冲突
+            config = dict(
+                self.config, workspace=dict(self.config["workspace"], job=job_id)
+            )
+            try:
+                artifacts = run_pipeline(
+                    job["video"],
+                    job["languages"],
+                    config,
+                    delete=job["options"].get("delete", False),
+                    shard_count=job["options"].get("shards", 1),
+                    pool=self.pool,
+                    on_event=lambda name, state: self._on_event(job_id, name, state),
+                )
+                self._update(job_id, status="done", artifacts=artifacts)
+            except Exception as e:
+                traceback.print_exc()
+                self._update(job_id, status="failed", error=str(e))
+            finally:
+                self._update(job_id, finished=now())
+                self.queue.task_done()
+
+
+def now() -> str:
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_options(options: dict) -> dict:
+    """
+    校验并转换任务选项，未知选项或类型错误时抛出 ValueError。
+    """
+    parsed = {}
+    for key, value in options.items():
+        if key not in JOB_OPTIONS:
+            raise ValueError(f"Unknown option: {key}")
+        if JOB_OPTIONS[key] is bool and isinstance(value, str):
+            value = value.lower() in ("1", "true", "yes")
+        parsed[key] = JOB_OPTIONS[key](value)
+    return parsed
+
+
+class ServiceHandler(http.server.BaseHTTPRequestHandler):
+    """
+    任务 HTTP 接口：
+
+    - POST /jobs: 提交任务。JSON 请求体 {"video": 路径, "languages": [...], "options": {...}}；
+      或直接上传视频文件，通过查询参数 filename、languages 和选项名传递参数。
+    - GET /jobs: 列出所有任务。
+    - GET /jobs/<id>: 查询任务状态和各阶段进度。
+    - GET /jobs/<id>/artifacts/<name>: 下载任务产物。
+    """
+
+    manager: JobManager = None
+
+    def log_message(self, format, *args):
+        update_status(f"Service: {self.address_string()} {format % args}")
+
+    def send_json(self, status: int, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        parts = [part for part in urlparse(self.path).path.split("/") if part]
+        if parts == ["jobs"]:
+            return self.send_json(200, self.manager.list())
+        if len(parts) < 2 or parts[0] != "jobs":
+            return self.send_json(404, {"error": "Not found"})
+        job = self.manager.get(parts[1])
+        if job is None:
+            return self.send_json(404, {"error": "Job not found"})
+        if len(parts) == 2:
+            return self.send_json(200, job)
+        if len(parts) == 4 and parts[2] == "artifacts":
+            path = job["artifacts"].get(parts[3])
+            if path is None or not os.path.exists(path):
+                return self.send_json(404, {"error": "Artifact not found"})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.send_header(
+                "Content-Disposition",
+                f'attachment; filename="{os.path.basename(path)}"',
+            )
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+        return self.send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path.rstrip("/") != "/jobs":
+            return self.send_json(404, {"error": "Not found"})
+        length = int(self.headers.get("Content-Length", 0))
+        content_type = self.headers.get("Content-Type", "")
+        job_id = self.manager.new_job_id()
+        try:
+            if content_type.startswith("application/json"):
+                data = json.loads(self.rfile.read(length) or b"{}")
+                video_path = data.get("video", "")
+                languages = data.get("languages", [])
+                options = parse_options(data.get("options", {}))
+            else:
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                filename = os.path.basename(query.pop("filename", "video.mp4"))
+                languages = [
+                    language for language in query.pop("languages", "").split(",") if language
+                ]
+                options = parse_options(query)
+                upload_directory_path = os.path.join(self.manager.upload_dir, job_id)
+                os.makedirs(upload_directory_path, exist_ok=True)
+                video_path = os.path.join(upload_directory_path, filename)
+                with open(video_path, "wb") as f:
+                    remaining = length
+                    while remaining > 0:
+                        chunk = self.rfile.read(min(remaining, 1 << 20))
+                        if not chunk:
+                            break
+                        f.write(chunk)
+                        remaining -= len(chunk)
+        except ValueError as e:
+            return self.send_json(400, {"error": str(e)})
+
+        if not video_path or not os.path.exists(video_path):
+            return self.send_json(400, {"error": f"Video not found: {video_path}"})
+        if not languages or not all(isinstance(language, str) for language in languages):
+            return self.send_json(400, {"error": "languages must be a non-empty list"})
+        try:
+            job = self.manager.submit(video_path, languages, options, job_id)
+        except queue.Full:
+            return self.send_json(503, {"error": "Job queue is full"})
+        return self.send_json(202, job)
+
+
+def serve(config: dict, host: str, port: int, warm_up: bool = True):
+    """
+    启动常驻任务服务。
+
+    参数:
+    - config: 配置字典，服务启动时只读取一次。
+    - host: 监听地址。
+    - port: 监听端口。
+    - warm_up: 是否在启动时预先加载模型。
+    """
+    manager = JobManager(config)
+    if warm_up:
+        manager.pool.warm_up()
+    handler = type("Handler", (ServiceHandler,), {"manager": manager})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    update_status(f"Service: listening on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,251 @@
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+from typing import List, Optional
+
+import pysrt
+
+from modules.erase import remove_subtitles
+from modules.ocr import build_ocr_model, extract_subtitles
+from modules.subtitle import get_subtitles
+from utils.logging_utils import update_status
+from utils.metrics_utils import add_metrics, call_with_metrics, track_stage
+from utils.video_utils import (
+    concat_videos,
+    create_video,
+    detect_duration,
+    detect_size,
+    extract_frames,
+    get_temp_frame_paths,
+    mux_audio,
+    read_frame,
+)
+from utils.workspace_utils import get_job_prefix
+
+
+def has_subtitle(ocr, img_array, config: dict) -> bool:
+    """
+    判断图像的字幕区域内是否存在文字，只做文字检测，不做识别。
+
+    参数:
+    - ocr: PaddleOCR 实例。
+    - img_array: RGB 图像数组。
+    - config: 配置字典。
+
+    返回:
+    - bool: 字幕区域内检测到文字时返回 True。
+    """
+    min_height = int(img_array.shape[0] * config["ocr"]["min_height_ratio"])
+    max_height = int(img_array.shape[0] * config["ocr"]["max_height_ratio"])
+    results = ocr.ocr(img_array[min_height:max_height, :, :], cls=False, det=True, rec=False)
+    return bool(results and results[0])
+
+
+def find_shard_boundaries(
+    video_path: str, fps: float, frame_total: int, shard_count: int, config: dict
+) -> List[int]:
+    """
+    在无字幕的时间点上划分分片边界。
+
+    对每个等分点，在其附近按 probe_interval 间隔稀疏采样，依次向后、向前搜索，
+    取第一个字幕区域内没有文字的帧作为边界；搜索范围内都有字幕时退回等分点。
+
+    参数:
+    - video_path: 输入视频路径。
+    - fps: 视频帧率。
+    - frame_total: 视频总帧数。
+    - shard_count: 分片数量。
+    - config: 配置字典。
+
+    返回:
+    - List[int]: 每个分片的起始帧序号（从 0 开始），第一个元素为 0。
+    """
+    width, height = detect_size(video_path)
+    step = max(1, int(fps * config["shard"]["probe_interval"]))
+    search = int(fps * config["shard"]["search_seconds"])
+    ocr = build_ocr_model(config)
+
+    boundaries = [0]
+    for k in range(1, shard_count):
+        ideal = k * frame_total // shard_count
+        boundary = ideal
+        for offset in range(0, search + 1, step):
+            candidates = [ideal + offset] if offset == 0 else [ideal + offset, ideal - offset]
+            found = False
+            for candidate in candidates:
+                if candidate <= boundaries[-1] or candidate >= frame_total:
+                    continue
+                img_array = read_frame(video_path, candidate / fps, width, height)
+                if img_array is not None and not has_subtitle(ocr, img_array, config):
+                    boundary = candidate
+                    found = True
+                    break
+            if found:
+                break
+        if boundary > boundaries[-1]:
+            boundaries.append(boundary)
+    return boundaries
+
+
+def process_shard(
+    video_path: str,
+    shard_directory_path: str,
+    start_frame: int,
+    frame_count: Optional[int],
+    fps: float,
+    config: dict,
+):
+    """
+    在独立的工作进程中处理一个分片：提取帧、OCR、擦除字幕并编码。
+
+    参数:
+    - video_path: 输入视频路径。
+    - shard_directory_path: 分片的临时目录。
+    - start_frame: 分片起始帧序号（从 0 开始）。
+    - frame_count: 分片帧数，None 表示到视频结尾。
+    - fps: 视频帧率。
+    - config: 配置字典。
+
+    返回:
+    - dict: 包含分片的 SRT 路径、视频路径、字幕中心位置和起始帧序号，分片无帧时返回 None。
+    """
+    frame_directory_path = os.path.join(shard_directory_path, "frames")
+    prefix = get_job_prefix(video_path, config)
+    with track_stage("extract", config, prefix):
+        extract_frames(
+            video_path,
+            fps,
+            temp_directory_path=frame_directory_path,
+            start_frame=start_frame,
+            frame_count=frame_count,
+        )
+        frame_paths = get_temp_frame_paths(frame_directory_path)
+    if not frame_paths:
+        return None
+
+    with track_stage("ocr", config, prefix):
+        timeline, y_center = extract_subtitles(frame_paths, config, fps)
+    with track_stage("subtitle", config, prefix):
+        srt_path = get_subtitles(
+            timeline, config, fps, os.path.join(shard_directory_path, "shard")
+        )
+    with track_stage("erase", config, prefix):
+        remove_subtitles(timeline, frame_paths, fps, config)
+
+    shard_video_path = os.path.join(shard_directory_path, "video.mp4")
+    with track_stage("encode", config, prefix):
+        create_video(
+            video_path,
+            shard_video_path,
+            fps,
+            temp_directory_path=frame_directory_path,
+            with_audio=False,
+        )
+    return {
+        "srt": srt_path,
+        "video": shard_video_path,
+        "y_center": y_center,
+        "start_frame": start_frame,
+        "has_subtitle": bool(timeline),
+    }
+
+
+def merge_srt(shard_results: List[dict], fps: float, srt_path: str):
+    """
+    合并各分片的字幕，按分片起始时间平移时间戳并重新编号。
+
+    参数:
+    - shard_results: process_shard 的返回值列表，按时间顺序排列。
+    - fps: 视频帧率。
+    - srt_path: 合并后的 SRT 文件路径。
+
+    返回:
+    - 合并后的 SRT 文件路径。
+    """
+    merged = pysrt.SubRipFile()
+    for result in shard_results:
+        subs = pysrt.open(result["srt"])
+        subs.shift(milliseconds=int(result["start_frame"] / fps * 1000))
+        merged.extend(subs)
+    merged.clean_indexes()
+    merged.save(srt_path, encoding="utf-8")
+    return srt_path
+
+
+def run_shards(
+    video_path: str,
+    output_path: str,
+    srt_path: str,
+    fps: float,
+    shard_count: int,
+    config: dict,
+    delete: bool = False,
+):
+    """
+    分片并行处理长视频，并将结果拼接回完整的字幕和视频。
+
+    参数:
+    - video_path: 输入视频路径。
+    - output_path: 擦除字幕后的视频路径。
+    - srt_path: 合并后的 SRT 文件路径。
+    - fps: 视频帧率。
+    - shard_count: 分片数量。
+    - config: 配置字典。
+    - delete: 处理完成后是否删除分片临时目录。
+
+    返回:
+    - (srt_path, output_path, y_center) 元组。
+    """
+    frame_total = int(detect_duration(video_path) * fps)
+    update_status(f"Shard: finding boundaries for {shard_count} shards...")
+    boundaries = find_shard_boundaries(video_path, fps, frame_total, shard_count, config)
+    update_status(f"Shard: boundaries {boundaries}")
+
+    work_directory_path = f"{get_job_prefix(video_path, config)}_shards"
+    workers = config["shard"]["workers"] or min(len(boundaries), os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = []
+        for index, start_frame in enumerate(boundaries):
+            frame_count = None
+            if index + 1 < len(boundaries):
+                frame_count = boundaries[index + 1] - start_frame
+            futures.append(
+                executor.submit(
+                    call_with_metrics,
+                    process_shard,
+                    video_path,
+                    os.path.join(work_directory_path, f"shard_{index:03d}"),
+                    start_frame,
+                    frame_count,
+                    fps,
+                    config,
+                )
+            )
+        shard_results = []
+        for index, future in enumerate(futures):
+            result, records = future.result()
+            for record in records:
+                record["shard"] = index
+            add_metrics(records)
+            shard_results.append(result)
+    shard_results = [result for result in shard_results if result is not None]
+
+    update_status("Shard: merging results...")
+    merge_srt(shard_results, fps, srt_path)
+    concat_path = f"{os.path.splitext(output_path)[0]}_concat.mp4"
+    concat_videos([result["video"] for result in shard_results], concat_path)
+    mux_audio(concat_path, video_path, output_path)
+    if os.path.exists(concat_path):
+        os.remove(concat_path)
+
+    y_centers = sorted(
+        result["y_center"] for result in shard_results if result["has_subtitle"]
+    )
+    y_center = y_centers[len(y_centers) // 2] if y_centers else 0
+
+    if delete:
+        shutil.rmtree(work_directory_path, ignore_errors=True)
+    return srt_path, output_path, y_center
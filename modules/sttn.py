@@ -11,6 +11,7 @@ from tqdm import tqdm
 
 from STTN.core.utils import Stack, ToTorchFormatTensor
 from STTN.model import sttn
+from utils.metrics_utils import incr
 
 _to_tensors = transforms.Compose([Stack(), ToTorchFormatTensor()])
 
@@ -68,7 +69,7 @@ def inpaint_video_with_builded_sttn(
     使用预训练的STTN模型对视频中的破损帧进行修复。
 
     参数:
-    model: STTN模型实例，用于帧修复。
+    model: STTN模型实例，用于帧修复，可以是 PyTorch 的 InpaintGenerator 或 sttn_onnx.OnnxSTTN。
     paths: 每帧的文件路径列表。
     frames: 视频帧的图像列表。
     masks: 视频帧的遮罩列表，用于指示需要修复的区域。
@@ -109,13 +110,14 @@ def inpaint_video_with_builded_sttn(
             feats[0, neighbor_ids + ref_ids, :, :, :],
             _masks[0, neighbor_ids + ref_ids, :, :, :],
         )
+        incr("sttn_calls")
         pred_img = model.decoder(pred_feat[: len(neighbor_ids), :, :, :])
         pred_img = torch.tanh(pred_img)
         pred_img = (pred_img + 1) / 2
         pred_img = pred_img.permute(0, 2, 3, 1) * 255
         for i in range(len(neighbor_ids)):
             idx = neighbor_ids[i]
-            b_mask = _masks.squeeze()[idx].unsqueeze(-1)
+            b_mask = _masks[0, idx, 0].unsqueeze(-1)
             b_mask = (b_mask != 0).int()
             frame = torch.from_numpy(np.array(frames[idx].resize((w, h))))
             frame = frame.to(device)
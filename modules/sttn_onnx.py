@@ -0,0 +1,259 @@
+import argparse
+import os
+import sys
+import time
+
+import torch
+from torch import nn
+
+from modules.config import load_config
+from modules.sttn import build_sttn_model, get_ref_index
+
+# STTN 固定在 432x240 分辨率上修复，编码器下采样 4 倍
+WIDTH, HEIGHT = 432, 240
+PARTS = ["encoder", "infer", "decoder"]
+
+
+class _Infer(nn.Module):
+    """
+    将 InpaintGenerator.infer 包装为 forward，便于导出。
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, feat, masks):
+        return self.model.infer(feat, masks)
+
+
+def onnx_paths(onnx_dir: str, int8: bool = False) -> dict:
+    """
+    获取编码器、transformer 推理和解码器三个 ONNX 文件的路径。
+
+    参数:
+    - onnx_dir: ONNX 文件所在目录。
+    - int8: 是否使用动态 int8 量化后的文件。
+
+    返回:
+    - dict: 键为 encoder、infer、decoder，值为文件路径。
+    """
+    suffix = "_int8" if int8 else ""
+    return {part: os.path.join(onnx_dir, f"{part}{suffix}.onnx") for part in PARTS}
+
+
+@torch.no_grad()
+def export_onnx(model, onnx_dir: str, frame_count: int = 8, opset: int = 14):
+    """
+    将 STTN 的编码器、transformer 推理和解码器分别导出为 ONNX，帧数维度为动态维度。
+
+    参数:
+    - model: 已加载权重的 STTN 模型，须在 CPU 上。
+    - onnx_dir: 输出目录。
+    - frame_count: 导出时示例输入的帧数。
+    - opset: ONNX 算子集版本。
+
+    返回:
+    - dict: 导出的文件路径。
+    """
+    os.makedirs(onnx_dir, exist_ok=True)
+    paths = onnx_paths(onnx_dir)
+    frames = torch.randn(frame_count, 3, HEIGHT, WIDTH)
+    masks = torch.zeros(frame_count, 1, HEIGHT, WIDTH)
+    masks[:, :, HEIGHT * 3 // 4 :, :] = 1
+    feat = model.encoder(frames)
+
+    dynamic = {0: "frames"}
+    torch.onnx.export(
+        model.encoder,
+        (frames,),
+        paths["encoder"],
+        input_names=["frames"],
+        output_names=["feat"],
+        dynamic_axes={"frames": dynamic, "feat": dynamic},
+        opset_version=opset,
+    )
+    torch.onnx.export(
+        _Infer(model),
+        (feat, masks),
+        paths["infer"],
+        input_names=["feat", "masks"],
+        output_names=["pred_feat"],
+        dynamic_axes={"feat": dynamic, "masks": dynamic, "pred_feat": dynamic},
+        opset_version=opset,
+    )
+    torch.onnx.export(
+        model.decoder,
+        (feat,),
+        paths["decoder"],
+        input_names=["feat"],
+        output_names=["pred_img"],
+        dynamic_axes={"feat": dynamic, "pred_img": dynamic},
+        opset_version=opset,
+    )
+    return paths
+
+
+def quantize_onnx(onnx_dir: str) -> dict:
+    """
+    对导出的 ONNX 文件做动态 int8 量化，权重离线量化，激活在运行时量化，无需校准数据。
+
+    参数:
+    - onnx_dir: ONNX 文件所在目录。
+
+    返回:
+    - dict: 量化后的文件路径。
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    paths = onnx_paths(onnx_dir)
+    int8_paths = onnx_paths(onnx_dir, int8=True)
+    for part in PARTS:
+        quantize_dynamic(paths[part], int8_paths[part], weight_type=QuantType.QUInt8)
+    return int8_paths
+
+
+class OnnxSTTN:
+    """
+    使用 ONNX Runtime 推理的 STTN，与 InpaintGenerator 一样提供 encoder、infer 和 decoder，
+    可直接传给 inpaint_video_with_builded_sttn。输入输出均为 torch.Tensor，输出放回输入所在的设备。
+    """
+
+    def __init__(self, onnx_dir: str, threads: int = 0, int8: bool = False):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.sessions = {
+            part: ort.InferenceSession(
+                path, options, providers=["CPUExecutionProvider"]
+            )
+            for part, path in onnx_paths(onnx_dir, int8).items()
+        }
+
+    def _run(self, part: str, *tensors: torch.Tensor) -> torch.Tensor:
+        session = self.sessions[part]
+        inputs = {
+            arg.name: tensor.detach().cpu().float().numpy()
+            for arg, tensor in zip(session.get_inputs(), tensors)
+        }
+        output = session.run(None, inputs)[0]
+        return torch.from_numpy(output).to(tensors[0].device)
+
+    def encoder(self, frames: torch.Tensor) -> torch.Tensor:
+        return self._run("encoder", frames)
+
+    def infer(self, feat: torch.Tensor, masks: torch.Tensor) -> torch.Tensor:
+        return self._run("infer", feat, masks)
+
+    def decoder(self, feat: torch.Tensor) -> torch.Tensor:
+        return self._run("decoder", feat)
+
+
+def build_onnx_sttn_model(config: dict) -> OnnxSTTN:
+    """
+    根据配置构建 ONNX Runtime 后端的 STTN，ONNX 文件不存在时先从 erase.ckpt_p 导出（及量化）。
+
+    参数:
+    - config: 配置字典。
+
+    返回:
+    - OnnxSTTN 实例。
+    """
+    onnx_dir = config["erase"]["onnx_dir"]
+    int8 = config["erase"]["onnx_int8"]
+    if not all(os.path.exists(path) for path in onnx_paths(onnx_dir).values()):
+        export_onnx(build_sttn_model(config["erase"]["ckpt_p"], "cpu"), onnx_dir)
+    if int8 and not all(
+        os.path.exists(path) for path in onnx_paths(onnx_dir, True).values()
+    ):
+        quantize_onnx(onnx_dir)
+    return OnnxSTTN(onnx_dir, config["erase"]["onnx_threads"], int8)
+
+
+@torch.no_grad()
+def run_steps(model, frames: torch.Tensor, masks: torch.Tensor, neighbor_stride: int):
+    """
+    按 inpaint_video_with_builded_sttn 的方式执行编码、逐段推理和解码，返回解码结果列表。
+    """
+    video_length = frames.size(0)
+    feats = model.encoder(frames * (1 - masks))
+    outputs = []
+    for f in range(0, video_length, neighbor_stride):
+        neighbor_ids = list(
+            range(max(0, f - neighbor_stride), min(video_length, f + neighbor_stride + 1))
+        )
+        ids = neighbor_ids + get_ref_index(neighbor_ids, video_length)
+        pred_feat = model.infer(feats[ids], masks[ids])
+        outputs.append(torch.tanh(model.decoder(pred_feat[: len(neighbor_ids)])))
+    return outputs
+
+
+def compare(
+    torch_model, onnx_model, frame_count: int = 40, neighbor_stride: int = 10, repeat: int = 3
+) -> dict:
+    """
+    在随机输入上比较 PyTorch 与 ONNX Runtime 的输出差异和耗时。
+
+    参数:
+    - torch_model: CPU 上的 STTN 模型。
+    - onnx_model: OnnxSTTN 实例。
+    - frame_count: 测试帧数。
+    - neighbor_stride: 邻居帧步长。
+    - repeat: 计时重复次数，取最小值。
+
+    返回:
+    - dict: 最大/平均绝对误差（输出范围 [-1, 1]）以及两者单次耗时（秒）。
+    """
+    generator = torch.Generator().manual_seed(0)
+    frames = torch.rand(frame_count, 3, HEIGHT, WIDTH, generator=generator) * 2 - 1
+    masks = torch.zeros(frame_count, 1, HEIGHT, WIDTH)
+    masks[:, :, HEIGHT * 3 // 4 : HEIGHT * 9 // 10, WIDTH // 8 : WIDTH * 7 // 8] = 1
+
+    result = {}
+    outputs = {}
+    for name, model in (("torch", torch_model), ("onnx", onnx_model)):
+        seconds = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            outputs[name] = run_steps(model, frames, masks, neighbor_stride)
+            seconds.append(time.perf_counter() - start)
+        result[f"{name}_s"] = round(min(seconds), 4)
+
+    diff = torch.cat([(a - b).abs().flatten() for a, b in zip(outputs["torch"], outputs["onnx"])])
+    result["max_abs_diff"] = float(diff.max())
+    result["mean_abs_diff"] = float(diff.mean())
+    result["speedup"] = round(result["torch_s"] / result["onnx_s"], 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export STTN to ONNX and compare ONNX Runtime against PyTorch."
+    )
+    parser.add_argument("--int8", action="store_true", help="Also build and check the int8 model.")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime intra-op threads.")
+    parser.add_argument("--frames", type=int, default=40, help="Frames used for the check.")
+    parser.add_argument("--max-diff", type=float, default=1e-3, help="Fail above this error.")
+    args = parser.parse_args()
+
+    config = load_config()
+    onnx_dir = config["erase"]["onnx_dir"]
+    threads = config["erase"]["onnx_threads"] if args.threads is None else args.threads
+    if threads:
+        torch.set_num_threads(threads)
+    torch_model = build_sttn_model(config["erase"]["ckpt_p"], "cpu")
+    export_onnx(torch_model, onnx_dir)
+    # fp32 图与 PyTorch 应基本一致；int8 只报告误差，由使用者判断画质是否可接受
+    result = compare(torch_model, OnnxSTTN(onnx_dir, threads), args.frames)
+    print("fp32", result)
+    failed = result["max_abs_diff"] > args.max_diff
+    if args.int8:
+        quantize_onnx(onnx_dir)
+        print("int8", compare(torch_model, OnnxSTTN(onnx_dir, threads, True), args.frames))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
-import os
 import re
 
 from tqdm import tqdm
 
 from utils.subtitle_utils import create_srt_entry
+from utils.timeline_utils import Timeline
 
 
 def remove_punctuation(text):
@@ -12,71 +12,178 @@ def remove_punctuation(text):
     return re.sub(punctuation_pattern, "", text)
 
 
-def get_subtitles(ocr_result: dict, config: dict, fps: float, file_name: str):
+class CueBuilder:
+    """
+    在线字幕条目生成器。
+
+    按帧号顺序逐帧输入OCR文本，文本变化且超过 min_duration 后即可确定一条字幕已经结束，
+    此时立即输出该条字幕（写入 SRT 文件并回调 on_cue），不必等待整个视频识别完成。
+    生成结果与先切分、再合并相邻相同文本的两遍处理一致。
+    """
+
+    def __init__(
+        self, fps: float, min_duration: float, srt_path: str = None, on_cue=None
+    ):
+        """
+        参数:
+        - fps: 视频的帧率。
+        - min_duration: 最小字幕持续时间，单位秒。
+        - srt_path: 增量写入的 SRT 文件路径，为 None 时不写文件。
+        - on_cue: 每输出一条字幕时调用的回调，参数为字幕字典，可用于放入队列。
+        """
+        self.fps = fps
+        self.frames = fps * min_duration
+        self.on_cue = on_cue
+        self.cues = []
+        self._file = open(srt_path, "w") if srt_path else None
+        self._frame_number_pre = 0
+        self._text_pre = ""
+        self._subtitle = {}
+        self._pending = None
+        self._ready = []
+
+    def add(self, frame_number: int, text: str) -> list:
+        """
+        输入一帧的识别文本。
+
+        参数:
+        - frame_number: 帧号，须递增。
+        - text: 该帧的字幕文本。
+
+        返回:
+        - list: 因这一帧而确定结束的字幕列表。
+        """
+        subtitle = self._subtitle
+        if (
+            subtitle
+            and remove_punctuation(text) == remove_punctuation(self._text_pre)
+            and frame_number - self._frame_number_pre <= self.frames
+        ):
+            subtitle["end"] = frame_number
+        else:
+            if subtitle:
+                self._accept(subtitle)
+            subtitle = self._subtitle = {
+                "start": frame_number,
+                "end": frame_number,
+                "text": text,
+            }
+        self._frame_number_pre = frame_number
+        self._text_pre = text
+        self._check_pending()
+        return self._flush()
+
+    def add_interval(self, start: int, end: int, text: str) -> list:
+        """
+        输入一段连续帧的相同文本，结果与对 start 到 end 的每一帧调用 add 一致。
+
+        参数:
+        - start: 起始帧号，须大于之前输入的帧号。
+        - end: 结束帧号（含）。
+        - text: 这些帧的字幕文本。
+
+        返回:
+        - list: 因这些帧而确定结束的字幕列表。
+        """
+        if self.frames < 1:
+            # 相邻帧的间隔已超过最小持续时间，每帧都会单独成段，只能逐帧输入
+            ready = []
+            for frame_number in range(start, end + 1):
+                ready.extend(self.add(frame_number, text))
+            return ready
+        ready = self.add(start, text)
+        if end > start:
+            self._subtitle["end"] = end
+            self._frame_number_pre = end
+            self._check_pending()
+            ready.extend(self._flush())
+        return ready
+
+    def close(self) -> list:
+        """
+        输入结束，输出剩余的字幕并关闭 SRT 文件。
+
+        返回:
+        - list: 剩余的字幕列表。
+        """
+        if self._subtitle:
+            self._accept(self._subtitle)
+            self._subtitle = {}
+        if self._pending:
+            self._emit(self._pending)
+            self._pending = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        return self._flush()
+
+    def _check_pending(self):
+        # 当前片段与待定字幕相隔太远，或当前片段足够长且文本不同，待定字幕都不会再被合并
+        subtitle = self._subtitle
+        pending = self._pending
+        if pending and (
+            subtitle["start"] - pending["end"] > self.frames
+            or (
+                subtitle["end"] - subtitle["start"] > self.frames
+                and remove_punctuation(subtitle["text"])
+                != remove_punctuation(pending["text"])
+            )
+        ):
+            self._emit(pending)
+            self._pending = None
+
+    def _accept(self, subtitle: dict):
+        # 持续时间足够的片段与待定字幕文本相同且间隔不超过 min_duration 时合并
+        if subtitle["end"] - subtitle["start"] <= self.frames:
+            return
+        pending = self._pending
+        if (
+            pending
+            and remove_punctuation(subtitle["text"])
+            == remove_punctuation(pending["text"])
+            and subtitle["start"] - pending["end"] <= self.frames
+        ):
+            pending["end"] = subtitle["end"]
+            return
+        if pending:
+            self._emit(pending)
+        self._pending = subtitle
+
+    def _emit(self, cue: dict):
+        self.cues.append(cue)
+        if self._file:
+            if len(self.cues) > 1:
+                self._file.write("\n")
+            self._file.write(create_srt_entry(cue, len(self.cues), self.fps))
+            self._file.flush()
+        if self.on_cue:
+            self.on_cue(cue)
+        self._ready.append(cue)
+
+    def _flush(self) -> list:
+        ready, self._ready = self._ready, []
+        return ready
+
+
+def get_subtitles(timeline: Timeline, config: dict, fps: float, file_name: str):
     """
     根据OCR结果生成字幕文件。
 
     本函数通过分析OCR识别结果，根据配置和视频帧率，生成符合SRT格式的字幕文本。
-    主要逻辑是通过比较相邻帧的文本内容，来确定字幕的开始和结束帧。
+    主要逻辑是通过比较相邻区间的文本内容，来确定字幕的开始和结束帧。
 
     参数:
-    - ocr_result: dict, 每一帧的OCR识别结果，包含文本信息。
+    - timeline: Timeline, 校验后的字幕区间表。
     - config: dict, 视频处理的配置信息，包括视频最小持续时间等。
     - fps: float, 视频的帧率。
     - file_name: 文件名。
 
     返回:
-    - None
+    - SRT 文件路径。
     """
-    frame_number_pre = 0
-    text_pre = ""
-    subtitles = []
-    subtitle = {}
-    frames = fps * config["video"]["min_duration"]
-    for frame_path, value in tqdm(ocr_result.items(), desc="OCR subtitle"):
-        frame_number = int(os.path.splitext(os.path.basename(frame_path))[0])
-        text = value["text"]
-        text_clean = remove_punctuation(text)
-        text_pre_clean = remove_punctuation(text_pre)
-        if text_clean == text_pre_clean and frame_number - frame_number_pre <= frames:
-            subtitle["end"] = frame_number
-        else:
-            if subtitle:
-                if subtitle["end"] - subtitle["start"] > frames:
-                    subtitles.append(subtitle)
-            subtitle = {
-                "start": frame_number,
-                "end": frame_number,
-                "text": text,
-            }
-        frame_number_pre = frame_number
-        text_pre = text
-
-    if subtitle:
-        if subtitle["end"] - subtitle["start"] > frames:
-            subtitles.append(subtitle)
-
-    subtitle_list = []
-    if subtitles:
-        subtitle_list = [subtitles[0]]
-        for subtitle in subtitles[1:]:
-            text_clean = remove_punctuation(subtitle["text"])
-            text_pre_clean = remove_punctuation(subtitle_list[-1]["text"])
-            if (
-                text_clean == text_pre_clean
-                and subtitle["start"] - subtitle_list[-1]["end"] <= frames
-            ):
-                subtitle_list[-1]["end"] = subtitle["end"]
-            else:
-                subtitle_list.append(subtitle)
-
-    subtitle_text_list = []
-    for index, subtitle in enumerate(subtitle_list):
-        subtitle_text_list.append(create_srt_entry(subtitle, index + 1, fps))
-
-    subtitle_text = "\n".join(subtitle_text_list)
     srt_path = f"{file_name}_zh_ocr.srt"
-    with open(srt_path, "w") as file:
-        file.write(subtitle_text)
-
+    builder = CueBuilder(fps, config["video"]["min_duration"], srt_path)
+    for interval in tqdm(timeline, desc="OCR subtitle"):
+        builder.add_interval(interval.start, interval.end, interval.text)
+    builder.close()
     return srt_path
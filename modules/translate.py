@@ -1,18 +1,23 @@
+import json
 import os
+import re
 import time
+from typing import List
 
 import pysrt
 
+from utils.metrics_utils import incr
 from utils.translation_utils import translate_text
 
 
-def chatgpt_translate(text: str, language: str):
+def chatgpt_translate(text: str, language: str, fmt: str = "srt"):
     """
     使用ChatGPT模型翻译字幕文本。
 
     参数:
     - text: str，需要翻译的字幕文本。
     - language: str，目标翻译语言，如"English"。
+    - fmt: str，文本格式，"srt" 或 "json"。
 
     返回:
     - str，翻译后的字幕文本或错误信息。
@@ -20,7 +25,7 @@ def chatgpt_translate(text: str, language: str):
     content = ""
     try:
         content = translate_text(
-            source_lang="Chinese", target_lang=language, source_text=text
+            source_lang="Chinese", target_lang=language, source_text=text, fmt=fmt
         )
     except Exception as e:
         print(f"chatgpt translate error:" + str(e))
@@ -54,7 +59,119 @@ def check_timeline(srt, new_srt_text):
     return True
 
 
-def translate_subtitles(srt_path: str, target_language: str, try_times: int = 5):
+def parse_translation(content: str) -> dict:
+    """
+    解析模型返回的 JSON 翻译结果，容忍代码块标记和前后多余的文字。
+
+    参数:
+    - content: str，模型返回的文本。
+
+    返回:
+    - dict，字幕编号到译文的映射，无法解析时返回空字典。
+    """
+    match = re.search(r"\{.*\}", content or "", re.S)
+    if not match:
+        return {}
+    try:
+        result = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+    return result if isinstance(result, dict) else {}
+
+
+def request_translations(texts: List[str], target_language: str, try_times: int = 5):
+    """
+    以 JSON 形式只发送字幕编号和文本进行翻译。
+
+    逐个编号校验返回结果，缺失或格式不正确的编号在下一次尝试中单独重新请求。
+
+    :param texts: 字幕文本列表。
+    :param target_language: 目标语言代码，用于翻译。
+    :param try_times: 重试次数，默认为 5 次。
+    :return: 字幕编号（从 "1" 开始的字符串）到译文的映射，多次尝试后仍未翻译的编号不在其中。
+    """
+    pending = {str(i): text for i, text in enumerate(texts, 1)}
+    translations = {}
+    for i in range(try_times):
+        if not pending:
+            break
+        if i > 0:
+            print(f"chatgpt translate {len(pending)} ids missing, try again! {i}")
+            incr("translate_retry_ids", len(pending))
+            time.sleep(1)
+        content = chatgpt_translate(
+            json.dumps(pending, ensure_ascii=False, indent=0), target_language, "json"
+        )
+        for key, text in parse_translation(content).items():
+            key = str(key)
+            if key in pending and isinstance(text, str) and text.strip():
+                translations[key] = text.strip()
+                del pending[key]
+    return translations
+
+
+def check_translations(translations: dict, count: int):
+    """
+    检查是否所有字幕都已翻译，避免半译的字幕被当作译文传给后续步骤。
+
+    :param translations: request_translations 的返回值。
+    :param count: 字幕条数。
+    :raises RuntimeError: 多次尝试后仍有字幕未翻译。
+    """
+    missing = [str(i) for i in range(1, count + 1) if str(i) not in translations]
+    if missing:
+        incr("translate_missing_ids", len(missing))
+        raise RuntimeError(
+            f"chatgpt translate {len(missing)}/{count} ids still missing: "
+            + ", ".join(missing[:20])
+        )
+
+
+def translate_texts(texts: List[str], target_language: str, try_times: int = 5):
+    """
+    翻译字幕文本列表，见 request_translations。
+
+    :param texts: 字幕文本列表。
+    :param target_language: 目标语言代码，用于翻译。
+    :param try_times: 重试次数，默认为 5 次。
+    :return: 与 texts 一一对应的译文列表。
+    :raises RuntimeError: 多次尝试后仍有字幕未翻译。
+    """
+    translations = request_translations(texts, target_language, try_times)
+    check_translations(translations, len(texts))
+    return [translations[str(i)] for i in range(1, len(texts) + 1)]
+
+
+def translate_subtitles_json(
+    srt_path: str, srt_path_translated: str, target_language: str, try_times: int = 5
+):
+    """
+    以 JSON 形式只发送字幕编号和文本进行翻译，时间轴在本地重新附加，见 request_translations。
+
+    只有全部字幕都翻译成功时才保存译文，否则不写文件并抛出异常，
+    避免半译的字幕被嵌入视频或在之后的运行中被当作缓存复用。
+
+    :param srt_path: 字幕文件的路径。
+    :param srt_path_translated: 翻译后字幕文件的保存路径。
+    :param target_language: 目标语言代码，用于翻译。
+    :param try_times: 重试次数，默认为 5 次。
+    :return: 翻译后字幕文件的路径。
+    :raises RuntimeError: 多次尝试后仍有字幕未翻译。
+    """
+    srt = pysrt.open(srt_path)
+    translations = request_translations(
+        [sub.text for sub in srt], target_language, try_times
+    )
+    check_translations(translations, len(srt))
+    for i, sub in enumerate(srt, 1):
+        sub.text = translations[str(i)]
+    srt.save(srt_path_translated, encoding="utf-8")
+    return srt_path_translated
+
+
+def translate_subtitles(
+    srt_path: str, target_language: str, try_times: int = 5, mode: str = "srt"
+):
     """
     将字幕翻译成目标语言并保存。
 
@@ -64,11 +181,17 @@ def translate_subtitles(srt_path: str, target_language: str, try_times: int = 5)
     :param srt_path: 字幕文件的路径。
     :param target_language: 目标语言代码，用于翻译。
     :param try_times: 重试次数，默认为 5 次。
+    :param mode: "srt" 发送完整的 SRT 文本，"json" 只发送字幕编号和文本，见 translate_subtitles_json。
     :return: 翻译后字幕文件的路径。
     """
     srt_path_english = srt_path.replace("_zh", f"_{target_language}")
     if os.path.exists(srt_path_english):
+        incr("cache_hits")
         return srt_path_english
+    if mode == "json":
+        return translate_subtitles_json(
+            srt_path, srt_path_english, target_language, try_times
+        )
 
     with open(srt_path, "r", encoding="utf-8") as f:
         subtitles = f.read().strip()
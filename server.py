@@ -0,0 +1,7 @@
+import sys
+
+from main import main
+
+if __name__ == "__main__":
+    # 等价于 python main.py serve
+    main(["serve"] + sys.argv[1:])
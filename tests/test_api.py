@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from modules.api import FrameSink, FrameSource, VideoFrames
+
+
+def make_source(count: int) -> FrameSource:
+    return FrameSource.from_arrays(
+        {n: np.full((4, 6, 3), n, dtype=np.uint8) for n in range(1, count + 1)}, 25
+    )
+
+
+def test_frame_sink_spills_to_disk():
+    source = make_source(10)
+    sink = FrameSink(source, max_frames=2)
+    for n in range(3, 8):
+        sink.put(n, np.full((4, 6, 3), 100 + n, dtype=np.uint8))
+
+    assert len(sink._frames) == 2
+    assert sink.changed == [3, 4, 5, 6, 7]
+    directory_path = sink._spill_directory.name
+    assert len(os.listdir(directory_path)) == 3
+    assert [int(frame[0, 0, 0]) for _, frame in sink] == [
+        1,
+        2,
+        103,
+        104,
+        105,
+        106,
+        107,
+        8,
+        9,
+        10,
+    ]
+
+    sink.close()
+    assert not os.path.exists(directory_path)
+
+
+def test_video_frames_restarts_only_backwards(monkeypatch):
+    passes = []
+
+    def read_frames(video_path, fps, width, height):
+        passes.append(video_path)
+        for n in range(1, 11):
+            yield np.full((height, width, 3), n, dtype=np.uint8)
+
+    monkeypatch.setattr("modules.api.read_frames", read_frames)
+    frames = VideoFrames("video.mp4", 25, (6, 4), cache_size=3)
+
+    assert [int(frames(n)[0, 0, 0]) for n in (1, 5, 3, 4, 9)] == [1, 5, 3, 4, 9]
+    assert len(passes) == 1
+    assert int(frames(2)[0, 0, 0]) == 2
+    assert len(passes) == 2
@@ -0,0 +1,28 @@
+import pytest
+
+autotune = pytest.importorskip("modules.autotune")
+
+RESULTS = [
+    {"name": "reference", "fps": 2.0, "peak_memory_mb": 3000, "psnr": 100.0},
+    {"name": "balanced", "fps": 5.0, "peak_memory_mb": 2000, "psnr": 45.0},
+    {"name": "fast", "fps": 9.0, "peak_memory_mb": 1000, "psnr": 32.0},
+]
+
+
+def choose(min_fps=0, max_memory_mb=0, min_psnr=40):
+    return autotune.choose_setting(RESULTS, min_fps, max_memory_mb, min_psnr)["name"]
+
+
+def test_choose_setting_fastest_above_psnr_floor():
+    # 没有预算时不会总是选中最慢的参考组合
+    assert choose() == "balanced"
+    assert choose(min_psnr=30) == "fast"
+
+
+def test_choose_setting_budget():
+    assert choose(max_memory_mb=2500) == "balanced"
+    # 满足预算的组合都达不到画质下限时取画质最好的一组
+    assert choose(min_fps=4, min_psnr=50) == "balanced"
+    # 没有组合满足预算时取最快的一组
+    assert choose(min_fps=20) == "fast"
+    assert choose(max_memory_mb=500) == "fast"
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from utils.dag_utils import Task, check_dag, run_dag
+
+
+def test_run_dag_passes_results_in_dependency_order():
+    order = []
+
+    def step(*args, name):
+        order.append(name)
+        return name + "".join(args)
+
+    tasks = [
+        Task("c", step, deps=("a", "b"), kwargs={"name": "c"}),
+        Task("a", step, kwargs={"name": "a"}),
+        Task("b", step, deps=("a",), kwargs={"name": "b"}),
+    ]
+    results = run_dag(tasks, use_processes=False)
+
+    assert order == ["a", "b", "c"]
+    assert results == {"a": "a", "b": "ba", "c": "caba"}
+
+
+def test_run_dag_runs_independent_tasks_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+    tasks = [
+        Task("left", barrier.wait),
+        Task("right", barrier.wait),
+        Task("join", lambda left, right: "joined", deps=("left", "right")),
+    ]
+    assert run_dag(tasks, max_threads=2)["join"] == "joined"
+
+
+def test_run_dag_failure_cancels_dependents():
+    events = []
+    started = []
+
+    def fail():
+        raise RuntimeError("boom")
+
+    tasks = [
+        Task("fail", fail),
+        Task("after", lambda value: started.append(value), deps=("fail",)),
+    ]
+    with pytest.raises(RuntimeError, match="boom"):
+        run_dag(tasks, on_event=lambda name, state: events.append((name, state)))
+
+    assert not started
+    assert events == [("fail", "running"), ("fail", "failed")]
+
+
+@pytest.mark.parametrize(
+    "tasks",
+    [
+        [Task("a", print), Task("a", print)],
+        [Task("a", print, deps=("missing",))],
+        [Task("a", print, deps=("b",)), Task("b", print, deps=("a",))],
+    ],
+)
+def test_check_dag_rejects_invalid_graphs(tasks):
+    with pytest.raises(ValueError):
+        check_dag(tasks)
@@ -0,0 +1,232 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from utils.timeline_utils import Interval, Timeline
+
+erase = pytest.importorskip("modules.erase")
+
+CONFIG = {"erase": {"mask_expand": 3, "reuse_tolerance": 1.5}}
+
+
+def make_mask() -> Image.Image:
+    mask = np.zeros((60, 80), dtype=np.uint8)
+    mask[40:50, 10:70] = 255
+    return Image.fromarray(mask)
+
+
+def make_frames(count: int) -> list:
+    background = np.random.default_rng(0).integers(0, 255, (60, 80, 3), np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        # 字幕在掩膜内变化，背景静止
+        frame[42:48, 20:60] = i * 10
+        frames.append(Image.fromarray(frame))
+    return frames
+
+
+def fake_sttn(calls: list):
+    def inpaint(model, paths, frames, masks, neighbor_stride, device):
+        calls.append(list(paths))
+        result = []
+        for path, frame, mask in zip(paths, frames, masks):
+            frame = np.array(frame)
+            frame[np.array(mask) != 0] = path
+            result.append([path, frame])
+        return result
+
+    return inpaint
+
+
+def test_inpaint_reused_one_run(monkeypatch):
+    calls = []
+    monkeypatch.setattr(erase, "inpaint_video_with_builded_sttn", fake_sttn(calls))
+    frames = make_frames(20)
+    mask = make_mask()
+    masks = [mask] * 20
+
+    assert erase.get_static_runs(frames, masks, CONFIG) == [list(range(20))]
+    result = erase.inpaint_reused(
+        None, list(range(20)), frames, masks, 5, "cpu", CONFIG
+    )
+
+    # 首帧和它的邻居帧一起送入 STTN，而不是单独一帧
+    assert calls == [list(range(6))]
+    assert [path for path, _ in result] == list(range(20))
+    region = np.array(mask) != 0
+    for i, (_, frame) in enumerate(result):
+        assert (frame[region] == (i if i < 6 else 0)).all()
+        assert (frame[~region] == np.array(frames[i])[~region]).all()
+
+
+def test_get_static_runs_splits_on_background_and_mask():
+    frames = make_frames(20)
+    for i in range(12, 20):
+        # 掩膜外围的背景变化
+        frame = np.array(frames[i])
+        frame[30:40] = 255 - frame[30:40]
+        frames[i] = Image.fromarray(frame)
+    first, second = make_mask(), make_mask()
+    masks = [first] * 6 + [second] * 14
+
+    assert erase.get_static_runs(frames, masks, CONFIG) == [
+        list(range(6)),
+        list(range(6, 12)),
+        list(range(12, 20)),
+    ]
+    assert erase.get_static_runs(
+        frames, masks, {"erase": {"mask_expand": 3, "reuse_tolerance": 0}}
+    ) == [[i] for i in range(20)]
+
+
+def make_timeline(*spans) -> Timeline:
+    return Timeline(
+        [Interval(start, end, [10, 40, 70, 50], "text") for start, end in spans]
+    )
+
+
+def load_shot(cut: int):
+    # cut 之前和之后是亮度不同的两个镜头
+    dark = Image.fromarray(np.full((36, 64, 3), 40, dtype=np.uint8))
+    bright = Image.fromarray(np.full((36, 64, 3), 200, dtype=np.uint8))
+    return lambda frame_number: dark if frame_number < cut else bright
+
+
+def test_get_scene_cuts_in_short_gap():
+    # 两条字幕相隔不到 fps * 2 帧，split_groups 会把它们放进同一组；切换发生在补齐帧之外的间隙中
+    timeline = make_timeline((10, 20), (40, 50))
+    config = {"erase": {"scene_threshold": 0.4}}
+
+    cuts = erase.get_scene_cuts(timeline, 25, 100, 5, load_shot(30), config)
+
+    assert cuts == [40]
+    groups = erase.split_groups(timeline, 25, 100, 50, 5, cuts)
+    assert [[n for n, _ in group] for group in groups] == [
+        list(range(10, 26)),
+        list(range(40, 55)),
+    ]
+
+
+def test_get_scene_cuts_skips_long_gap():
+    # 间隙达到 fps * 2 帧时分组本来就会断开，不比较间隙两侧
+    timeline = make_timeline((10, 20), (80, 90))
+    config = {"erase": {"scene_threshold": 0.4}}
+
+    assert erase.get_scene_cuts(timeline, 25, 100, 5, load_shot(50), config) == []
+    assert erase.get_scene_cuts(timeline, 25, 100, 5, load_shot(15), config) == [15]
+
+
+def numbers(groups) -> list:
+    return [[n for n, _ in group] for group in groups]
+
+
+def test_split_groups_on_gap_and_length():
+    timeline = make_timeline((1, 10), (12, 15), (100, 105))
+    groups = erase.split_groups(timeline, 25, 200, 8, 3)
+
+    assert numbers(groups) == [
+        list(range(1, 9)),
+        [9, 10, 12, 13, 14, 15, 16, 17, 18],
+        list(range(100, 108)),
+    ]
+    # 补齐的帧没有字幕区间
+    assert [interval is None for _, interval in groups[1]] == [False] * 6 + [True] * 3
+
+
+def test_split_groups_merges_short_last_group():
+    timeline = make_timeline((1, 9))
+    assert numbers(erase.split_groups(timeline, 25, 10, 8, 4)) == [list(range(1, 11))]
+
+
+def test_split_groups_on_cuts():
+    timeline = make_timeline((1, 20))
+    groups = erase.split_groups(timeline, 25, 100, 8, 3, [11])
+
+    # 每个镜头按 max_frame_length 均分，补齐不越过切换
+    assert numbers(groups) == [
+        list(range(1, 6)),
+        list(range(6, 11)),
+        list(range(11, 16)),
+        list(range(16, 23)),
+    ]
+
+
+def test_split_groups_keeps_short_group_after_cut():
+    timeline = make_timeline((1, 11))
+    assert numbers(erase.split_groups(timeline, 25, 11, 20, 3)) == [list(range(1, 12))]
+    assert numbers(erase.split_groups(timeline, 25, 11, 20, 3, [11])) == [
+        list(range(1, 11)),
+        [11],
+    ]
+
+
+def test_inpaint_video_loads_model_for_sttn_groups_only(monkeypatch):
+    monkeypatch.setattr(erase, "inpaint_video_with_builded_sttn", fake_sttn([]))
+    loads = []
+
+    def load_model():
+        loads.append(1)
+        return "model"
+
+    config = {
+        "erase": dict(
+            CONFIG["erase"],
+            reuse_tolerance=0,
+            tiered=True,
+            tier_texture=10,
+            tier_motion=5,
+            tier_method="telea",
+        )
+    }
+    flat = [Image.fromarray(np.full((60, 80, 3), 30, np.uint8))] * 4
+    masks = [make_mask()] * 4
+
+    erase.inpaint_video(
+        [list(range(4))] * 2, [flat] * 2, [masks] * 2, 5, None, None, config, load_model
+    )
+    assert loads == []
+
+    textured = make_frames(4)
+    erase.inpaint_video(
+        [list(range(4))] * 3,
+        [flat, textured, textured],
+        [masks] * 3,
+        5,
+        None,
+        None,
+        config,
+        load_model,
+    )
+    assert loads == [1]
+
+
+@pytest.mark.parametrize("backend, loaded", [("onnx", False), ("torch", True)])
+def test_remove_subtitles_worker_pool_model(tmp_path, monkeypatch, backend, loaded):
+    from modules.config import TEMPLATE_FILE, load_config
+
+    config = load_config(TEMPLATE_FILE)
+    config["erase"].update(workers=2, backend=backend, profile="")
+    frame_paths = []
+    for i, frame in enumerate(make_frames(10), 1):
+        frame_paths.append(str(tmp_path / ("%04d.png" % i)))
+        frame.save(frame_paths[-1])
+    loads, models = [], []
+
+    def load_sttn_model(config, device):
+        loads.append(device)
+        return "model"
+
+    def inpaint_parallel(
+        paths_list, masks_list, neighbor_stride, config, model, on_done
+    ):
+        models.append(model)
+
+    monkeypatch.setattr(erase, "get_device", lambda: "cpu")
+    monkeypatch.setattr(erase, "load_sttn_model", load_sttn_model)
+    monkeypatch.setattr(erase, "inpaint_parallel", inpaint_parallel)
+    erase.remove_subtitles(make_timeline((2, 5)), frame_paths, 25, config)
+
+    # ONNX 会话由工作进程各自加载，主进程不加载
+    assert models == (["model"] if loaded else [None])
+    assert len(loads) == int(loaded)
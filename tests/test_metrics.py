@@ -0,0 +1,21 @@
+import time
+
+import numpy as np
+import pytest
+
+from utils.metrics_utils import collect_metrics, current_rss_mb, track_stage
+
+pytestmark = pytest.mark.skipif(current_rss_mb() is None, reason="/proc is required")
+
+
+def test_peak_rss_is_sampled_per_stage():
+    with track_stage("large", prefix="test-metrics"):
+        buffer = np.ones(200 * 1024 * 1024, dtype=np.uint8)
+        time.sleep(0.2)
+        del buffer
+    with track_stage("small", prefix="test-metrics"):
+        time.sleep(0.1)
+    large, small = collect_metrics("test-metrics")
+    assert large["peak_rss_mb"] - small["peak_rss_mb"] > 150
+    # 进程生命周期内的峰值不会随阶段回落
+    assert small["process_peak_rss_mb"] - small["peak_rss_mb"] > 150
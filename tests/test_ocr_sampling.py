@@ -0,0 +1,86 @@
+import numpy as np
+
+from modules.ocr import FrameWindow, get_sample_step, sample_ocr, sample_ocr_frames
+
+FPS = 25
+FRAMES = 250
+# (起始帧, 结束帧, 像素值)，第二条字幕短于采样间隔
+CUES = [(30, 80, 100), (100, 106, 150), (200, 240, 200)]
+CONFIG = {
+    "ocr": {
+        "sample_fps": 2,
+        "sample_tolerance": 0.03,
+        "det_target_side": 0,
+        "min_height_ratio": 0.5,
+        "max_height_ratio": 1.0,
+    },
+    "video": {"min_duration": 0.1},
+}
+
+
+class StubOCR:
+    """
+    按字幕区域内的像素值返回文本，并统计调用次数。
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def ocr(self, img_array, cls=False, det=True, rec=True):
+        self.calls += 1
+        value = int(img_array.max())
+        if not value:
+            return [None]
+        box = [[50, 20], [150, 20], [150, 30], [50, 30]]
+        return [[[box, (f"cue{value}", 0.99)]]]
+
+
+def get_value(frame_number: int) -> int:
+    for start, end, value in CUES:
+        if start <= frame_number <= end:
+            return value
+    return 0
+
+
+def load_frame(frame_number: int) -> np.ndarray:
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    frame[70:80, 50:150] = get_value(frame_number)
+    return frame
+
+
+def test_sample_ocr_frames_matches_every_frame():
+    ocr = StubOCR()
+    numbers = list(range(1, FRAMES + 1))
+    results = sample_ocr_frames(ocr, numbers, load_frame, CONFIG, FPS)
+
+    for frame_number in numbers:
+        value = get_value(frame_number)
+        texts = [line["text"] for line in results[frame_number]]
+        assert texts == ([f"cue{value}"] if value else [])
+    # 逐帧识别需要 250 次，稀疏采样只在采样点和字幕边界附近识别
+    assert ocr.calls <= 60
+
+
+def test_sample_ocr_frames_step_follows_sample_fps():
+    ocr = StubOCR()
+    numbers = list(range(1, FRAMES + 1))
+    blank = np.zeros((100, 200, 3), dtype=np.uint8)
+    sample_ocr_frames(ocr, numbers, lambda frame_number: blank, CONFIG, FPS)
+
+    # 没有字幕且画面不变时只识别采样帧：每 12 帧一次，加上最后一帧
+    assert ocr.calls == len(range(0, FRAMES, FPS // 2)) + 1
+
+
+def test_sample_ocr_band_window_matches_full_frames():
+    numbers = list(range(1, FRAMES + 1))
+    expected = sample_ocr_frames(StubOCR(), numbers, load_frame, CONFIG, FPS)
+
+    # 顺序解码的字幕区域（第 50 行以下），窗口只保留一个采样间隔
+    ocr = StubOCR()
+    window = FrameWindow(
+        (load_frame(n)[50:, :, 0] for n in numbers), get_sample_step(CONFIG, FPS) + 1
+    )
+    results = sample_ocr(ocr, window, lambda: window.count, CONFIG, FPS, (50, 1.0))
+
+    assert len(results) == FRAMES
+    assert dict(zip(numbers, results)) == expected
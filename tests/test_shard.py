@@ -0,0 +1,37 @@
+import pysrt
+import pytest
+
+shard = pytest.importorskip("modules.shard")
+
+
+def write_srt(path, cues):
+    subs = pysrt.SubRipFile()
+    for index, (start, end, text) in enumerate(cues, 1):
+        subs.append(
+            pysrt.SubRipItem(
+                index,
+                pysrt.SubRipTime(milliseconds=start),
+                pysrt.SubRipTime(milliseconds=end),
+                text,
+            )
+        )
+    subs.save(str(path), encoding="utf-8")
+    return str(path)
+
+
+def test_merge_srt_shifts_each_shard(tmp_path):
+    results = [
+        {"srt": write_srt(tmp_path / "0.srt", [(0, 1000, "a"), (1500, 2000, "b")])},
+        {"srt": write_srt(tmp_path / "1.srt", [(200, 900, "c")])},
+    ]
+    results[0]["start_frame"] = 0
+    results[1]["start_frame"] = 250
+
+    srt_path = shard.merge_srt(results, 25, str(tmp_path / "merged.srt"))
+    subs = pysrt.open(srt_path)
+
+    assert [sub.index for sub in subs] == [1, 2, 3]
+    assert [sub.text for sub in subs] == ["a", "b", "c"]
+    assert subs[2].start.ordinal == 10200
+    assert subs[2].end.ordinal == 10900
+    assert subs[1].start.ordinal == 1500
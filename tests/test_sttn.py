@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+torch = pytest.importorskip("torch")
+sttn = pytest.importorskip("modules.sttn")
+
+
+class FakeModel:
+    """
+    编码器和注意力层原样输出，解码器输出全零（即灰色）。
+    """
+
+    def encoder(self, feats):
+        return feats
+
+    def infer(self, feats, masks):
+        return feats
+
+    def decoder(self, feats):
+        return torch.zeros_like(feats)
+
+
+def test_inpaint_single_frame():
+    frame = np.zeros((240, 432, 3), dtype=np.uint8)
+    mask = np.zeros((240, 432), dtype=np.uint8)
+    mask[200:220, 100:300] = 255
+
+    ((path, result),) = sttn.inpaint_video_with_builded_sttn(
+        FakeModel(),
+        ["0001.png"],
+        [Image.fromarray(frame)],
+        [Image.fromarray(mask)],
+        device="cpu",
+    )
+
+    assert path == "0001.png"
+    region = mask != 0
+    assert (result[region] == 127).all()
+    assert (result[~region] == 0).all()
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from modules.subtitle import CueBuilder, remove_punctuation
+
+
+def build_two_pass(frames: list, fps: float, min_duration: float) -> list:
+    # 原先先切分、再合并相邻相同文本的两遍处理
+    limit = fps * min_duration
+    frame_number_pre = 0
+    text_pre = ""
+    subtitles = []
+    subtitle = {}
+    for frame_number, text in frames:
+        if (
+            remove_punctuation(text) == remove_punctuation(text_pre)
+            and frame_number - frame_number_pre <= limit
+        ):
+            subtitle["end"] = frame_number
+        else:
+            if subtitle and subtitle["end"] - subtitle["start"] > limit:
+                subtitles.append(subtitle)
+            subtitle = {"start": frame_number, "end": frame_number, "text": text}
+        frame_number_pre = frame_number
+        text_pre = text
+    if subtitle and subtitle["end"] - subtitle["start"] > limit:
+        subtitles.append(subtitle)
+
+    merged = subtitles[:1]
+    for subtitle in subtitles[1:]:
+        if (
+            remove_punctuation(subtitle["text"])
+            == remove_punctuation(merged[-1]["text"])
+            and subtitle["start"] - merged[-1]["end"] <= limit
+        ):
+            merged[-1]["end"] = subtitle["end"]
+        else:
+            merged.append(subtitle)
+    return merged
+
+
+def random_frames(seed: int) -> list:
+    rng = random.Random(seed)
+    frames = []
+    frame_number = 0
+    for _ in range(rng.randint(1, 40)):
+        frame_number += rng.choice([1, 1, 1, 2, 5, 30])
+        text = rng.choice(["你好", "你好。", "再见", "谢谢"])
+        for _ in range(rng.randint(1, 20)):
+            frames.append((frame_number, text))
+            frame_number += 1
+    return frames
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_cue_builder_matches_two_pass(seed):
+    frames = random_frames(seed)
+    builder = CueBuilder(fps=10, min_duration=0.5)
+    for frame_number, text in frames:
+        builder.add(frame_number, text)
+    builder.close()
+
+    assert builder.cues == build_two_pass(frames, fps=10, min_duration=0.5)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_cue_builder_intervals_match_frames(seed):
+    frames = random_frames(seed)
+    runs = []
+    for frame_number, text in frames:
+        if runs and runs[-1][2] == text and runs[-1][1] + 1 == frame_number:
+            runs[-1][1] = frame_number
+        else:
+            runs.append([frame_number, frame_number, text])
+    builder = CueBuilder(fps=10, min_duration=0.5)
+    for start, end, text in runs:
+        builder.add_interval(start, end, text)
+    builder.close()
+
+    assert builder.cues == build_two_pass(frames, fps=10, min_duration=0.5)
+
+
+def test_cue_builder_emits_before_close(tmp_path):
+    emitted = []
+    srt_path = str(tmp_path / "out.srt")
+    builder = CueBuilder(10, 0.5, srt_path, on_cue=emitted.append)
+    builder.add_interval(0, 20, "你好")
+    builder.add_interval(21, 40, "再见")
+    # 下一条字幕足够长且文本不同，第一条已确定结束
+    assert [cue["text"] for cue in emitted] == ["你好"]
+
+    builder.close()
+    assert [cue["text"] for cue in emitted] == ["你好", "再见"]
+    with open(srt_path) as f:
+        assert f.read().count("-->") == 2
@@ -0,0 +1,34 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from benchmarks.synthetic import generate_video
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def has_drawtext() -> bool:
+    if shutil.which("ffmpeg") is None:
+        return False
+    filters = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True
+    ).stdout
+    return " drawtext " in filters
+
+
+@pytest.mark.skipif(not has_drawtext(), reason="ffmpeg with drawtext is required")
+def test_generate_video_into_missing_directory(tmp_path, monkeypatch):
+    # FONT_PATH 相对于仓库根目录
+    monkeypatch.chdir(ROOT)
+    output_path = str(tmp_path / "data" / "clip.mp4")
+    cues = generate_video(
+        output_path, width=160, height=90, duration=2, fps=10, cue_density=30
+    )
+    assert cues
+    assert os.path.getsize(output_path) > 0
+    assert not os.path.exists(str(tmp_path / "data" / "clip_filter.txt"))
+    with open(str(tmp_path / "data" / "clip.json")) as f:
+        assert json.load(f)["cues"] == cues
@@ -0,0 +1,66 @@
+import pytest
+
+from utils.timeline_utils import Interval, Timeline
+
+
+def make_timeline() -> Timeline:
+    return Timeline(
+        [
+            Interval(1, 5, [0, 10, 20, 30], "a"),
+            Interval(10, 10, [0, 10, 20, 30], "b"),
+            Interval(20, 29, [0, 10, 20, 30], "c"),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "frame_number, text",
+    [(0, None), (1, "a"), (5, "a"), (6, None), (10, "b"), (19, None), (29, "c")],
+)
+def test_at(frame_number, text):
+    interval = make_timeline().at(frame_number)
+    assert (interval and interval.text) == text
+
+
+@pytest.mark.parametrize(
+    "start, end, texts",
+    [
+        (0, 0, []),
+        (3, 3, ["a"]),
+        (5, 10, ["a", "b"]),
+        (6, 9, []),
+        (11, 20, ["c"]),
+        (0, 100, ["a", "b", "c"]),
+        (25, 100, ["c"]),
+    ],
+)
+def test_overlapping(start, end, texts):
+    assert [i.text for i in make_timeline().overlapping(start, end)] == texts
+
+
+def test_add_and_extend_merge_boxes():
+    timeline = Timeline()
+    timeline.add(3, {"box": [10, 10, 20, 20], "text": "a"})
+    timeline.extend(4, {"box": [5, 12, 18, 25]})
+    timeline.add(6, {"box": [0, 0, 1, 1], "text": "b"})
+
+    assert timeline.at(4) == Interval(3, 4, [5, 10, 20, 25], "a")
+    assert list(timeline.frame_numbers()) == [3, 4, 6]
+    assert timeline.frame_count == 3
+    assert len(timeline) == 2
+
+
+def test_append_rejects_overlap():
+    timeline = make_timeline()
+    with pytest.raises(ValueError):
+        timeline.append(Interval(29, 30, [0, 0, 1, 1], "d"))
+
+
+def test_save_and_load(tmp_path):
+    timeline = make_timeline()
+    path = str(tmp_path / "timeline.json")
+    timeline.save(path)
+
+    loaded = Timeline.load(path)
+    assert loaded == timeline
+    assert loaded.at(25).text == "c"
@@ -0,0 +1,70 @@
+import json
+
+import pysrt
+import pytest
+
+from modules import translate
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        ('{"1": "Hello", "2": "Bye"}', {"1": "Hello", "2": "Bye"}),
+        ('```json\n{"1": "Hello"}\n```', {"1": "Hello"}),
+        ('Here you go: {"1": "Hello"} Done.', {"1": "Hello"}),
+        ('{"1": "Hello",}', {}),
+        ('["Hello"]', {}),
+        ("", {}),
+        (None, {}),
+    ],
+)
+def test_parse_translation(content, expected):
+    assert translate.parse_translation(content) == expected
+
+
+def fake_translate(missing_ids):
+    # 第一次请求时漏掉 missing_ids，之后只要请求中包含就翻译
+    calls = []
+
+    def chatgpt_translate(text, language, fmt="srt"):
+        pending = json.loads(text)
+        calls.append(sorted(pending))
+        return json.dumps(
+            {
+                key: value.upper()
+                for key, value in pending.items()
+                if len(calls) > 1 or key not in missing_ids
+            }
+        )
+
+    return chatgpt_translate, calls
+
+
+def test_translate_texts_retries_missing_ids(monkeypatch):
+    chatgpt_translate, calls = fake_translate({"2"})
+    monkeypatch.setattr(translate, "chatgpt_translate", chatgpt_translate)
+    monkeypatch.setattr(translate.time, "sleep", lambda seconds: None)
+
+    assert translate.translate_texts(["a", "b", "c"], "English") == ["A", "B", "C"]
+    assert calls == [["1", "2", "3"], ["2"]]
+
+
+def test_translate_subtitles_json_raises_on_partial(tmp_path, monkeypatch):
+    chatgpt_translate, _ = fake_translate({"2"})
+    monkeypatch.setattr(translate, "chatgpt_translate", chatgpt_translate)
+    monkeypatch.setattr(translate.time, "sleep", lambda seconds: None)
+    srt_path = str(tmp_path / "x_zh.srt")
+    subs = pysrt.SubRipFile()
+    for index in (1, 2):
+        subs.append(
+            pysrt.SubRipItem(index, pysrt.SubRipTime(seconds=index), text=f"t{index}")
+        )
+    subs.save(srt_path, encoding="utf-8")
+
+    with pytest.raises(RuntimeError, match="1/2 ids still missing: 2"):
+        translate.translate_subtitles(srt_path, "English", try_times=1, mode="json")
+    assert not (tmp_path / "x_English.srt").exists()
+
+    assert translate.translate_subtitles(srt_path, "English", mode="json") == str(
+        tmp_path / "x_English.srt"
+    )
@@ -0,0 +1,69 @@
+import pytest
+
+from utils import video_utils
+
+SOURCE = {
+    "codec_name": "h264",
+    "profile": "High",
+    "level": 40,
+    "pix_fmt": "yuv420p",
+    "width": 1920,
+    "height": 1080,
+}
+
+
+@pytest.mark.parametrize(
+    "changes, expected",
+    [
+        ({}, True),
+        ({"start_time": "1.4"}, True),
+        ({"profile": "Main"}, False),
+        ({"level": 41}, False),
+        ({"pix_fmt": "yuv444p"}, False),
+        ({"height": 1088}, False),
+        ({"codec_name": "hevc"}, False),
+    ],
+)
+def test_is_same_stream_format(changes, expected):
+    assert video_utils.is_same_stream_format(SOURCE, {**SOURCE, **changes}) is expected
+
+
+def test_is_same_stream_format_baseline_and_unknown_level():
+    source = {**SOURCE, "profile": "Baseline", "level": -99}
+    encoded = {**SOURCE, "profile": "Constrained Baseline", "level": 30}
+    assert video_utils.is_same_stream_format(source, encoded)
+
+
+@pytest.mark.parametrize("profile, fallbacks", [("High", 0), ("Main", 1)])
+def test_encode_gops_falls_back_on_mismatch(tmp_path, monkeypatch, profile, fallbacks):
+    def run_ffmpeg(args):
+        # 切分得到两段，重编码覆盖第二段
+        if "segment" in args:
+            for i in range(2):
+                open(str(tmp_path / f"{i:04d}.ts"), "w").close()
+        return True
+
+    calls = []
+    monkeypatch.setattr(video_utils, "run_ffmpeg", run_ffmpeg)
+    monkeypatch.setattr(
+        video_utils, "detect_codec", lambda path: {**SOURCE, "profile": profile}
+    )
+    monkeypatch.setattr(video_utils, "concat_videos", lambda paths, output: True)
+    monkeypatch.setattr(video_utils, "mux_audio", lambda *paths: True)
+
+    assert video_utils.encode_gops(
+        "in.mp4",
+        "out.mp4",
+        25,
+        [0.0, 2.0],
+        [0.0, 2.0, 4.0],
+        [[1, 2]],
+        [1],
+        SOURCE,
+        video_utils.get_encoder_args(SOURCE),
+        35,
+        str(tmp_path / "frames"),
+        str(tmp_path),
+        lambda: calls.append("fallback") or True,
+    )
+    assert len(calls) == fallbacks
@@ -0,0 +1,131 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from utils.workspace_utils import (
+    ACTIVE_FILE,
+    LOCK_SUFFIX,
+    evict,
+    get_job_prefix,
+    lock_job,
+    use_workspace,
+)
+
+
+def make_config(root: str = "", job: str = "") -> dict:
+    return {"workspace": {"root": root, "budget_gb": 0, "job": job}}
+
+
+def test_job_prefix_differs_by_extension(tmp_path):
+    config = make_config()
+    mp4 = get_job_prefix(str(tmp_path / "x.mp4"), config)
+    mkv = get_job_prefix(str(tmp_path / "x.mkv"), config)
+
+    assert mp4 != mkv
+    assert os.path.dirname(mp4) == str(tmp_path)
+    assert os.path.basename(mp4).startswith("x-")
+    assert get_job_prefix(str(tmp_path / "x.mp4"), config) == mp4
+
+
+def test_job_prefix_differs_by_job(tmp_path):
+    video_path = str(tmp_path / "videos" / "x.mp4")
+    root = str(tmp_path / "workspace")
+    first = get_job_prefix(video_path, make_config(root, "a1"))
+    second = get_job_prefix(video_path, make_config(root, "b2"))
+
+    assert first != second
+    assert first.endswith("-a1")
+    assert os.path.isdir(os.path.dirname(first))
+    assert os.path.dirname(os.path.dirname(first)) == root
+
+
+def make_job(root, name: str, size: int, age: float) -> str:
+    job_directory_path = os.path.join(str(root), name)
+    os.makedirs(job_directory_path)
+    with open(os.path.join(job_directory_path, "data"), "wb") as f:
+        f.write(b"0" * size)
+    mtime = time.time() - age
+    os.utime(job_directory_path, (mtime, mtime))
+    return job_directory_path
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_lock_job_serializes_same_prefix(tmp_path):
+    prefix = str(tmp_path / "x")
+    events = []
+
+    def second():
+        with lock_job(prefix, interval=0.01):
+            events.append("second")
+
+    with lock_job(prefix):
+        thread = threading.Thread(target=second)
+        thread.start()
+        time.sleep(0.1)
+        events.append("first")
+    thread.join(5)
+
+    assert events == ["first", "second"]
+    assert not os.path.exists(prefix + LOCK_SUFFIX)
+
+
+def test_lock_job_removes_stale_lock(tmp_path):
+    prefix = str(tmp_path / "x")
+    with open(prefix + LOCK_SUFFIX, "w") as f:
+        f.write(f"{dead_pid()}\n")
+
+    with lock_job(prefix, interval=5):
+        with open(prefix + LOCK_SUFFIX) as f:
+            assert f.read().split() == [str(os.getpid())]
+
+
+def test_evict_oldest_first_within_budget(tmp_path):
+    config = make_config(str(tmp_path), "")
+    config["workspace"]["budget_gb"] = 3500 / 1024**3
+    active = make_job(tmp_path, "active", 1000, age=300)
+    with open(os.path.join(active, ACTIVE_FILE), "w") as f:
+        f.write(f"{os.getpid()}\n")
+    kept = make_job(tmp_path, "kept", 1000, age=200)
+    old = make_job(tmp_path, "old", 1000, age=100)
+    newest = make_job(tmp_path, "newest", 1000, age=0)
+
+    # 运行中和 keep 中的目录即使更旧也不会被删除
+    assert evict(config, keep=[kept]) == [old]
+    assert evict(config) == []
+    assert os.path.isdir(active) and os.path.isdir(kept) and os.path.isdir(newest)
+
+
+def test_evict_skips_dead_active_marker(tmp_path):
+    config = make_config(str(tmp_path), "")
+    config["workspace"]["budget_gb"] = 1500 / 1024**3
+    stale = make_job(tmp_path, "stale", 1000, age=100)
+    with open(os.path.join(stale, ACTIVE_FILE), "w") as f:
+        f.write(f"{dead_pid()}\n")
+    make_job(tmp_path, "newest", 1000, age=0)
+
+    assert evict(config) == [stale]
+
+
+def test_use_workspace_evicts_other_jobs(tmp_path):
+    root = tmp_path / "workspace"
+    root.mkdir()
+    config = make_config(str(root), "")
+    config["workspace"]["budget_gb"] = 1500 / 1024**3
+    old = make_job(root, "old", 1000, age=100)
+
+    with use_workspace(str(tmp_path / "x.mp4"), config) as prefix:
+        job_directory_path = os.path.dirname(prefix)
+        assert os.path.exists(os.path.join(job_directory_path, ACTIVE_FILE))
+        with open(prefix + "_frames.bin", "wb") as f:
+            f.write(b"0" * 1000)
+
+    assert not os.path.exists(old)
+    assert not os.path.exists(os.path.join(job_directory_path, ACTIVE_FILE))
+    assert not os.path.exists(prefix + LOCK_SUFFIX)
@@ -0,0 +1,138 @@
+import concurrent.futures
+import multiprocessing
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from utils.metrics_utils import add_metrics, call_with_metrics
+
+
+@dataclass
+class Task:
+    """
+    DAG 中的一个任务节点。
+
+    属性:
+    - name: 任务名称，在同一个 DAG 中唯一。
+    - func: 任务执行函数，依赖任务的结果按 deps 的顺序作为位置参数传入，其后是 args。
+    - deps: 依赖的任务名称列表。
+    - executor: 执行器类型，"thread" 用于网络等 IO 密集型任务，"process" 用于计算密集型任务。
+    - args: 额外的位置参数。
+    - kwargs: 额外的关键字参数。
+    """
+
+    name: str
+    func: Callable
+    deps: Sequence[str] = ()
+    executor: str = "thread"
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+
+
+def check_dag(tasks: List[Task]):
+    """
+    校验任务列表是否构成合法的 DAG。
+
+    参数:
+    - tasks: 任务列表。
+
+    返回:
+    - 无。任务名重复、依赖不存在或存在环时抛出 ValueError。
+    """
+    names = [task.name for task in tasks]
+    if len(names) != len(set(names)):
+        raise ValueError(f"Duplicate task names: {names}")
+    deps = {task.name: set(task.deps) for task in tasks}
+    for name, task_deps in deps.items():
+        missing = task_deps - deps.keys()
+        if missing:
+            raise ValueError(f"Task {name} depends on unknown tasks: {missing}")
+
+    done = set()
+    while len(done) < len(deps):
+        ready = [name for name in deps if name not in done and deps[name] <= done]
+        if not ready:
+            raise ValueError(f"Cycle detected among tasks: {set(deps) - done}")
+        done.update(ready)
+
+
+def run_dag(
+    tasks: List[Task],
+    max_threads: int = 4,
+    max_processes: int = 2,
+    use_processes: bool = True,
+    on_event: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    按依赖关系并发执行 DAG 中的任务。
+
+    所有依赖已完成的任务会立即提交：executor 为 "thread" 的任务提交到线程池，
+    为 "process" 的任务提交到使用 spawn 启动方式的进程池（避免 fork 已初始化 CUDA 的进程），
+    子进程中记录的阶段指标随结果一起返回并合并到当前进程。
+    任一任务失败时取消尚未开始的任务并抛出原始异常。
+
+    参数:
+    - tasks: 任务列表。
+    - max_threads: 线程池大小。
+    - max_processes: 进程池大小。
+    - use_processes: 为 False 时所有任务都在线程池中执行，便于复用当前进程中已加载的模型。
+    - on_event: 任务状态回调，参数为任务名称和状态（"running"、"done" 或 "failed"）。
+
+    返回:
+    - Dict[str, Any]: 任务名称到任务返回值的映射。
+    """
+    check_dag(tasks)
+    if on_event is None:
+        on_event = lambda name, state: None
+    pending = {task.name: task for task in tasks}
+    results = {}
+
+    thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_threads)
+    process_pool = None
+    if use_processes and any(task.executor == "process" for task in tasks):
+        process_pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+
+    running = {}
+    processes = set()
+    try:
+        while pending or running:
+            for name, task in list(pending.items()):
+                if all(dep in results for dep in task.deps):
+                    args = [results[dep] for dep in task.deps] + list(task.args)
+                    if task.executor == "process" and process_pool is not None:
+                        future = process_pool.submit(
+                            call_with_metrics, task.func, *args, **task.kwargs
+                        )
+                        processes.add(future)
+                    else:
+                        future = thread_pool.submit(task.func, *args, **task.kwargs)
+                    running[future] = name
+                    del pending[name]
+                    on_event(name, "running")
+
+            done, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    if future in processes:
+                        results[name], records = results[name]
+                        add_metrics(records)
+                except BaseException:
+                    on_event(name, "failed")
+                    raise
+                on_event(name, "done")
+    except BaseException:
+        for future in running:
+            future.cancel()
+        raise
+    finally:
+        thread_pool.shutdown(wait=True, cancel_futures=True)
+        if process_pool is not None:
+            process_pool.shutdown(wait=True, cancel_futures=True)
+
+    return results
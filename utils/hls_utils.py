@@ -0,0 +1,210 @@
+import math
+import os
+import shutil
+import time
+from typing import List, Optional
+
+from utils.metrics_utils import incr
+from utils.video_utils import TEMP_FRAME_FORMAT, concat_videos, run_ffmpeg
+
+PLAYLIST_NAME = "index.m3u8"
+
+
+def encode_segment(
+    target_path: str,
+    temp_directory_path: str,
+    segment_path: str,
+    fps: float,
+    start_frame: int,
+    frame_count: int,
+    output_video_quality: int = 35,
+    output_video_encoder: str = "libx264",
+) -> bool:
+    """
+    将临时目录中的一段连续帧与目标文件对应时间段的音轨编码为一个 MPEG-TS 分段，
+    时间戳从该段在整个视频中的起始时间开始，各分段可以直接拼接播放。
+
+    参数:
+    - target_path: 提供音轨的源文件路径。
+    - temp_directory_path: 帧所在目录。
+    - segment_path: 输出分段路径。
+    - fps: 视频的帧率。
+    - start_frame: 起始帧序号（从 1 开始，与临时帧文件名一致）。
+    - frame_count: 帧数。
+    - output_video_quality: 输出视频的质量，含义与 create_video 相同。
+    - output_video_encoder: 输出视频的编码器。
+
+    返回:
+    - bool: 表示FFmpeg命令执行是否成功的布尔值。
+    """
+    output_video_quality = (output_video_quality + 1) * 51 // 100
+    start = (start_frame - 1) / fps
+    commands = [
+        "-r",
+        str(fps),
+        "-start_number",
+        str(start_frame),
+        "-i",
+        os.path.join(temp_directory_path, "%04d." + TEMP_FRAME_FORMAT),
+        "-ss",
+        f"{start:.6f}",
+        "-t",
+        f"{frame_count / fps:.6f}",
+        "-i",
+        target_path,
+        "-frames:v",
+        str(frame_count),
+        "-map",
+        "0:v:0",
+        "-map",
+        "1:a:0?",
+        "-c:a",
+        "aac",
+        "-c:v",
+        output_video_encoder,
+        "-pix_fmt",
+        "yuv420p",
+    ]
+    if output_video_encoder in ["libx264", "libx265", "libvpx"]:
+        commands.extend(["-crf", str(output_video_quality)])
+    if output_video_encoder in ["h264_nvenc", "hevc_nvenc"]:
+        commands.extend(["-cq", str(output_video_quality)])
+    commands.extend(
+        [
+            "-vf",
+            "pad=ceil(iw/2)*2:ceil(ih/2)*2",
+            "-output_ts_offset",
+            f"{start:.6f}",
+            "-f",
+            "mpegts",
+            "-y",
+            segment_path,
+        ]
+    )
+    return run_ffmpeg(commands)
+
+
+class HlsWriter:
+    """
+    渐进式 HLS 输出。
+
+    擦除阶段每确认一段帧不会再被修改，就调用 advance 把已完整的固定时长分段编码为 .ts，
+    并更新 EVENT 类型的播放列表，播放器可以在整个视频完成前开始播放；finish 编码剩余的帧、
+    结束播放列表，并把所有分段直接拼接为完整的视频文件。
+    """
+
+    def __init__(
+        self,
+        target_path: str,
+        temp_directory_path: str,
+        hls_directory_path: str,
+        fps: float,
+        frame_len: int,
+        segment_duration: float,
+        started: Optional[float] = None,
+    ):
+        """
+        参数:
+        - target_path: 源视频路径，提供音轨。
+        - temp_directory_path: 帧所在目录。
+        - hls_directory_path: 分段和播放列表的输出目录。
+        - fps: 视频的帧率。
+        - frame_len: 总帧数。
+        - segment_duration: 分段时长，单位秒。
+        - started: 计算首个分段耗时的起始时间（time.time()），为 None 时从创建时开始计算。
+        """
+        self.target_path = target_path
+        self.temp_directory_path = temp_directory_path
+        self.hls_directory_path = hls_directory_path
+        self.fps = fps
+        self.frame_len = frame_len
+        self.segment_frames = max(1, round(segment_duration * fps))
+        self.target_duration = math.ceil(self.segment_frames / fps)
+        self.started = time.time() if started is None else started
+        self.segments: List[str] = []
+        self._durations: List[float] = []
+        self._next_frame = 1
+        shutil.rmtree(hls_directory_path, ignore_errors=True)
+        os.makedirs(hls_directory_path)
+        self._write_playlist(False)
+
+    @property
+    def playlist_path(self) -> str:
+        return os.path.join(self.hls_directory_path, PLAYLIST_NAME)
+
+    def advance(self, done_frame: int) -> bool:
+        """
+        帧序号不超过 done_frame 的帧已经最终确定，编码其中所有完整的分段。
+
+        参数:
+        - done_frame: 已确定的最大帧序号。
+
+        返回:
+        - bool: 编码是否成功。
+        """
+        done_frame = min(done_frame, self.frame_len)
+        while self._next_frame + self.segment_frames - 1 <= done_frame:
+            if not self._encode(self.segment_frames):
+                return False
+        return True
+
+    def finish(self, output_path: Optional[str] = None) -> bool:
+        """
+        编码剩余的帧并结束播放列表，提供 output_path 时将所有分段拼接为完整的视频文件。
+
+        参数:
+        - output_path: 完整视频的输出路径。
+
+        返回:
+        - bool: 是否全部成功。
+        """
+        if not self.advance(self.frame_len):
+            return False
+        remaining = self.frame_len - self._next_frame + 1
+        if remaining > 0 and not self._encode(remaining):
+            return False
+        self._write_playlist(True)
+        if output_path is None:
+            return True
+        return concat_videos(self.segments, output_path)
+
+    def _encode(self, frame_count: int) -> bool:
+        segment_path = os.path.join(
+            self.hls_directory_path, "%04d.ts" % len(self.segments)
+        )
+        if not encode_segment(
+            self.target_path,
+            self.temp_directory_path,
+            segment_path,
+            self.fps,
+            self._next_frame,
+            frame_count,
+        ):
+            return False
+        self._next_frame += frame_count
+        self.segments.append(segment_path)
+        self._durations.append(frame_count / self.fps)
+        self._write_playlist(False)
+        incr("hls_segments")
+        if len(self.segments) == 1:
+            incr("time_to_first_segment_s", round(time.time() - self.started, 3))
+        return True
+
+    def _write_playlist(self, ended: bool):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+        ]
+        for segment_path, duration in zip(self.segments, self._durations):
+            lines.append(f"#EXTINF:{duration:.6f},")
+            lines.append(os.path.basename(segment_path))
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+        # 先写临时文件再替换，播放器不会读到写了一半的播放列表
+        temp_path = self.playlist_path + ".tmp"
+        with open(temp_path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(temp_path, self.playlist_path)
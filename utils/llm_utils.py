@@ -1,12 +1,28 @@
-from openai import OpenAI
+import time
 
 from modules.config import load_config
+from utils.metrics_utils import incr
 
-config = load_config()
-client = OpenAI(
-    api_key=config["translation"]["api_key"],
-    base_url=config["translation"]["api_base_url"],
-)
+_client = None
+
+
+def get_client():
+    """
+    Get the shared OpenAI client, reading config.yaml and importing openai on first use.
+
+    Returns:
+        OpenAI: The client configured with the translation api key and base url.
+    """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+
+        config = load_config()
+        _client = OpenAI(
+            api_key=config["translation"]["api_key"],
+            base_url=config["translation"]["api_base_url"],
+        )
+    return _client
 
 
 def get_completion(
@@ -14,6 +30,7 @@ def get_completion(
     system_message: str = "You are a helpful assistant.",
     model: str = "gpt-4o-mini",
     temperature: float = 0.3,
+    json_mode: bool = False,
 ) -> str:
     """
         Generate a completion using the OpenAI API.
@@ -33,7 +50,9 @@ def get_completion(
         Union[str]: The generated completion. returns the generated text as a string.
     """
 
-    response = client.chat.completions.create(
+    kwargs = {"response_format": {"type": "json_object"}} if json_mode else {}
+    start = time.perf_counter()
+    response = get_client().chat.completions.create(
         model=model,
         temperature=temperature,
         top_p=1,
@@ -41,5 +60,11 @@ def get_completion(
             {"role": "system", "content": system_message},
             {"role": "user", "content": prompt},
         ],
+        **kwargs,
     )
+    incr("llm_calls")
+    incr("llm_latency_s", time.perf_counter() - start)
+    if response.usage is not None:
+        incr("llm_prompt_tokens", response.usage.prompt_tokens)
+        incr("llm_completion_tokens", response.usage.completion_tokens)
     return response.choices[0].message.content
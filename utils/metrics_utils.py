@@ -0,0 +1,268 @@
+import contextlib
+import cProfile
+import json
+import os
+import resource
+import threading
+import time
+from typing import List, Optional
+
+_lock = threading.Lock()
+_local = threading.local()
+_active = []
+_records = []
+_sampler = None
+SAMPLE_INTERVAL = 0.02
+
+
+def read_io() -> dict:
+    """
+    读取当前进程及已结束子进程（如 ffmpeg）的读写字节数。
+
+    返回:
+    dict: 包含 read_bytes 和 write_bytes 的字典。当前进程的计数来自 /proc/self/io，
+    不支持的平台上只统计子进程的块读写。
+    """
+    io = {"read_bytes": 0, "write_bytes": 0}
+    try:
+        with open("/proc/self/io") as f:
+            for line in f:
+                key, value = line.split(":")
+                if key in io:
+                    io[key] = int(value)
+    except OSError:
+        pass
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    io["read_bytes"] += children.ru_inblock * 512
+    io["write_bytes"] += children.ru_oublock * 512
+    return io
+
+
+def peak_rss_mb() -> float:
+    """
+    获取当前进程与子进程在整个生命周期中的最大常驻内存（MB）。Linux 下 ru_maxrss 的单位为 KB。
+    """
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """
+    获取当前进程此刻的常驻内存（MB），不支持 /proc 的平台上返回 None。
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return None
+
+
+def _update_rss(rss: float):
+    # 调用方需持有 _lock
+    for record in _active:
+        record["peak_rss_mb"] = max(record.get("peak_rss_mb", 0.0), rss)
+
+
+def _sample_rss():
+    """
+    后台线程：有阶段在记录时定时读取常驻内存，更新所有进行中阶段的峰值；
+    没有进行中的阶段时退出。
+    """
+    global _sampler
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        rss = current_rss_mb()
+        with _lock:
+            if not _active or rss is None:
+                _sampler = None
+                return
+            _update_rss(rss)
+
+
+def current_stage() -> Optional[dict]:
+    """
+    获取当前线程正在记录的阶段；当前线程没有阶段时（如阶段内部创建的线程池），
+    返回进程中最近开始的阶段。
+    """
+    stack = getattr(_local, "stack", None)
+    if stack:
+        return stack[-1]
+    with _lock:
+        return _active[-1] if _active else None
+
+
+def incr(key: str, value: float = 1):
+    """
+    累加当前阶段的计数器，如 ocr_calls、sttn_calls、llm_tokens、cache_hits 等。
+
+    参数:
+    - key: 计数器名称。
+    - value: 增量，默认为 1。
+    """
+    record = current_stage()
+    if record is None:
+        return
+    with _lock:
+        record["counters"][key] = record["counters"].get(key, 0) + value
+
+
+def profile_options(config: Optional[dict], name: str):
+    """
+    根据配置判断是否对指定阶段进行性能剖析。
+
+    返回:
+    - 剖析器类型 "cprofile" 或 "torch"，不剖析时返回 None。
+    """
+    if not config or "metrics" not in config:
+        return None
+    if config["metrics"]["profile_stage"] != name:
+        return None
+    return config["metrics"]["profiler"]
+
+
+@contextlib.contextmanager
+def track_stage(name: str, config: Optional[dict] = None, prefix: Optional[str] = None):
+    """
+    记录一个阶段的运行指标：墙钟时间、CPU 时间、帧率、峰值内存、读写字节数及自定义计数器。
+
+    peak_rss_mb 为阶段期间由后台线程定时采样的本进程常驻内存峰值，不含 ffmpeg 等子进程；
+    process_peak_rss_mb 为截至阶段结束时进程（及子进程）生命周期内的最大常驻内存。
+    不支持 /proc 的平台上 peak_rss_mb 退化为 process_peak_rss_mb。
+
+    配置中 metrics.profile_stage 与阶段名称一致时，同时使用 cProfile 或 torch profiler
+    剖析该阶段，结果保存为 {prefix}_{name}.prof 或 {prefix}_{name}.json（Chrome trace）。
+
+    参数:
+    - name: 阶段名称。
+    - config: 配置字典。
+    - prefix: 剖析结果的文件名前缀，同时用于区分同一进程中不同任务的记录。
+
+    返回:
+    - 上下文中可以修改的阶段记录字典。
+    """
+    record = {"stage": name, "prefix": prefix, "pid": os.getpid(), "counters": {}}
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    stack.append(record)
+    global _sampler
+    rss = current_rss_mb()
+    with _lock:
+        _active.append(record)
+        if rss is not None:
+            record["peak_rss_mb"] = rss
+            if _sampler is None:
+                _sampler = threading.Thread(target=_sample_rss, daemon=True)
+                _sampler.start()
+
+    profiler = profile_options(config, name)
+    profiler_context = contextlib.nullcontext()
+    profile = None
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+    elif profiler == "torch":
+        import torch
+
+        activities = [torch.profiler.ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(torch.profiler.ProfilerActivity.CUDA)
+        profiler_context = torch.profiler.profile(activities=activities)
+
+    io_start = read_io()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        with profiler_context as torch_profile:
+            if profile is not None:
+                profile.enable()
+            try:
+                yield record
+            finally:
+                if profile is not None:
+                    profile.disable()
+    finally:
+        wall = time.perf_counter() - wall_start
+        io_end = read_io()
+        record["wall_s"] = round(wall, 3)
+        record["cpu_s"] = round(time.process_time() - cpu_start, 3)
+        record["read_bytes"] = io_end["read_bytes"] - io_start["read_bytes"]
+        record["write_bytes"] = io_end["write_bytes"] - io_start["write_bytes"]
+        frames = record["counters"].get("frames")
+        if frames and wall > 0:
+            record["frames_per_s"] = round(frames / wall, 2)
+
+        if profile is not None:
+            record["profile"] = f"{prefix or name}_{name}.prof"
+            profile.dump_stats(record["profile"])
+        elif profiler == "torch":
+            record["profile"] = f"{prefix or name}_{name}.json"
+            torch_profile.export_chrome_trace(record["profile"])
+
+        stack.pop()
+        rss = current_rss_mb()
+        process_peak = peak_rss_mb()
+        with _lock:
+            if rss is None:
+                record["peak_rss_mb"] = process_peak
+            else:
+                _update_rss(rss)
+            record["peak_rss_mb"] = round(record["peak_rss_mb"], 1)
+            record["process_peak_rss_mb"] = round(process_peak, 1)
+            _active.remove(record)
+            _records.append(record)
+
+
+def collect_metrics(prefix: Optional[str] = None) -> List[dict]:
+    """
+    取出当前进程中已完成的阶段记录。
+
+    参数:
+    - prefix: 只取出该前缀的记录，为 None 时取出全部记录。
+    """
+    records = []
+    kept = []
+    with _lock:
+        for record in _records:
+            if prefix is None or record["prefix"] == prefix:
+                records.append(record)
+            else:
+                kept.append(record)
+        _records[:] = kept
+    return records
+
+
+def add_metrics(records: List[dict]):
+    """
+    合并其他进程返回的阶段记录。
+    """
+    with _lock:
+        _records.extend(records)
+
+
+def call_with_metrics(func, *args, **kwargs):
+    """
+    在子进程中调用函数，并把该进程记录的阶段指标一并返回。
+
+    返回:
+    - (函数返回值, 阶段记录列表) 元组。
+    """
+    collect_metrics()
+    result = func(*args, **kwargs)
+    return result, collect_metrics()
+
+
+def save_metrics(metrics_path: str, records: List[dict], **extra):
+    """
+    将一次运行的阶段指标保存为 JSON 文件。
+
+    参数:
+    - metrics_path: JSON 文件路径。
+    - records: 阶段记录列表。
+    - extra: 附加的运行信息，如视频路径、总耗时等。
+    """
+    data = dict(extra)
+    data["stages"] = records
+    with open(metrics_path, "w") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
@@ -0,0 +1,147 @@
+import bisect
+import json
+from dataclasses import asdict, dataclass
+from typing import Iterator, List, Optional, Tuple
+
+
+@dataclass
+class Interval:
+    """
+    一段连续显示同一条字幕的帧区间，start 和 end 为帧号（从 1 开始，含两端）。
+    """
+
+    start: int
+    end: int
+    box: List[int]
+    text: str
+
+
+class Timeline:
+    """
+    按帧号排序的字幕区间表。
+
+    每条字幕只保存一个区间，而不是为每一帧保存一份结果；区间起点有序索引，
+    单帧查询和范围查询均通过二分查找完成，需要逐帧处理时再用 frames 展开。
+    """
+
+    def __init__(self, intervals: List[Interval] = None):
+        self.intervals: List[Interval] = []
+        self._starts: List[int] = []
+        for interval in intervals or []:
+            self.append(interval)
+
+    def append(self, interval: Interval):
+        """
+        在末尾添加一个区间，区间须按帧号递增且互不重叠。
+        """
+        if self.intervals and interval.start <= self.intervals[-1].end:
+            raise ValueError(
+                f"interval {interval.start}-{interval.end} overlaps the timeline"
+            )
+        self.intervals.append(interval)
+        self._starts.append(interval.start)
+
+    def add(self, frame_number: int, value: dict):
+        """
+        添加一帧的结果，作为新区间的起点。
+
+        参数:
+        - frame_number: 帧号，须大于已有区间的终点。
+        - value: 包含 box 和 text 的字典。
+        """
+        self.append(
+            Interval(frame_number, frame_number, list(value["box"]), value["text"])
+        )
+
+    def extend(self, frame_number: int, value: dict):
+        """
+        将最后一个区间延长到 frame_number，文本框取两者的外接矩形。
+
+        参数:
+        - frame_number: 帧号，须大于最后一个区间的终点。
+        - value: 包含 box 的字典。
+        """
+        interval = self.intervals[-1]
+        interval.end = frame_number
+        interval.box = [
+            min(interval.box[0], value["box"][0]),
+            min(interval.box[1], value["box"][1]),
+            max(interval.box[2], value["box"][2]),
+            max(interval.box[3], value["box"][3]),
+        ]
+
+    def at(self, frame_number: int) -> Optional[Interval]:
+        """
+        查询包含该帧的区间，没有字幕时返回 None。
+        """
+        i = bisect.bisect_right(self._starts, frame_number) - 1
+        if i >= 0 and self.intervals[i].end >= frame_number:
+            return self.intervals[i]
+        return None
+
+    def overlapping(self, start: int, end: int) -> List[Interval]:
+        """
+        查询与帧区间 [start, end] 有重叠的所有区间。
+        """
+        i = max(0, bisect.bisect_right(self._starts, start) - 1)
+        j = bisect.bisect_right(self._starts, end)
+        return [interval for interval in self.intervals[i:j] if interval.end >= start]
+
+    def frames(self) -> Iterator[Tuple[int, Interval]]:
+        """
+        逐帧展开，依次产出 (帧号, 区间)。
+        """
+        for interval in self.intervals:
+            for frame_number in range(interval.start, interval.end + 1):
+                yield frame_number, interval
+
+    def frame_numbers(self) -> Iterator[int]:
+        """
+        逐帧展开，依次产出有字幕的帧号。
+        """
+        for frame_number, _ in self.frames():
+            yield frame_number
+
+    @property
+    def frame_count(self) -> int:
+        """
+        有字幕的帧数。
+        """
+        return sum(interval.end - interval.start + 1 for interval in self.intervals)
+
+    def __len__(self) -> int:
+        return len(self.intervals)
+
+    def __iter__(self) -> Iterator[Interval]:
+        return iter(self.intervals)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Timeline) and self.intervals == other.intervals
+
+    def to_list(self) -> List[dict]:
+        """
+        转换为可 JSON 序列化的区间列表。
+        """
+        return [asdict(interval) for interval in self.intervals]
+
+    @classmethod
+    def from_list(cls, intervals: List[dict]) -> "Timeline":
+        """
+        从 to_list 的结果恢复。
+        """
+        return cls([Interval(**interval) for interval in intervals])
+
+    def save(self, path: str):
+        """
+        保存为 JSON 文件。
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_list(), f, ensure_ascii=False, indent=4)
+
+    @classmethod
+    def load(cls, path: str) -> "Timeline":
+        """
+        从 save 保存的 JSON 文件读取。
+        """
+        with open(path, "r") as f:
+            return cls.from_list(json.load(f))
@@ -1,7 +1,16 @@
 from utils.llm_utils import get_completion
 
+# 不同文本格式对输出格式的要求
+FORMAT_INSTRUCTIONS = {
+    "srt": "But please keep subtitle timestamps.",
+    "json": "The text is a JSON object mapping subtitle ids to subtitle lines. "
+    "Reply with a JSON object that has exactly the same ids, each mapped to the translated line.",
+}
 
-def initial_translation(source_lang: str, target_lang: str, source_text: str) -> str:
+
+def initial_translation(
+    source_lang: str, target_lang: str, source_text: str, fmt: str = "srt"
+) -> str:
     """
     Translate the entire text as one chunk using an LLM.
 
@@ -9,6 +18,7 @@ def initial_translation(source_lang: str, target_lang: str, source_text: str) ->
         source_lang (str): The source language of the text.
         target_lang (str): The target language for translation.
         source_text (str): The text to be translated.
+        fmt (str): Format of the text, "srt" or "json".
 
     Returns:
         str: The translated text.
@@ -17,12 +27,14 @@ def initial_translation(source_lang: str, target_lang: str, source_text: str) ->
     system_message = f"You are an expert linguist, specializing in translation from {source_lang} to {target_lang}."
 
     translation_prompt = f"""This is an {source_lang} to {target_lang} translation, please provide the {target_lang} translation for this text. \
-Do not provide any explanations or text apart from the translation. But please keep subtitle timestamps.
+Do not provide any explanations or text apart from the translation. {FORMAT_INSTRUCTIONS[fmt]}
 {source_lang}: {source_text}
 
 {target_lang}:"""
 
-    translation = get_completion(translation_prompt, system_message=system_message)
+    translation = get_completion(
+        translation_prompt, system_message=system_message, json_mode=fmt == "json"
+    )
 
     return translation
 
@@ -108,6 +120,7 @@ def improve_translation(
     source_text: str,
     translation_1: str,
     reflection: str,
+    fmt: str = "srt",
 ) -> str:
     """
     Use the reflection to improve the translation, treating the entire text as one chunk.
@@ -118,6 +131,7 @@ def improve_translation(
         source_text (str): The original text in the source language.
         translation_1 (str): The initial translation of the source text.
         reflection (str): Expert suggestions and constructive criticism for improving the translation.
+        fmt (str): Format of the text, "srt" or "json".
 
     Returns:
         str: The improved translation based on the expert suggestions.
@@ -151,15 +165,19 @@ Please take into account the expert suggestions when editing the translation. Ed
 (iv) terminology (inappropriate for context, inconsistent use), or
 (v) other errors.
 
-Output only the new translation and nothing else."""
+Output only the new translation and nothing else. {FORMAT_INSTRUCTIONS[fmt]}"""
 
-    translation_2 = get_completion(prompt, system_message)
+    translation_2 = get_completion(prompt, system_message, json_mode=fmt == "json")
 
     return translation_2
 
 
 def translate_text(
-    source_lang: str, target_lang: str, source_text: str, country: str = ""
+    source_lang: str,
+    target_lang: str,
+    source_text: str,
+    country: str = "",
+    fmt: str = "srt",
 ) -> str:
     """
     Translate a single chunk of text from the source language to the target language.
@@ -173,10 +191,11 @@ def translate_text(
         target_lang (str): The target language for the translation.
         source_text (str): The text to be translated.
         country (str): Country specified for the target language.
+        fmt (str): Format of the text, "srt" keeps subtitle timestamps, "json" keeps subtitle ids.
     Returns:
         str: The improved translation of the source text.
     """
-    translation_1 = initial_translation(source_lang, target_lang, source_text)
+    translation_1 = initial_translation(source_lang, target_lang, source_text, fmt)
     print("----------------------------")
     print(translation_1)
 
@@ -187,7 +206,7 @@ def translate_text(
     print(reflection)
 
     translation_2 = improve_translation(
-        source_lang, target_lang, source_text, translation_1, reflection
+        source_lang, target_lang, source_text, translation_1, reflection, fmt
     )
     print("----------------------------")
     print(translation_2)
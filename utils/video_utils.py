@@ -1,10 +1,33 @@
+import bisect
 import glob
+import json
 import os
+import shutil
 import subprocess
-from typing import List
+from fractions import Fraction
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics_utils import incr
 
 TEMP_VIDEO_FILE = "tmp.mp4"
 TEMP_FRAME_FORMAT = "png"
+# 源视频编码对应的重编码编码器，用于局部重编码时保持编码一致
+CODEC_ENCODERS = {"h264": "libx264", "hevc": "libx265"}
+# ffprobe 报告的 profile 对应的编码器 profile 参数
+ENCODER_PROFILES = {
+    "libx264": {
+        "Constrained Baseline": "baseline",
+        "Baseline": "baseline",
+        "Main": "main",
+        "High": "high",
+        "High 10": "high10",
+        "High 4:2:2": "high422",
+        "High 4:4:4 Predictive": "high444",
+    },
+    "libx265": {"Main": "main", "Main 10": "main10"},
+}
 
 
 def run_ffmpeg(args: List[str]) -> bool:
@@ -62,8 +85,409 @@ def detect_fps(target_path: str) -> float:
     return 30
 
 
+def detect_duration(target_path: str) -> float:
+    """
+    检测视频文件的时长。
+
+    参数:
+    target_path (str): 视频文件的路径。
+
+    返回:
+    float: 视频时长，单位秒。如果无法检测则返回 0.0。
+    """
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        target_path,
+    ]
+    output = subprocess.check_output(command).decode().strip()
+    try:
+        return float(output)
+    except ValueError:
+        pass
+    return 0.0
+
+
+def detect_size(target_path: str) -> Tuple[int, int]:
+    """
+    检测视频文件的宽和高。
+
+    参数:
+    target_path (str): 视频文件的路径。
+
+    返回:
+    Tuple[int, int]: 视频的 (宽, 高)。
+    """
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=width,height",
+        "-of",
+        "csv=p=0:s=x",
+        target_path,
+    ]
+    output = subprocess.check_output(command).decode().strip()
+    width, height = map(int, output.split("x")[:2])
+    return width, height
+
+
+def detect_keyframes(target_path: str) -> List[float]:
+    """
+    检测视频关键帧的时间点，只读取数据包，不解码。
+
+    参数:
+    target_path (str): 视频文件的路径。
+
+    返回:
+    List[float]: 按时间排序的关键帧时间点，单位秒。
+    """
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "packet=pts_time,flags",
+        "-of",
+        "csv=p=0",
+        target_path,
+    ]
+    output = subprocess.check_output(command).decode()
+    keyframes = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(",")
+        if "K" in flags and pts_time not in ("", "N/A"):
+            keyframes.append(float(pts_time))
+    return sorted(keyframes)
+
+
+def detect_codec(target_path: str) -> dict:
+    """
+    检测视频流的编码参数。
+
+    参数:
+    target_path (str): 视频文件的路径。
+
+    返回:
+    dict: 包含 codec_name、profile、pix_fmt、level、width、height、start_time、r_frame_rate、avg_frame_rate 的字典。
+    """
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-show_entries",
+        "stream=codec_name,profile,pix_fmt,level,width,height,start_time,r_frame_rate,avg_frame_rate",
+        "-of",
+        "json",
+        target_path,
+    ]
+    streams = json.loads(subprocess.check_output(command).decode())["streams"]
+    return streams[0] if streams else {}
+
+
+def get_encoder_args(codec: dict) -> Optional[List[str]]:
+    """
+    生成与源视频流的编码、profile、level 和像素格式一致的编码参数，重编码的 GOP 与直接复制的码流参数相同，
+    拼接后不会出现不一致的 SPS/PPS。
+
+    参数:
+    codec (dict): detect_codec 的返回值。
+
+    返回:
+    Optional[List[str]]: ffmpeg 编码参数，编码、profile 或像素格式无法匹配时返回 None。
+    """
+    encoder = CODEC_ENCODERS.get(codec.get("codec_name"))
+    profile = ENCODER_PROFILES.get(encoder, {}).get(codec.get("profile"))
+    pix_fmt = codec.get("pix_fmt")
+    if profile is None or not pix_fmt:
+        return None
+    args = ["-c:v", encoder, "-profile:v", profile, "-pix_fmt", pix_fmt]
+    level = codec.get("level", 0)
+    if level > 0:
+        # H.264 的 level 以 10 为单位（40 即 4.0），HEVC 以 30 为单位（120 即 4.0）
+        if encoder == "libx264":
+            args.extend(["-level", f"{level / 10:.1f}"])
+        else:
+            args.extend(["-x265-params", f"level-idc={level / 30:.1f}"])
+    return args
+
+
+def is_same_stream_format(codec: dict, encoded: dict) -> bool:
+    """
+    判断重编码得到的视频流与源视频流的编码、profile、level、像素格式和分辨率是否一致，
+    不一致时拼接后的码流中会出现不同的 SPS/PPS，可能无法播放或跳转。
+
+    参数:
+    codec (dict): 源视频流的 detect_codec 返回值。
+    encoded (dict): 重编码视频流的 detect_codec 返回值。
+
+    返回:
+    bool: 参数一致时返回 True。源视频未报告 level 时不比较 level。
+    """
+    encoder = CODEC_ENCODERS.get(codec.get("codec_name"))
+    profiles = ENCODER_PROFILES.get(encoder, {})
+    # Baseline 与 Constrained Baseline 对应同一个编码器 profile，按编码器参数比较
+    if profiles.get(codec.get("profile")) != profiles.get(encoded.get("profile")):
+        return False
+    keys = ["codec_name", "pix_fmt", "width", "height"]
+    if codec.get("level", 0) > 0:
+        keys.append("level")
+    return all(codec.get(key) == encoded.get(key) for key in keys)
+
+
+def is_constant_frame_rate(codec: dict) -> bool:
+    """
+    根据 detect_codec 返回的 r_frame_rate 和 avg_frame_rate 判断视频流是否为固定帧率。
+    """
+    try:
+        rate = Fraction(codec["r_frame_rate"])
+        average = Fraction(codec["avg_frame_rate"])
+    except (KeyError, ValueError, ZeroDivisionError):
+        return False
+    return rate > 0 and abs(rate - average) <= rate / 1000
+
+
+def read_frame(
+    target_path: str, seconds: float, width: int, height: int
+) -> Optional[np.ndarray]:
+    """
+    读取视频指定时间点的一帧，不落盘。
+
+    参数:
+    - target_path: 视频文件的路径。
+    - seconds: 时间点，单位秒。
+    - width: 视频宽度。
+    - height: 视频高度。
+
+    返回:
+    - np.ndarray: RGB 图像数组，读取失败时返回 None。
+    """
+    commands = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-ss",
+        str(seconds),
+        "-i",
+        target_path,
+        "-frames:v",
+        "1",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-",
+    ]
+    try:
+        output = subprocess.check_output(commands, stderr=subprocess.DEVNULL)
+    except Exception as e:
+        print(str(e))
+        return None
+    if len(output) < width * height * 3:
+        return None
+    return np.frombuffer(output[: width * height * 3], np.uint8).reshape(
+        height, width, 3
+    )
+
+
+def read_frames(
+    target_path: str, fps: float, width: int, height: int, scale: bool = False
+) -> Iterator[np.ndarray]:
+    """
+    通过管道逐帧解码视频，不写入图像文件。
+
+    参数:
+    - target_path: 视频文件的路径。
+    - fps: 解码帧率，与 extract_frames 一致。
+    - width: 视频宽度。
+    - height: 视频高度。
+    - scale: 是否将帧缩放到 width x height，为 False 时两者须与视频尺寸一致。
+
+    返回:
+    - 生成器，依次产出 RGB 图像数组。
+    """
+    filters = "fps=" + str(fps)
+    if scale:
+        filters += f",scale={width}:{height}"
+    commands = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        target_path,
+        "-vf",
+        filters,
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-",
+    ]
+    frame_size = width * height * 3
+    process = subprocess.Popen(commands, stdout=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            yield np.frombuffer(data, np.uint8).reshape(height, width, 3)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def read_band_frames(
+    target_path: str,
+    fps: float,
+    width: int,
+    top: int,
+    bottom: int,
+    scale: float = 1.0,
+    gray: bool = False,
+) -> Iterator[np.ndarray]:
+    """
+    通过管道逐帧解码视频中 [top, bottom) 行之间的横条，可选缩放和灰度，只传输该区域的像素。
+
+    参数:
+    - target_path: 视频文件的路径。
+    - fps: 解码帧率，与 extract_frames 一致。
+    - width: 视频宽度。
+    - top: 横条的起始行。
+    - bottom: 横条的结束行（不含）。
+    - scale: 缩放比例，小于 1 时缩小。
+    - gray: 是否以灰度解码。
+
+    返回:
+    - 生成器，依次产出形状为 (高, 宽, 3) 的图像数组，灰度解码时为 (高, 宽) 的单通道数组。
+    """
+    band_width = max(1, round(width * scale))
+    band_height = max(1, round((bottom - top) * scale))
+    filters = f"fps={fps},crop={width}:{bottom - top}:0:{top}"
+    if scale != 1:
+        filters += f",scale={band_width}:{band_height}"
+    channels = 1 if gray else 3
+    commands = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-i",
+        target_path,
+        "-vf",
+        filters,
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "gray" if gray else "rgb24",
+        "-",
+    ]
+    frame_size = band_width * band_height * channels
+    process = subprocess.Popen(commands, stdout=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(frame_size)
+            if len(data) < frame_size:
+                break
+            incr("decoded_bytes", frame_size)
+            shape = (band_height, band_width) + (() if gray else (3,))
+            yield np.frombuffer(data, np.uint8).reshape(shape)
+    finally:
+        process.stdout.close()
+        process.kill()
+        process.wait()
+
+
+def write_video(
+    frames: Iterable[np.ndarray],
+    output_path: str,
+    fps: float,
+    width: int,
+    height: int,
+    audio_path: Optional[str] = None,
+    output_video_quality: int = 35,
+    output_video_encoder: str = "libx264",
+    preset: Optional[str] = None,
+) -> bool:
+    """
+    通过管道将内存中的帧编码为视频，编码参数与 create_video 一致。
+
+    参数:
+    - frames: 依次产出 RGB 图像数组的可迭代对象。
+    - output_path: 输出视频文件的路径。
+    - fps: 视频的帧率。
+    - width: 视频宽度。
+    - height: 视频高度。
+    - audio_path: 提供音轨的文件路径，为 None 时只输出视频流。
+    - output_video_quality: 输出视频的质量，含义与 create_video 相同。
+    - output_video_encoder: 输出视频的编码器。
+    - preset: 编码速度预设，如 veryfast，仅对 libx264 和 libx265 生效。
+
+    返回:
+    - bool: 表示FFmpeg命令执行是否成功的布尔值。
+    """
+    output_video_quality = (output_video_quality + 1) * 51 // 100
+    commands = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-s",
+        f"{width}x{height}",
+        "-r",
+        str(fps),
+        "-i",
+        "-",
+    ]
+    if audio_path:
+        commands.extend(["-i", audio_path, "-c:a", "aac", "-map", "1:a:0?"])
+    commands.extend(
+        ["-c:v", output_video_encoder, "-map", "0:v:0", "-pix_fmt", "yuv420p"]
+    )
+    if output_video_encoder in ["libx264", "libx265", "libvpx"]:
+        commands.extend(["-crf", str(output_video_quality)])
+    if output_video_encoder in ["h264_nvenc", "hevc_nvenc"]:
+        commands.extend(["-cq", str(output_video_quality)])
+    if preset and output_video_encoder in ["libx264", "libx265"]:
+        commands.extend(["-preset", preset])
+    commands.extend(["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-y", output_path])
+
+    process = subprocess.Popen(commands, stdin=subprocess.PIPE)
+    try:
+        for frame in frames:
+            process.stdin.write(np.ascontiguousarray(frame, dtype=np.uint8).tobytes())
+    except BrokenPipeError:
+        pass
+    finally:
+        process.stdin.close()
+    return process.wait() == 0
+
+
 def extract_frames(
-    target_path: str, fps: float = 30, temp_frame_quality: int = 1
+    target_path: str,
+    fps: float = 30,
+    temp_frame_quality: int = 1,
+    temp_directory_path: Optional[str] = None,
+    start_frame: int = 0,
+    frame_count: Optional[int] = None,
 ) -> bool:
     """
     从视频文件中提取帧并保存为临时图像序列。
@@ -75,25 +499,37 @@ def extract_frames(
     - target_path: str 视频文件的路径，用于提取帧的源视频。
     - fps: float 视频的帧率，默认为30帧每秒。用于设置提取帧的频率。
     - temp_frame_quality: int 图像的质量，用于控制输出图像的质量，值越小质量越高。
+    - temp_directory_path: str 帧保存目录，默认为视频同目录下以视频名命名的目录。
+    - start_frame: int 起始帧序号（从 0 开始），用于只提取视频的一个时间片段。
+    - frame_count: int 提取的帧数，默认提取到视频结尾。
 
     返回:
     - bool 提取帧操作是否成功。
     """
-    temp_directory_path = get_temp_directory_path(target_path)
-    commands = [
-        "-hwaccel",
-        "auto",
-        "-i",
-        target_path,
-        "-q:v",
-        str(temp_frame_quality),
-        "-pix_fmt",
-        "rgb24",
-        "-vf",
-        "fps=" + str(fps),
-        os.path.join(temp_directory_path, "%04d." + TEMP_FRAME_FORMAT),
-    ]
-    return run_ffmpeg(commands)
+    if temp_directory_path is None:
+        temp_directory_path = get_temp_directory_path(target_path)
+    os.makedirs(temp_directory_path, exist_ok=True)
+    commands = ["-hwaccel", "auto"]
+    if start_frame > 0:
+        commands.extend(["-ss", str(start_frame / fps)])
+    commands.extend(
+        [
+            "-i",
+            target_path,
+            "-q:v",
+            str(temp_frame_quality),
+            "-pix_fmt",
+            "rgb24",
+            "-vf",
+            "fps=" + str(fps),
+        ]
+    )
+    if frame_count is not None:
+        commands.extend(["-frames:v", str(frame_count)])
+    commands.append(os.path.join(temp_directory_path, "%04d." + TEMP_FRAME_FORMAT))
+    success = run_ffmpeg(commands)
+    incr("frames", len(get_temp_frame_paths(temp_directory_path)))
+    return success
 
 
 def create_video(
@@ -102,6 +538,8 @@ def create_video(
     fps: float = 30,
     output_video_quality: int = 35,
     output_video_encoder: str = "libx264",
+    temp_directory_path: Optional[str] = None,
+    with_audio: bool = True,
 ) -> bool:
     """
     合成视频文件。
@@ -114,11 +552,14 @@ def create_video(
     - fps: 视频的帧率，默认为30帧每秒。
     - output_video_quality: 输出视频的质量，0-51的整数，其中0是无损压缩，51是最大压缩。
     - output_video_encoder: 输出视频的编码器，默认使用libx264。
+    - temp_directory_path: 帧所在目录，默认为视频同目录下以视频名命名的目录。
+    - with_audio: 是否合并目标文件的音轨，分片处理时各分片只输出视频流。
 
     返回:
     - bool: 表示FFmpeg命令执行是否成功的布尔值。
     """
-    temp_directory_path = get_temp_directory_path(target_path)
+    if temp_directory_path is None:
+        temp_directory_path = get_temp_directory_path(target_path)
     output_video_quality = (output_video_quality + 1) * 51 // 100
 
     commands = [
@@ -128,19 +569,12 @@ def create_video(
         str(fps),
         "-i",
         os.path.join(temp_directory_path, "%04d." + TEMP_FRAME_FORMAT),
-        "-i",
-        target_path,
-        "-c:v",
-        output_video_encoder,
-        "-c:a",
-        "aac",
-        "-map",
-        "0:v:0",
-        "-map",
-        "1:a:0",
-        "-pix_fmt",
-        "yuv420p",
     ]
+    if with_audio:
+        commands.extend(["-i", target_path, "-c:a", "aac", "-map", "1:a:0"])
+    commands.extend(
+        ["-c:v", output_video_encoder, "-map", "0:v:0", "-pix_fmt", "yuv420p"]
+    )
 
     if output_video_encoder in ["libx264", "libx265", "libvpx"]:
         commands.extend(["-crf", str(output_video_quality)])
@@ -150,6 +584,247 @@ def create_video(
     commands.extend(["-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2"])
     commands.extend(["-y", output_path])
 
+    incr("frames", len(get_temp_frame_paths(temp_directory_path)))
+    return run_ffmpeg(commands)
+
+
+def smart_create_video(
+    target_path: str,
+    output_path: str,
+    fps: float,
+    frame_numbers: Iterable[int],
+    output_video_quality: int = 35,
+    temp_directory_path: Optional[str] = None,
+    max_ratio: float = 0.8,
+) -> bool:
+    """
+    只重编码包含改动帧的 GOP，其余 GOP 直接复制源视频的码流，再拼接并合并音轨。
+
+    源视频按关键帧切分为若干段：改动帧所在的 GOP（相邻的合并为一段）用临时目录中的帧以相同编码重编码，
+    其余段无损复制。编码或 profile 不受支持、可变帧率、无法检测关键帧、需要重编码的时长超过 max_ratio
+    或重编码段的编码参数与源视频不一致（见 is_same_stream_format）时退回 create_video。
+
+    参数:
+    - target_path: 源视频路径，提供未改动的码流和音轨。
+    - output_path: 输出视频文件的路径。
+    - fps: 视频的帧率，与提取帧时一致。
+    - frame_numbers: 改动过的帧序号（从 1 开始，与临时帧文件名一致）。
+    - output_video_quality: 输出视频的质量，含义与 create_video 相同。
+    - temp_directory_path: 帧所在目录，默认为视频同目录下以视频名命名的目录。
+    - max_ratio: 重编码时长占比超过该值时直接整体重编码。
+
+    返回:
+    - bool: 表示合成是否成功的布尔值。
+    """
+    if temp_directory_path is None:
+        temp_directory_path = get_temp_directory_path(target_path)
+
+    def fallback() -> bool:
+        return create_video(
+            target_path,
+            output_path,
+            fps,
+            output_video_quality,
+            temp_directory_path=temp_directory_path,
+        )
+
+    codec = detect_codec(target_path)
+    encoder_args = get_encoder_args(codec)
+    if encoder_args is None or not is_constant_frame_rate(codec):
+        return fallback()
+    # 关键帧时间换算为相对视频流起点的时间，与帧序号 (n - 1) / fps 对应
+    try:
+        start_time = float(codec.get("start_time", 0))
+    except ValueError:
+        start_time = 0.0
+    keyframes = [max(0.0, k - start_time) for k in detect_keyframes(target_path)]
+    duration = detect_duration(target_path)
+    if not keyframes or duration <= 0:
+        return fallback()
+
+    # 改动帧映射到所在 GOP，相邻的 GOP 合并为一段 [起始 GOP, 结束 GOP)
+    touched = sorted(
+        {
+            max(0, bisect.bisect_right(keyframes, (n - 1) / fps) - 1)
+            for n in frame_numbers
+        }
+    )
+    bounds = keyframes + [duration]
+    ranges = []
+    for index in touched:
+        if ranges and ranges[-1][1] == index:
+            ranges[-1][1] = index + 1
+        else:
+            ranges.append([index, index + 1])
+    encoded = sum(bounds[end] - bounds[start] for start, end in ranges)
+    incr("reencoded_s", encoded)
+    if encoded > duration * max_ratio:
+        return fallback()
+    if not ranges:
+        return mux_audio(target_path, target_path, output_path)
+
+    # 在每段的起止关键帧处切分源码流，切分点取关键帧前半帧，segment 会在其后的第一个关键帧处切开
+    cuts = sorted(
+        {i for start, end in ranges for i in (start, end)} - {0, len(keyframes)}
+    )
+    work_directory_path = f"{os.path.splitext(output_path)[0]}_gops"
+    shutil.rmtree(work_directory_path, ignore_errors=True)
+    os.makedirs(work_directory_path)
+    try:
+        return encode_gops(
+            target_path,
+            output_path,
+            fps,
+            keyframes,
+            bounds,
+            ranges,
+            cuts,
+            codec,
+            encoder_args,
+            output_video_quality,
+            temp_directory_path,
+            work_directory_path,
+            fallback,
+        )
+    finally:
+        shutil.rmtree(work_directory_path, ignore_errors=True)
+
+
+def encode_gops(
+    target_path: str,
+    output_path: str,
+    fps: float,
+    keyframes: List[float],
+    bounds: List[float],
+    ranges: List[List[int]],
+    cuts: List[int],
+    codec: dict,
+    encoder_args: List[str],
+    output_video_quality: int,
+    temp_directory_path: str,
+    work_directory_path: str,
+    fallback,
+) -> bool:
+    """
+    smart_create_video 的切分、重编码和拼接步骤，中间文件写入 work_directory_path，由调用方删除。
+    """
+    commands = ["-i", target_path, "-map", "0:v:0", "-c", "copy", "-f", "segment"]
+    if cuts:
+        commands.extend(
+            [
+                "-segment_times",
+                ",".join(f"{keyframes[i] - 0.5 / fps:.6f}" for i in cuts),
+            ]
+        )
+    commands.extend(
+        ["-reset_timestamps", "1", os.path.join(work_directory_path, "%04d.ts")]
+    )
+    starts = [0] + cuts
+    segment_paths = [
+        os.path.join(work_directory_path, f"{i:04d}.ts") for i in range(len(starts))
+    ]
+    # 切分结果与预期的段数不一致时（如时间戳不规则），无法确定各段对应的 GOP
+    if not run_ffmpeg(commands) or len(os.listdir(work_directory_path)) != len(starts):
+        return fallback()
+
+    quality = str((output_video_quality + 1) * 51 // 100)
+    for start, end in ranges:
+        first = round(bounds[start] * fps)
+        count = round(bounds[end] * fps) - first
+        commands = [
+            "-r",
+            str(fps),
+            "-start_number",
+            str(first + 1),
+            "-i",
+            os.path.join(temp_directory_path, "%04d." + TEMP_FRAME_FORMAT),
+            "-frames:v",
+            str(count),
+            *encoder_args,
+            "-crf",
+            quality,
+            "-y",
+            segment_paths[starts.index(start)],
+        ]
+        if not run_ffmpeg(commands):
+            return False
+        incr("frames", count)
+        encoded = detect_codec(segment_paths[starts.index(start)])
+        if not is_same_stream_format(codec, encoded):
+            print(f"re-encoded stream {encoded} does not match source {codec}")
+            incr("smart_encode_mismatch")
+            return fallback()
+
+    video_path = os.path.join(
+        work_directory_path, "video" + os.path.splitext(output_path)[1]
+    )
+    return concat_videos(segment_paths, video_path) and mux_audio(
+        video_path, target_path, output_path
+    )
+
+
+def concat_videos(video_paths: List[str], output_path: str) -> bool:
+    """
+    使用 concat demuxer 无重编码地拼接多个编码参数一致的视频。
+
+    参数:
+    - video_paths: 按顺序排列的待拼接视频路径列表。
+    - output_path: 输出视频路径。
+
+    返回:
+    - bool: 表示FFmpeg命令执行是否成功的布尔值。
+    """
+    list_path = f"{os.path.splitext(output_path)[0]}_concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for video_path in video_paths:
+            escaped = os.path.abspath(video_path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    commands = [
+        "-f",
+        "concat",
+        "-safe",
+        "0",
+        "-i",
+        list_path,
+        "-c",
+        "copy",
+        "-y",
+        output_path,
+    ]
+    success = run_ffmpeg(commands)
+    os.remove(list_path)
+    return success
+
+
+def mux_audio(video_path: str, target_path: str, output_path: str) -> bool:
+    """
+    将目标文件的音轨合并到视频中，视频流直接复制。
+
+    参数:
+    - video_path: 只包含视频流的文件路径。
+    - target_path: 提供音轨的源文件路径。
+    - output_path: 输出视频路径。
+
+    返回:
+    - bool: 表示FFmpeg命令执行是否成功的布尔值。
+    """
+    commands = [
+        "-i",
+        video_path,
+        "-i",
+        target_path,
+        "-map",
+        "0:v:0",
+        "-map",
+        "1:a:0?",
+        "-c:v",
+        "copy",
+        "-c:a",
+        "aac",
+        "-shortest",
+        "-y",
+        output_path,
+    ]
     return run_ffmpeg(commands)
 
 
@@ -0,0 +1,238 @@
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List
+
+from utils.logging_utils import update_status
+
+ACTIVE_FILE = ".active"
+# 任务锁文件的后缀，同一中间产物前缀同时只能有一个任务使用
+LOCK_SUFFIX = ".lock"
+_lock = threading.Lock()
+
+
+def get_job_prefix(video_path: str, config: dict) -> str:
+    """
+    获取视频中间产物的路径前缀：帧目录为该前缀本身，其余中间文件为 {前缀}_ocr.json、{前缀}_output.mp4 等。
+
+    前缀为 {视频名}-{绝对路径哈希}，配置 workspace.job 时再加上 -{任务 ID}。未配置 workspace.root 时
+    放在视频同目录下，配置后放在 {root}/{前缀}/ 目录下。同一目录中扩展名不同的同名视频（如 x.mp4 和 x.mkv）
+    以及不同目录中的同名视频互不冲突；服务为每个任务设置 workspace.job，同一视频的并发任务各用各的中间产物，
+    命令行不设置任务 ID，同一视频重复处理时复用缓存，并由 use_workspace 的任务锁保证同时只有一个任务在使用。
+    结果只由视频路径和配置决定，子进程中可以重新计算得到相同的路径。
+
+    参数:
+    - video_path: 输入视频路径。
+    - config: 配置字典。
+
+    返回:
+    - str: 中间产物路径前缀。
+    """
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:10]
+    key = f"{name}-{digest}"
+    if config["workspace"]["job"]:
+        key = f"{key}-{config['workspace']['job']}"
+    root = config["workspace"]["root"]
+    if not root:
+        return os.path.join(os.path.dirname(video_path), key)
+    job_directory_path = os.path.join(root, key)
+    os.makedirs(job_directory_path, exist_ok=True)
+    return os.path.join(job_directory_path, key)
+
+
+def get_size(path: str) -> int:
+    """
+    获取文件或目录（递归）占用的字节数，路径不存在时返回 0。
+    """
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for directory_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            try:
+                total += os.path.getsize(os.path.join(directory_path, file_name))
+            except OSError:
+                pass
+    return total
+
+
+def get_artifact_sizes(artifacts: Dict[str, str]) -> Dict[str, int]:
+    """
+    统计各产物占用的字节数。
+
+    参数:
+    - artifacts: 产物名称到路径的映射。
+
+    返回:
+    - Dict[str, int]: 产物名称到字节数的映射。
+    """
+    return {name: get_size(path) for name, path in artifacts.items()}
+
+
+def read_pids(path: str) -> List[int]:
+    """
+    读取文件中每行一个的进程号，文件不存在或内容无效时返回空列表。
+    """
+    try:
+        with open(path) as f:
+            return [int(line) for line in f.read().split()]
+    except (OSError, ValueError):
+        return []
+
+
+def is_alive(pid: int) -> bool:
+    """
+    判断进程是否仍在运行。
+    """
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def is_active(job_directory_path: str) -> bool:
+    """
+    判断任务目录是否正被某个仍在运行的进程使用。
+    """
+    return any(map(is_alive, read_pids(os.path.join(job_directory_path, ACTIVE_FILE))))
+
+
+@contextlib.contextmanager
+def lock_job(prefix: str, interval: float = 1.0):
+    """
+    独占同一输入视频的中间产物：锁文件已存在时等待持有者结束，持有进程已退出的锁视为失效并删除。
+
+    参数:
+    - prefix: 中间产物路径前缀。
+    - interval: 等待时检查锁文件的间隔，单位秒。
+
+    返回:
+    - 上下文管理器，退出时删除锁文件。
+    """
+    lock_path = prefix + LOCK_SUFFIX
+    waiting = False
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            pids = read_pids(lock_path)
+            if pids and not any(map(is_alive, pids)):
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(lock_path)
+                continue
+            if not waiting:
+                update_status(f"Workspace: waiting for another job on {prefix}")
+                waiting = True
+            time.sleep(interval)
+    with os.fdopen(fd, "w") as f:
+        f.write(f"{os.getpid()}\n")
+    try:
+        yield
+    finally:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(lock_path)
+
+
+def evict(config: dict, keep: List[str] = ()) -> List[str]:
+    """
+    工作区超出 workspace.budget_gb 时，按最近使用时间从旧到新删除其他任务的目录，直到不超过预算。
+
+    正在运行的任务目录和 keep 中的目录不会被删除。
+
+    参数:
+    - config: 配置字典。
+    - keep: 需要保留的任务目录列表。
+
+    返回:
+    - List[str]: 被删除的任务目录列表。
+    """
+    root = config["workspace"]["root"]
+    budget = config["workspace"]["budget_gb"] * 1024**3
+    if not root or budget <= 0 or not os.path.isdir(root):
+        return []
+
+    jobs = []
+    for name in os.listdir(root):
+        job_directory_path = os.path.join(root, name)
+        if os.path.isdir(job_directory_path):
+            jobs.append(
+                (
+                    os.path.getmtime(job_directory_path),
+                    job_directory_path,
+                    get_size(job_directory_path),
+                )
+            )
+    total = sum(size for _, _, size in jobs)
+    keep = {os.path.abspath(path) for path in keep}
+    evicted = []
+    for _, job_directory_path, size in sorted(jobs):
+        if total <= budget:
+            break
+        if os.path.abspath(job_directory_path) in keep or is_active(job_directory_path):
+            continue
+        shutil.rmtree(job_directory_path, ignore_errors=True)
+        total -= size
+        evicted.append(job_directory_path)
+        update_status(
+            f"Workspace: evicted {job_directory_path} ({size / 1024**2:.1f} MB)"
+        )
+    return evicted
+
+
+@contextlib.contextmanager
+def use_workspace(video_path: str, config: dict):
+    """
+    在任务运行期间占用视频的工作区目录：标记为运行中并更新最近使用时间，结束后按预算淘汰旧的任务目录。
+    前缀相同（同一视频且未设置任务 ID）的任务依次运行，后来的任务等待前一个结束后复用其缓存，
+    不会同时写入同一帧目录。
+
+    参数:
+    - video_path: 输入视频路径。
+    - config: 配置字典。
+
+    返回:
+    - 上下文管理器，产出中间产物路径前缀。
+    """
+    prefix = get_job_prefix(video_path, config)
+    with lock_job(prefix):
+        if not config["workspace"]["root"]:
+            yield prefix
+            return
+        with track_job_directory(os.path.dirname(prefix), config):
+            yield prefix
+
+
+@contextlib.contextmanager
+def track_job_directory(job_directory_path: str, config: dict):
+    """
+    标记任务目录为运行中并更新最近使用时间，结束后按预算淘汰旧的任务目录。
+    """
+    active_path = os.path.join(job_directory_path, ACTIVE_FILE)
+    with _lock, open(active_path, "a") as f:
+        f.write(f"{os.getpid()}\n")
+    now = time.time()
+    os.utime(job_directory_path, (now, now))
+    evict(config, keep=[job_directory_path])
+    try:
+        yield
+    finally:
+        # 只移除本任务写入的一条记录
+        with _lock:
+            with open(active_path) as f:
+                pids = f.read().split()
+            pids.remove(str(os.getpid()))
+            if pids:
+                with open(active_path, "w") as f:
+                    f.write("".join(f"{pid}\n" for pid in pids))
+            else:
+                os.remove(active_path)
+        os.utime(job_directory_path, None)
+        evict(config, keep=[job_directory_path])